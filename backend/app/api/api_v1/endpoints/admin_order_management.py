@@ -132,7 +132,7 @@ async def get_all_orders(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Get all orders error: {e}")
+        logger.error("Get all orders error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="获取订单列表失败"
@@ -219,7 +219,7 @@ async def get_order_detail(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Get order detail error: {e}")
+        logger.error("Get order detail error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="获取订单详情失败"
@@ -260,7 +260,7 @@ async def force_complete_order(
         
         db.commit()
         
-        logger.info(f"Order {order_id} force completed by admin {admin_user.username}")
+        logger.info("Order %s force completed by admin %s", order_id, admin_user.username)
         
         return {
             "status": "success",
@@ -277,7 +277,7 @@ async def force_complete_order(
         raise
     except Exception as e:
         db.rollback()
-        logger.error(f"Force complete order error: {e}")
+        logger.error("Force complete order error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="强制完成订单失败"
@@ -313,8 +313,9 @@ async def cancel_order_admin(
         order.cancel_reason = reason
         
         db.commit()
+        user_membership_service.invalidate_user_cache(order.user_id)
         
-        logger.info(f"Order {order_id} cancelled by admin {admin_user.username}: {reason}")
+        logger.info("Order %s cancelled by admin %s: %s", order_id, admin_user.username, reason)
         
         return {
             "status": "success",
@@ -331,7 +332,7 @@ async def cancel_order_admin(
         raise
     except Exception as e:
         db.rollback()
-        logger.error(f"Cancel order admin error: {e}")
+        logger.error("Cancel order admin error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="取消订单失败"
@@ -443,7 +444,7 @@ async def get_order_statistics(
         }
         
     except Exception as e:
-        logger.error(f"Get order statistics error: {e}")
+        logger.error("Get order statistics error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="获取订单统计失败"
@@ -480,8 +481,9 @@ async def extend_order_validity(
         
         order.expire_time = new_expire_time
         db.commit()
+        user_membership_service.invalidate_user_cache(order.user_id)
         
-        logger.info(f"Order {order_id} validity extended by {extend_days} days by admin {admin_user.username}: {reason}")
+        logger.info("Order %s validity extended by %s days by admin %s: %s", order_id, extend_days, admin_user.username, reason)
         
         return {
             "status": "success",
@@ -500,7 +502,7 @@ async def extend_order_validity(
         raise
     except Exception as e:
         db.rollback()
-        logger.error(f"Extend order validity error: {e}")
+        logger.error("Extend order validity error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="延长订单有效期失败"
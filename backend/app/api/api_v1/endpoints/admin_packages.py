@@ -2,18 +2,73 @@
 管理员套餐配置API端点
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import update, bindparam
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from decimal import Decimal
 
 from app.core.database import get_db
+from app.core.redis_cache import cache as redis_cache, CacheKeys, CacheExpiry
+from app.core.cache import cache as local_cache
+from app.core.etag import make_etag, etag_matches, not_modified
 from app.core.admin_auth import get_current_admin_user
 from app.models.admin_user import AdminUser
 from app.models.payment import PaymentPackage
 from app.schemas.payment import PaymentPackageBase, PaymentPackage as PaymentPackageSchema
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# 单个套餐详情的进程内缓存（Redis 不可用时同样生效）
+# 键中带上数据版本号，其他 worker 上的套餐变更后旧条目不会再被命中
+PACKAGE_DETAIL_CACHE_KEY = "admin_package:{package_id}:{version}"
+PACKAGE_DETAIL_CACHE_TTL = 60
+
+# 管理端轮询的读取接口需要每次重新验证，配合 ETag 返回 304
+PACKAGE_CACHE_CONTROL = "private, no-cache"
+
+# 批量排序接口每个条目允许的字段
+SORT_ORDER_ITEM_KEYS = frozenset({"id", "sort_order"})
+
+# 响应模型字段对应的数据库列，读取接口按列查询，不加载完整 ORM 对象
+PACKAGE_RESPONSE_COLUMNS = [getattr(PaymentPackage, name) for name in PaymentPackageSchema.model_fields]
+
+
+def _package_response(row) -> PaymentPackageSchema:
+    """由查询行构造套餐响应模型（数据来自数据库，跳过逐字段校验）"""
+    return PaymentPackageSchema.model_construct(**row._mapping)
+
+
+def _invalidate_package_cache(*package_ids: int) -> None:
+    """套餐变更后清除所有套餐相关的缓存，以及指定套餐的进程内详情缓存"""
+    redis_cache.clear_pattern(CacheKeys.PAYMENT_PACKAGES_ALL)
+    for package_id in package_ids:
+        local_cache.delete(PACKAGE_DETAIL_CACHE_KEY.format(package_id=package_id, version=None))
+
+
+def _package_version() -> Optional[str]:
+    """
+    获取套餐数据版本号，用于生成 ETag
+
+    版本号存放在 Redis 中并随 _invalidate_package_cache 一起被清除，
+    下次读取时生成新的版本号，多个 worker 之间保持一致；Redis 不可用时返回 None
+    """
+    version = redis_cache.get(CacheKeys.ADMIN_PACKAGES_VERSION)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not redis_cache.set(CacheKeys.ADMIN_PACKAGES_VERSION, version):
+            return None
+    return version
+
+
+def _etag_response(content, etag: Optional[str]) -> ORJSONResponse:
+    """构造 JSON 响应，有 ETag 时附带条件请求相关的响应头"""
+    if etag is None:
+        return ORJSONResponse(content)
+    return ORJSONResponse(content, headers={"ETag": etag, "Cache-Control": PACKAGE_CACHE_CONTROL})
 
 
 def check_admin_user(current_admin: AdminUser = Depends(get_current_admin_user)) -> AdminUser:
@@ -44,7 +99,8 @@ class PaymentPackageUpdate(PaymentPackageBase):
 # ============ 套餐管理API ============
 
 @router.get("/packages", response_model=List[PaymentPackageSchema])
-async def get_all_packages(
+def get_all_packages(
+    request: Request,
     skip: int = Query(0, description="跳过的记录数"),
     limit: int = Query(100, description="返回的记录数"),
     is_active: Optional[bool] = Query(None, description="是否启用筛选"),
@@ -52,24 +108,42 @@ async def get_all_packages(
     db: Session = Depends(get_db)
 ):
     """获取所有套餐列表（管理员专用）"""
-    query = db.query(PaymentPackage)
+    # 套餐未变更时直接返回 304，不再读取缓存或序列化
+    version = _package_version()
+    etag = make_etag("admin-packages", version, skip, limit, is_active, weak=True) if version else None
+    if etag and etag_matches(request, etag):
+        return not_modified(etag, PACKAGE_CACHE_CONTROL)
+    
+    # 缓存的是序列化后的结果，命中时直接返回，跳过查询和响应模型处理
+    cache_key = CacheKeys.ADMIN_PACKAGES_LIST.format(skip=skip, limit=limit, is_active=is_active)
+    cached_result = redis_cache.get(cache_key)
+    if cached_result is not None:
+        return _etag_response(cached_result, etag)
+    
+    query = db.query(*PACKAGE_RESPONSE_COLUMNS)
     
     # 筛选条件
     if is_active is not None:
         query = query.filter(PaymentPackage.is_active == is_active)
     
     # 排序和分页
-    packages = query.order_by(PaymentPackage.sort_order, PaymentPackage.id).offset(skip).limit(limit).all()
+    rows = query.order_by(PaymentPackage.sort_order, PaymentPackage.id).offset(skip).limit(limit).all()
     
-    return packages
+    result = [_package_response(row).model_dump(mode="json") for row in rows]
+    redis_cache.set(cache_key, result, CacheExpiry.MINUTE_5)
+    
+    return _etag_response(result, etag)
 
 
 @router.get("/packages/stats")
-async def get_package_stats(
+def get_package_stats(
     admin_user: AdminUser = Depends(check_admin_user),
     db: Session = Depends(get_db)
 ):
     """获取套餐统计信息（管理员专用）"""
+    cached_result = redis_cache.get(CacheKeys.ADMIN_PACKAGES_STATS)
+    if cached_result is not None:
+        return cached_result
     
     # 基础统计
     total_packages = db.query(PaymentPackage).count()
@@ -83,7 +157,7 @@ async def get_package_stats(
         func.count(PaymentPackage.id).label('count')
     ).group_by(PaymentPackage.membership_type).all()
     
-    return {
+    result = {
         "total_packages": total_packages,
         "active_packages": active_packages,
         "inactive_packages": inactive_packages,
@@ -92,28 +166,45 @@ async def get_package_stats(
             for stat in membership_stats
         ]
     }
+    redis_cache.set(CacheKeys.ADMIN_PACKAGES_STATS, result, CacheExpiry.MINUTE_5)
+    
+    return result
 
 
 @router.get("/packages/{package_id}", response_model=PaymentPackageSchema)
-async def get_package_by_id(
+def get_package_by_id(
+    request: Request,
     package_id: int,
     admin_user: AdminUser = Depends(check_admin_user),
     db: Session = Depends(get_db)
 ):
     """根据ID获取套餐详细信息（管理员专用）"""
-    package = db.query(PaymentPackage).filter(PaymentPackage.id == package_id).first()
+    version = _package_version()
+    etag = make_etag("admin-package", version, package_id, weak=True) if version else None
+    if etag and etag_matches(request, etag):
+        return not_modified(etag, PACKAGE_CACHE_CONTROL)
     
-    if not package:
+    cache_key = PACKAGE_DETAIL_CACHE_KEY.format(package_id=package_id, version=version)
+    cached_result = local_cache.get(cache_key)
+    if cached_result is not None:
+        return _etag_response(cached_result, etag)
+    
+    row = db.query(*PACKAGE_RESPONSE_COLUMNS).filter(PaymentPackage.id == package_id).first()
+    
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="套餐不存在"
         )
     
-    return package
+    result = _package_response(row).model_dump(mode="json")
+    local_cache.set(cache_key, result, PACKAGE_DETAIL_CACHE_TTL)
+    
+    return _etag_response(result, etag)
 
 
 @router.post("/packages", response_model=PaymentPackageSchema)
-async def create_package(
+def create_package(
     package_create: PaymentPackageCreate,
     admin_user: AdminUser = Depends(check_admin_user),
     db: Session = Depends(get_db)
@@ -132,27 +223,18 @@ async def create_package(
         )
     
     # 创建新套餐
-    package = PaymentPackage(
-        package_type=package_create.package_type,
-        name=package_create.name,
-        price=package_create.price,
-        queries_count=package_create.queries_count,
-        validity_days=package_create.validity_days,
-        membership_type=package_create.membership_type,
-        description=package_create.description,
-        is_active=package_create.is_active,
-        sort_order=package_create.sort_order
-    )
+    package = PaymentPackage(**package_create.model_dump())
     
     db.add(package)
     db.commit()
     db.refresh(package)
+    _invalidate_package_cache()
     
     return package
 
 
 @router.put("/packages/{package_id}", response_model=PaymentPackageSchema)
-async def update_package(
+def update_package(
     package_id: int,
     package_update: PaymentPackageUpdate,
     admin_user: AdminUser = Depends(check_admin_user),
@@ -183,18 +265,19 @@ async def update_package(
             )
     
     # 更新字段
-    update_data = package_update.dict(exclude_unset=True)
+    update_data = package_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(package, field, value)
     
     db.commit()
     db.refresh(package)
+    _invalidate_package_cache(package_id)
     
     return package
 
 
 @router.delete("/packages/{package_id}")
-async def delete_package(
+def delete_package(
     package_id: int,
     admin_user: AdminUser = Depends(check_admin_user),
     db: Session = Depends(get_db)
@@ -224,13 +307,15 @@ async def delete_package(
     
     db.delete(package)
     db.commit()
+    _invalidate_package_cache(package_id)
     
     return {"message": f"套餐 '{package.name}' 删除成功"}
 
 
 @router.post("/packages/{package_id}/toggle-status")
-async def toggle_package_status(
+def toggle_package_status(
     package_id: int,
+    is_active: Optional[bool] = Query(None, description="目标状态，不传则在启用/禁用之间切换"),
     admin_user: AdminUser = Depends(check_admin_user),
     db: Session = Depends(get_db)
 ):
@@ -245,39 +330,66 @@ async def toggle_package_status(
             detail="套餐不存在"
         )
     
+    # 已处于目标状态时直接返回，不写库也不清缓存
+    if is_active is not None and package.is_active == is_active:
+        status_text = "启用" if package.is_active else "禁用"
+        return {
+            "message": f"套餐 '{package.name}' 已是{status_text}状态",
+            "package_id": package_id,
+            "is_active": package.is_active,
+            "no_change": True
+        }
+    
     # 切换状态
     package.is_active = not package.is_active
     db.commit()
     db.refresh(package)
+    _invalidate_package_cache(package_id)
     
     status_text = "启用" if package.is_active else "禁用"
     
     return {
         "message": f"套餐 '{package.name}' 已{status_text}",
         "package_id": package_id,
-        "is_active": package.is_active
+        "is_active": package.is_active,
+        "no_change": False
     }
 
 
 @router.post("/packages/batch-update-order")
-async def batch_update_package_order(
+def batch_update_package_order(
     package_orders: List[dict],  # [{"id": 1, "sort_order": 1}, ...]
     admin_user: AdminUser = Depends(check_admin_user),
     db: Session = Depends(get_db)
 ):
     """批量更新套餐排序（管理员专用）"""
     
+    # 在访问数据库前拒绝包含未知字段的条目，避免拼写错误被静默忽略
+    unknown_keys = set().union(*(item.keys() - SORT_ORDER_ITEM_KEYS for item in package_orders))
+    if unknown_keys:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"未知字段: {', '.join(sorted(unknown_keys))}"
+        )
+    
     try:
-        for item in package_orders:
-            package_id = item.get("id")
-            sort_order = item.get("sort_order")
-            
-            if package_id and sort_order is not None:
-                package = db.query(PaymentPackage).filter(PaymentPackage.id == package_id).first()
-                if package:
-                    package.sort_order = sort_order
+        # 一次遍历筛出有效条目，再用单条 executemany UPDATE 写入，避免逐条查询
+        updates = [
+            {"b_id": item.get("id"), "b_sort_order": item.get("sort_order")}
+            for item in package_orders
+            if item.get("id") and item.get("sort_order") is not None
+        ]
+        
+        if updates:
+            db.execute(
+                update(PaymentPackage.__table__)
+                .where(PaymentPackage.__table__.c.id == bindparam("b_id"))
+                .values(sort_order=bindparam("b_sort_order")),
+                updates
+            )
         
         db.commit()
+        _invalidate_package_cache(*[item["b_id"] for item in updates])
         
         return {
             "message": "套餐排序更新成功",
@@ -2,9 +2,10 @@
 概念相关API端点
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, List, Optional
 from app.core.database import get_db
 from app.core.admin_auth import get_current_admin_user
 from app.core.cache import cache_result
@@ -14,6 +15,17 @@ from datetime import date, datetime, timedelta
 
 router = APIRouter()
 
+# 响应序列化器在模块加载时构建一次，每个请求只做一次整体校验+序列化
+_concept_list_adapter = TypeAdapter(List[ConceptResponse])
+_concept_with_stocks_adapter = TypeAdapter(ConceptWithStocks)
+_new_high_list_adapter = TypeAdapter(List[NewHighConcept])
+
+
+def _serialize(adapter: TypeAdapter, data: Any) -> Response:
+    """使用预构建的序列化器直接生成JSON响应，跳过FastAPI逐字段的响应校验"""
+    validated = adapter.validate_python(data, from_attributes=True)
+    return Response(content=adapter.dump_json(validated), media_type="application/json")
+
 
 @router.get("/count")
 def get_concepts_count(db: Session = Depends(get_db)):
@@ -32,7 +44,7 @@ def get_concepts(
     """获取概念列表"""
     # 优化查询性能 - 添加排序和限制
     concepts = db.query(Concept).order_by(Concept.id).offset(skip).limit(min(limit, 500)).all()
-    return concepts
+    return _serialize(_concept_list_adapter, concepts)
 
 
 @router.get("/{concept_name}/stocks", response_model=ConceptWithStocks)
@@ -52,10 +64,10 @@ def get_concept_stocks(
         StockConcept.concept_id == concept.id
     ).limit(200).all()  # 限制股票数量避免过大查询
     
-    return {
+    return _serialize(_concept_with_stocks_adapter, {
         "concept": concept,
         "stocks": stocks
-    }
+    })
 
 
 @router.get("/top/{n}", response_model=List[ConceptResponse])
@@ -81,7 +93,7 @@ def get_top_concepts(n: int, trade_date: Optional[date] = None, db: Session = De
     concept_dict = {c.id: c for c in concepts}
     sorted_concepts = [concept_dict[cs.concept_id] for cs in concept_sums if cs.concept_id in concept_dict]
     
-    return sorted_concepts
+    return _serialize(_concept_list_adapter, sorted_concepts)
 
 
 @router.get("/new-highs", response_model=List[NewHighConcept])
@@ -113,4 +125,4 @@ def get_new_high_concepts(
             "trade_date": concept_sum.trade_date
         })
     
-    return result
\ No newline at end of file
+    return _serialize(_new_high_list_adapter, result)
\ No newline at end of file
@@ -2,15 +2,28 @@
 每日分析API接口
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.etag import make_etag, etag_matches, not_modified
 from app.services.daily_analysis import DailyAnalysisService
 from typing import Dict, Any, Optional, List
 from datetime import date
+import orjson
 
 router = APIRouter()
 
+# 历史日期的分析结果不会再变化，允许客户端缓存一天
+HISTORICAL_CACHE_CONTROL = "public, max-age=86400"
+
+
+def _historical_etag(target_date: date, *parts) -> Optional[str]:
+    """为历史日期生成 ETag，当天及未来日期的数据仍可能变化，不生成"""
+    if target_date >= date.today():
+        return None
+    return make_etag(target_date.isoformat(), *parts)
+
 
 @router.post("/generate-analysis")
 async def generate_daily_analysis(
@@ -52,9 +65,13 @@ async def generate_daily_analysis(
 
 @router.get("/concept-rankings")
 async def get_concept_rankings(
+    request: Request,
+    response: Response,
     analysis_date: Optional[str] = Query(None, description="分析日期 (YYYY-MM-DD)，默认为今天"),
     concept: Optional[str] = Query(None, description="指定概念名称，为空则返回所有概念"),
     limit: int = Query(50, description="返回记录数限制", ge=1, le=1000),
+    response_format: str = Query("json", alias="format", pattern="^(json|ndjson)$",
+                                 description="返回格式：json 或 ndjson（逐行流式返回，适合大 limit）"),
     db: Session = Depends(get_db)
 ):
     """
@@ -65,6 +82,8 @@ async def get_concept_rankings(
     - 价格排名  
     - 换手率排名
     - 阅读量排名
+    
+    format=ndjson 时每行一条排名记录，服务端分批读取数据库，内存占用不随 limit 增长
     """
     try:
         # 解析日期
@@ -75,8 +94,28 @@ async def get_concept_rankings(
             except ValueError:
                 raise HTTPException(status_code=400, detail="日期格式错误，请使用 YYYY-MM-DD 格式")
         
+        # 历史数据命中 ETag 时直接返回 304，不再查询数据库
+        etag = _historical_etag(target_date, "concept-rankings", concept, limit, response_format)
+        if etag:
+            if etag_matches(request, etag):
+                return not_modified(etag, HISTORICAL_CACHE_CONTROL)
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = HISTORICAL_CACHE_CONTROL
+        
         # 获取排名数据
         analysis_service = DailyAnalysisService(db)
+        
+        if response_format == "ndjson":
+            def iter_rankings():
+                for row in analysis_service.iter_concept_rankings(target_date, concept, limit):
+                    yield orjson.dumps(row) + b"\n"
+            
+            return StreamingResponse(
+                iter_rankings(),
+                media_type="application/x-ndjson",
+                headers={"ETag": etag, "Cache-Control": HISTORICAL_CACHE_CONTROL} if etag else None
+            )
+        
         rankings = analysis_service.get_concept_rankings(target_date, concept, limit)
         
         return {
@@ -95,6 +134,8 @@ async def get_concept_rankings(
 
 @router.get("/concept-summaries")
 async def get_concept_summaries(
+    request: Request,
+    response: Response,
     analysis_date: Optional[str] = Query(None, description="分析日期 (YYYY-MM-DD)，默认为今天"),
     limit: int = Query(50, description="返回记录数限制", ge=1, le=500),
     db: Session = Depends(get_db)
@@ -118,6 +159,13 @@ async def get_concept_summaries(
             except ValueError:
                 raise HTTPException(status_code=400, detail="日期格式错误，请使用 YYYY-MM-DD 格式")
         
+        etag = _historical_etag(target_date, "concept-summaries", limit)
+        if etag:
+            if etag_matches(request, etag):
+                return not_modified(etag, HISTORICAL_CACHE_CONTROL)
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = HISTORICAL_CACHE_CONTROL
+        
         # 获取汇总数据
         analysis_service = DailyAnalysisService(db)
         summaries = analysis_service.get_concept_summaries(target_date, limit)
@@ -137,6 +185,8 @@ async def get_concept_summaries(
 
 @router.get("/top-concepts")
 async def get_top_concepts(
+    request: Request,
+    response: Response,
     analysis_date: Optional[str] = Query(None, description="分析日期 (YYYY-MM-DD)，默认为今天"),
     limit: int = Query(10, description="返回顶部概念数量", ge=1, le=50),
     db: Session = Depends(get_db)
@@ -155,6 +205,13 @@ async def get_top_concepts(
             except ValueError:
                 raise HTTPException(status_code=400, detail="日期格式错误，请使用 YYYY-MM-DD 格式")
         
+        etag = _historical_etag(target_date, "top-concepts", limit)
+        if etag:
+            if etag_matches(request, etag):
+                return not_modified(etag, HISTORICAL_CACHE_CONTROL)
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = HISTORICAL_CACHE_CONTROL
+        
         # 获取顶部概念
         analysis_service = DailyAnalysisService(db)
         summaries = analysis_service.get_concept_summaries(target_date, limit)
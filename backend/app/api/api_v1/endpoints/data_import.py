@@ -2,16 +2,63 @@
 数据导入相关API端点
 """
 
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Form
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Form, BackgroundTasks
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db, SessionLocal
+from app.core.dates import parse_date
+from app.core.progress_store import ProgressStore
 from app.services.data_import import DataImportService
 from app.services.ranking_calculator import RankingCalculatorService
 from app.models import DataImportRecord
 from datetime import date, datetime
 from typing import Optional, List
+import asyncio
+import hashlib
+import logging
+import orjson
+import os
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# 上传文件大小限制
+CSV_MAX_BYTES = 100 * 1024 * 1024
+TXT_MAX_BYTES = 50 * 1024 * 1024
+# 各上传接口的请求体大小上限（路由内路径），由 UploadSizeLimitMiddleware 在读取请求体前预检
+UPLOAD_SIZE_LIMITS = {
+    "/import-csv": CSV_MAX_BYTES,
+    "/import-txt": TXT_MAX_BYTES,
+    "/import-daily-batch": CSV_MAX_BYTES + TXT_MAX_BYTES,
+}
+# 计算文件哈希时每次读取的块大小
+UPLOAD_HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+# 排名计算任务状态，保存在 Redis 中，任意 worker 都能查询
+ranking_progress = ProgressStore("ranking_calculation", owner_field="trade_date")
+
+
+def _upload_size(file: UploadFile) -> int:
+    """
+    获取上传文件的实际大小
+    Starlette 已将上传内容按块写入临时文件，这里只移动文件指针，不把内容读入内存
+    """
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+def _hash_upload(file: UploadFile) -> str:
+    """按块计算上传文件的 SHA-256，用于识别重复上传，内存占用恒定"""
+    digest = hashlib.sha256()
+    file.file.seek(0)
+    for chunk in iter(lambda: file.file.read(UPLOAD_HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    file.file.seek(0)
+    return digest.hexdigest()
 
 
 @router.post("/import-csv")
@@ -30,28 +77,33 @@ async def import_csv_data(
         raise HTTPException(status_code=400, detail="文件必须是CSV格式")
     
     # 验证文件大小 (限制100MB)
-    if file.size and file.size > 100 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="文件大小不能超过100MB")
+    if file.size and file.size > CSV_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="文件大小不能超过100MB")
     
     try:
-        # 读取文件内容
-        content = await file.read()
+        # 不整体读入内存，直接按流处理已落盘的上传文件
+        size = _upload_size(file)
         
         # 验证文件内容不为空
-        if not content:
+        if not size:
             raise HTTPException(status_code=400, detail="文件内容为空")
         
-        # 验证文件大小（实际读取后）
-        if len(content) > 100 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="文件内容超过100MB限制")
+        # 验证文件实际大小
+        if size > CSV_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="文件内容超过100MB限制")
         
-        print(f"📄 开始处理CSV文件: {file.filename}, 大小: {len(content)} bytes")
+        logger.info("📄 开始处理CSV文件: %s, 大小: %d bytes", file.filename, size)
+        
+        # 在线程池中计算内容哈希，相同内容已导入时服务层直接返回
+        file_sha256 = await asyncio.to_thread(_hash_upload, file)
         
         # 使用数据导入服务处理文件
         import_service = DataImportService(db)
-        result = await import_service.import_csv_data(content, file.filename, allow_overwrite)
+        result = await import_service.import_csv_data(
+            file.file, file.filename, allow_overwrite, file_sha256=file_sha256
+        )
         
-        print(f"✅ CSV处理完成: 导入{result.get('imported_records', 0)}条, 跳过{result.get('skipped_records', 0)}条")
+        logger.info("✅ CSV处理完成: 导入%s条, 跳过%s条", result.get('imported_records', 0), result.get('skipped_records', 0))
         
         if result.get("already_exists"):
             return {
@@ -77,7 +129,7 @@ async def import_csv_data(
         # 重新抛出HTTP异常
         raise
     except Exception as e:
-        print(f"❌ CSV导入异常: {str(e)}")
+        logger.error("❌ CSV导入异常: %s", e)
         error_detail = str(e)
         if "CSV解析失败" in error_detail:
             raise HTTPException(status_code=400, detail=error_detail)
@@ -101,28 +153,33 @@ async def import_txt_data(
         raise HTTPException(status_code=400, detail="文件必须是TXT格式")
     
     # 验证文件大小 (限制50MB)
-    if file.size and file.size > 50 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="文件大小不能超过50MB")
+    if file.size and file.size > TXT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="文件大小不能超过50MB")
     
     try:
-        # 读取文件内容
-        content = await file.read()
+        # 不整体读入内存，直接按流处理已落盘的上传文件
+        size = _upload_size(file)
         
         # 验证文件内容不为空
-        if not content:
+        if not size:
             raise HTTPException(status_code=400, detail="文件内容为空")
         
-        # 验证文件大小（实际读取后）
-        if len(content) > 50 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="文件内容超过50MB限制")
+        # 验证文件实际大小
+        if size > TXT_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="文件内容超过50MB限制")
         
-        print(f"📄 开始处理TXT文件: {file.filename}, 大小: {len(content)} bytes")
+        logger.info("📄 开始处理TXT文件: %s, 大小: %d bytes", file.filename, size)
+        
+        # 在线程池中计算内容哈希，相同内容已导入时服务层直接返回
+        file_sha256 = await asyncio.to_thread(_hash_upload, file)
         
         # 使用数据导入服务处理文件
         import_service = DataImportService(db)
-        result = await import_service.import_txt_data(content, file.filename, allow_overwrite)
+        result = await import_service.import_txt_data(
+            file.file, file.filename, allow_overwrite, file_sha256=file_sha256
+        )
         
-        print(f"✅ TXT处理完成: 导入{result.get('imported_records', 0)}条, 跳过{result.get('skipped_records', 0)}条")
+        logger.info("✅ TXT处理完成: 导入%s条, 跳过%s条", result.get('imported_records', 0), result.get('skipped_records', 0))
         
         if result.get("already_exists"):
             return {
@@ -148,7 +205,7 @@ async def import_txt_data(
         # 重新抛出HTTP异常
         raise
     except Exception as e:
-        print(f"❌ TXT导入异常: {str(e)}")
+        logger.error("❌ TXT导入异常: %s", e)
         error_detail = str(e)
         if "TXT解析失败" in error_detail:
             raise HTTPException(status_code=400, detail=error_detail)
@@ -156,88 +213,156 @@ async def import_txt_data(
             raise HTTPException(status_code=500, detail=f"导入失败: {error_detail}")
 
 
-@router.post("/calculate-rankings")
-def calculate_rankings(
+def _run_ranking_calculation(task_id: str, trade_date: date):
+    """
+    后台执行排名计算；请求会话在响应后即关闭，这里使用独立会话
+
+    计算过程是同步的数据库和 numpy 操作，定义为普通函数由线程池执行，不阻塞事件循环
+    """
+    ranking_progress.update(
+        task_id,
+        status="running",
+        start_time=datetime.now().isoformat()
+    )
+    db = SessionLocal()
+    try:
+        calculator = RankingCalculatorService(db)
+        result = asyncio.run(calculator.calculate_daily_rankings(trade_date))
+        ranking_progress.update(
+            task_id,
+            status="completed",
+            result=result,
+            end_time=datetime.now().isoformat()
+        )
+    except Exception as e:
+        logger.error("后台排名计算失败 %s: %s", trade_date, e)
+        db.rollback()
+        ranking_progress.update(
+            task_id,
+            status="failed",
+            error=str(e),
+            end_time=datetime.now().isoformat()
+        )
+    finally:
+        db.close()
+
+
+@router.post("/calculate-rankings", status_code=202)
+async def calculate_rankings(
     trade_date: str,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks
 ):
-    """计算指定日期的排名和概念总和"""
+    """提交指定日期的排名计算任务，立即返回任务ID，计算在后台执行"""
     try:
-        # 使用排名计算服务
-        calculator = RankingCalculatorService(db)
-        result = calculator.calculate_daily_rankings(trade_date)
-        
+        parsed_date = parse_date(trade_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式错误，应为 YYYY-MM-DD")
+
+    try:
+        task_id = f"rankings_{parsed_date.strftime('%Y%m%d')}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        ranking_progress.create(task_id, {
+            "status": "pending",
+            "trade_date": parsed_date.isoformat(),
+            "created_at": datetime.now().isoformat()
+        })
+
+        background_tasks.add_task(_run_ranking_calculation, task_id, parsed_date)
+
         return {
-            "message": "排名计算完成",
-            "trade_date": trade_date,
-            "processed_concepts": result["processed_concepts"],
-            "total_rankings": result["total_rankings"],
-            "new_highs_found": result["new_highs_found"]
+            "message": "排名计算任务已提交",
+            "task_id": task_id,
+            "trade_date": parsed_date.isoformat(),
+            "status_url": f"/api/v1/data/calculate-rankings/{task_id}"
         }
-        
+
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"计算失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"提交计算任务失败: {str(e)}")
 
 
-@router.get("/import-history")
-def get_import_history(
+@router.get("/calculate-rankings/{task_id}")
+async def get_ranking_task_status(task_id: str):
+    """查询排名计算任务状态"""
+    progress = ranking_progress.get(task_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+
+    return {"task_id": task_id, **progress}
+
+
+def _import_record_to_dict(record: DataImportRecord) -> dict:
+    """导入记录转为返回字典（日期字段保持原生类型，由 orjson 序列化）"""
+    return {
+        "id": record.id,
+        "import_date": record.import_date,
+        "import_type": record.import_type,
+        "file_name": record.file_name,
+        "imported_records": record.imported_records,
+        "skipped_records": record.skipped_records,
+        "import_status": record.import_status,
+        "error_message": record.error_message,
+        "created_at": record.created_at,
+        "updated_at": record.updated_at
+    }
+
+
+@router.get("/import-history", response_class=ORJSONResponse)
+async def get_import_history(
     import_date: Optional[str] = Query(None, description="查询指定日期的导入记录 (YYYY-MM-DD)"),
     limit: int = Query(10, description="返回记录数量限制"),
-    db: Session = Depends(get_db)
+    response_format: str = Query("json", alias="format", pattern="^(json|ndjson)$",
+                                 description="返回格式：json 或 ndjson（逐行流式返回，适合大 limit）"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取数据导入历史记录"""
+    """
+    获取数据导入历史记录
+    
+    format=ndjson 时使用服务端游标分批读取，每行一条记录，内存占用不随 limit 增长
+    """
     try:
-        query = db.query(DataImportRecord)
+        stmt = select(DataImportRecord)
         
         if import_date:
             try:
-                query_date = datetime.strptime(import_date, '%Y-%m-%d').date()
-                query = query.filter(DataImportRecord.import_date == query_date)
+                query_date = parse_date(import_date)
+                stmt = stmt.where(DataImportRecord.import_date == query_date)
             except ValueError:
                 raise HTTPException(status_code=400, detail="日期格式错误，应为 YYYY-MM-DD")
         
-        records = query.order_by(DataImportRecord.created_at.desc()).limit(limit).all()
+        stmt = stmt.order_by(DataImportRecord.created_at.desc()).limit(limit)
         
-        result = []
-        for record in records:
-            result.append({
-                "id": record.id,
-                "import_date": record.import_date.isoformat(),
-                "import_type": record.import_type,
-                "file_name": record.file_name,
-                "imported_records": record.imported_records,
-                "skipped_records": record.skipped_records,
-                "import_status": record.import_status,
-                "error_message": record.error_message,
-                "created_at": record.created_at.isoformat(),
-                "updated_at": record.updated_at.isoformat()
-            })
+        if response_format == "ndjson":
+            async def iter_records():
+                result = await db.stream_scalars(stmt.execution_options(yield_per=200))
+                async for record in result:
+                    yield orjson.dumps(_import_record_to_dict(record)) + b"\n"
+            
+            return StreamingResponse(iter_records(), media_type="application/x-ndjson")
         
-        return {
+        records = (await db.execute(stmt)).scalars().all()
+        result = [_import_record_to_dict(record) for record in records]
+        
+        return ORJSONResponse({
             "records": result,
             "total": len(result)
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
 
 
 @router.get("/import-status/{import_date}")
-def check_import_status(
+async def check_import_status(
     import_date: str,
-    db: Session = Depends(get_db)
+    detailed: bool = Query(True, description="是否返回导入记录详情，为 false 时只检查是否已导入"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """检查指定日期的导入状态"""
     try:
         try:
-            query_date = datetime.strptime(import_date, '%Y-%m-%d').date()
+            query_date = parse_date(import_date)
         except ValueError:
             raise HTTPException(status_code=400, detail="日期格式错误，应为 YYYY-MM-DD")
         
-        records = db.query(DataImportRecord).filter(
-            DataImportRecord.import_date == query_date
-        ).all()
-        
         status = {
             "import_date": import_date,
             "csv_imported": False,
@@ -246,6 +371,25 @@ def check_import_status(
             "txt_record": None
         }
         
+        if not detailed:
+            # 只判断是否存在，按 (日期, 类型) 索引分组，不加载记录
+            imported_types = (await db.execute(
+                select(DataImportRecord.import_type).where(
+                    DataImportRecord.import_date == query_date,
+                    DataImportRecord.import_type.in_(['csv', 'txt'])
+                ).group_by(DataImportRecord.import_type)
+            )).scalars().all()
+            status["csv_imported"] = 'csv' in imported_types
+            status["txt_imported"] = 'txt' in imported_types
+            return status
+        
+        records = (await db.execute(
+            select(DataImportRecord).where(
+                DataImportRecord.import_date == query_date,
+                DataImportRecord.import_type.in_(['csv', 'txt'])
+            )
+        )).scalars().all()
+        
         for record in records:
             record_data = {
                 "id": record.id,
@@ -292,43 +436,59 @@ async def import_daily_batch(
         raise HTTPException(status_code=400, detail="第二个文件必须是TXT格式")
     
     # 验证文件大小
-    if csv_file.size and csv_file.size > 100 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="CSV文件不能超过100MB")
+    if csv_file.size and csv_file.size > CSV_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="CSV文件不能超过100MB")
     
-    if txt_file.size and txt_file.size > 50 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="TXT文件不能超过50MB")
+    if txt_file.size and txt_file.size > TXT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="TXT文件不能超过50MB")
     
     try:
         # 解析交易日期
         parsed_trade_date = None
         if trade_date:
             try:
-                parsed_trade_date = datetime.strptime(trade_date, '%Y-%m-%d').date()
+                parsed_trade_date = parse_date(trade_date)
             except ValueError:
                 raise HTTPException(status_code=400, detail="日期格式错误，应为 YYYY-MM-DD")
         
-        # 读取文件内容
-        csv_content = await csv_file.read()
-        txt_content = await txt_file.read()
+        # 不整体读入内存，直接按流处理已落盘的上传文件
+        csv_size = _upload_size(csv_file)
+        txt_size = _upload_size(txt_file)
         
         # 验证文件内容不为空
-        if not csv_content:
+        if not csv_size:
             raise HTTPException(status_code=400, detail="CSV文件内容为空")
         
-        if not txt_content:
+        if not txt_size:
             raise HTTPException(status_code=400, detail="TXT文件内容为空")
         
-        print(f"📄 开始批量导入: CSV({csv_file.filename}, {len(csv_content)} bytes) + TXT({txt_file.filename}, {len(txt_content)} bytes)")
+        if csv_size > CSV_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="CSV文件不能超过100MB")
+        
+        if txt_size > TXT_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="TXT文件不能超过50MB")
+        
+        logger.info(
+            "📄 开始批量导入: CSV(%s, %d bytes) + TXT(%s, %d bytes)",
+            csv_file.filename, csv_size, txt_file.filename, txt_size
+        )
+        
+        # 并行计算两个文件的内容哈希
+        csv_sha256, txt_sha256 = await asyncio.gather(
+            asyncio.to_thread(_hash_upload, csv_file),
+            asyncio.to_thread(_hash_upload, txt_file)
+        )
         
         # 使用数据导入服务处理批量导入
         import_service = DataImportService(db)
         result = await import_service.import_daily_batch(
-            csv_content, csv_file.filename,
-            txt_content, txt_file.filename,
-            parsed_trade_date, allow_overwrite
+            csv_file.file, csv_file.filename,
+            txt_file.file, txt_file.filename,
+            parsed_trade_date, allow_overwrite,
+            csv_sha256=csv_sha256, txt_sha256=txt_sha256
         )
         
-        print(f"✅ 批量导入完成: {result['message']}")
+        logger.info("✅ 批量导入完成: %s", result['message'])
         
         return {
             "message": result["message"],
@@ -344,7 +504,7 @@ async def import_daily_batch(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ 批量导入异常: {str(e)}")
+        logger.error("❌ 批量导入异常: %s", e)
         raise HTTPException(status_code=500, detail=f"批量导入失败: {str(e)}")
 
 
@@ -359,7 +519,7 @@ def check_import_completeness(
     """
     try:
         try:
-            parsed_date = datetime.strptime(trade_date, '%Y-%m-%d').date()
+            parsed_date = parse_date(trade_date)
         except ValueError:
             raise HTTPException(status_code=400, detail="日期格式错误，应为 YYYY-MM-DD")
         
@@ -376,20 +536,20 @@ def check_import_completeness(
 
 @router.post("/auto-extract-date")
 async def auto_extract_date_from_files(
-    csv_file: UploadFile = File(...),
-    txt_file: UploadFile = File(...),
+    csv_filename: str = Form(..., description="CSV文件名"),
+    txt_filename: str = Form(..., description="TXT文件名"),
     db: Session = Depends(get_db)
 ):
     """
     从文件名自动提取日期信息
-    用于前端预览将要导入的日期
+    用于前端预览将要导入的日期，只需提交文件名，无需上传文件内容
     """
     try:
         import_service = DataImportService(db)
         
         # 从CSV文件名提取日期
-        csv_date = import_service._extract_date_from_filename(csv_file.filename or "")
-        txt_date = import_service._extract_date_from_filename(txt_file.filename or "")
+        csv_date = import_service._extract_date_from_filename(csv_filename)
+        txt_date = import_service._extract_date_from_filename(txt_filename)
         
         # 选择最合适的日期
         extracted_date = csv_date or txt_date or date.today()
@@ -398,8 +558,8 @@ async def auto_extract_date_from_files(
         completeness = import_service.check_daily_import_completeness(extracted_date)
         
         return {
-            "csv_filename": csv_file.filename,
-            "txt_filename": txt_file.filename,
+            "csv_filename": csv_filename,
+            "txt_filename": txt_filename,
             "csv_extracted_date": csv_date.isoformat() if csv_date else None,
             "txt_extracted_date": txt_date.isoformat() if txt_date else None,
             "recommended_date": extracted_date.isoformat(),
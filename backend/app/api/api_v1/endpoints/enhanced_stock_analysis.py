@@ -4,22 +4,26 @@
 
 from typing import List, Dict, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, text
+from sqlalchemy import func, desc, text, and_
 from app.core.database import get_db
-from app.models.daily_trading import DailyTrading, ConceptDailySummary, StockConceptRanking
+from app.core.dates import parse_date
+from app.models.daily_trading import DailyTrading, ConceptDailySummary, StockConceptRanking, CODE_FORMAT_LABELS
 from app.models.stock import Stock
 from app.models.concept import Concept
 from app.core.admin_auth import get_current_admin_user
 from app.models.admin_user import AdminUser
-from datetime import date, datetime
+from app.services.txt_import import get_latest_trading_date
+from app.core.redis_cache import cache as redis_cache, CacheKeys, CacheExpiry
+from datetime import date
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/market-distribution")
+@router.get("/market-distribution", response_class=ORJSONResponse)
 async def get_market_distribution(
     trading_date: Optional[str] = Query(None, description="交易日期 YYYY-MM-DD"),
     db: Session = Depends(get_db),
@@ -29,18 +33,20 @@ async def get_market_distribution(
     try:
         # 解析交易日期
         if trading_date:
-            parsed_date = datetime.strptime(trading_date, '%Y-%m-%d').date()
+            parsed_date = parse_date(trading_date)
         else:
             # 获取最新日期
-            latest_date = db.query(DailyTrading.trading_date).order_by(
-                DailyTrading.trading_date.desc()
-            ).first()
-            parsed_date = latest_date[0] if latest_date else date.today()
+            parsed_date = get_latest_trading_date(db) or date.today()
         
-        # 按市场前缀分组统计
+        # 按交易日期缓存统计结果（交易数据写入后主动失效）
+        cache_key = CacheKeys.MARKET_DISTRIBUTION.format(trading_date=parsed_date.isoformat())
+        cached_result = redis_cache.get(cache_key)
+        if cached_result is not None:
+            return ORJSONResponse(cached_result)
+        
+        # 按市场前缀分组统计（market_prefix 为生成列，(trading_date, market_prefix, trading_volume) 索引可覆盖查询）
         market_stats = db.query(
-            # 从 original_stock_code 中提取前缀
-            func.substring(DailyTrading.original_stock_code, 1, 2).label('market_prefix'),
+            DailyTrading.market_prefix,
             func.count(DailyTrading.id).label('stock_count'),
             func.sum(DailyTrading.trading_volume).label('total_volume'),
             func.avg(DailyTrading.trading_volume).label('avg_volume'),
@@ -48,9 +54,20 @@ async def get_market_distribution(
         ).filter(
             DailyTrading.trading_date == parsed_date
         ).group_by(
-            func.substring(DailyTrading.original_stock_code, 1, 2)
+            DailyTrading.market_prefix
+        ).order_by(
+            desc('total_volume')
         ).all()
         
+        # 全市场汇总直接由数据库聚合
+        total_stocks, total_volume = db.query(
+            func.count(DailyTrading.id),
+            func.coalesce(func.sum(DailyTrading.trading_volume), 0)
+        ).filter(
+            DailyTrading.trading_date == parsed_date
+        ).one()
+        total_volume = int(total_volume)
+        
         result = []
         market_mapping = {
             'SH': '上海交易所',
@@ -74,19 +91,18 @@ async def get_market_distribution(
                 'max_volume': stat.max_volume if stat.max_volume else 0
             })
         
-        # 按总交易量排序
-        result.sort(key=lambda x: x['total_volume'], reverse=True)
-        
-        return {
+        response = {
             'trading_date': parsed_date.strftime('%Y-%m-%d'),
             'market_distribution': result,
             'total_markets': len(result),
             'summary': {
-                'total_stocks': sum(r['stock_count'] for r in result),
-                'total_volume': sum(r['total_volume'] for r in result),
-                'avg_volume_all': round(sum(r['total_volume'] for r in result) / sum(r['stock_count'] for r in result), 2) if sum(r['stock_count'] for r in result) > 0 else 0
+                'total_stocks': total_stocks,
+                'total_volume': total_volume,
+                'avg_volume_all': round(total_volume / total_stocks, 2) if total_stocks > 0 else 0
             }
         }
+        redis_cache.set(cache_key, response, CacheExpiry.HOUR_1)
+        return ORJSONResponse(response)
         
     except Exception as e:
         logger.error(f"获取市场分布失败: {str(e)}")
@@ -105,12 +121,9 @@ async def search_by_prefix(
     try:
         # 解析交易日期
         if trading_date:
-            parsed_date = datetime.strptime(trading_date, '%Y-%m-%d').date()
+            parsed_date = parse_date(trading_date)
         else:
-            latest_date = db.query(DailyTrading.trading_date).order_by(
-                DailyTrading.trading_date.desc()
-            ).first()
-            parsed_date = latest_date[0] if latest_date else date.today()
+            parsed_date = get_latest_trading_date(db) or date.today()
         
         # 构建查询
         query = db.query(
@@ -155,7 +168,7 @@ async def search_by_prefix(
         logger.error(f"按前缀搜索失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"搜索失败: {str(e)}")
 
-@router.get("/code-format-analysis")
+@router.get("/code-format-analysis", response_class=ORJSONResponse)
 async def analyze_code_formats(
     trading_date: Optional[str] = Query(None, description="交易日期 YYYY-MM-DD"),
     db: Session = Depends(get_db),
@@ -165,32 +178,30 @@ async def analyze_code_formats(
     try:
         # 解析交易日期
         if trading_date:
-            parsed_date = datetime.strptime(trading_date, '%Y-%m-%d').date()
+            parsed_date = parse_date(trading_date)
         else:
-            latest_date = db.query(DailyTrading.trading_date).order_by(
-                DailyTrading.trading_date.desc()
-            ).first()
-            parsed_date = latest_date[0] if latest_date else date.today()
-        
-        # 分析原始代码格式
-        format_stats = db.execute(text("""
-            SELECT 
-                CASE 
-                    WHEN original_stock_code LIKE 'SH%' THEN 'SH前缀'
-                    WHEN original_stock_code LIKE 'SZ%' THEN 'SZ前缀'
-                    WHEN original_stock_code LIKE 'BJ%' THEN 'BJ前缀'
-                    WHEN original_stock_code REGEXP '^[0-9]{6}$' THEN '纯数字6位'
-                    ELSE '其他格式'
-                END as code_format,
-                COUNT(*) as count,
-                SUM(trading_volume) as total_volume,
-                AVG(trading_volume) as avg_volume,
-                MIN(original_stock_code) as sample_code
-            FROM daily_trading 
-            WHERE trading_date = :trading_date
-            GROUP BY code_format
-            ORDER BY count DESC
-        """), {'trading_date': parsed_date}).fetchall()
+            parsed_date = get_latest_trading_date(db) or date.today()
+        
+        # 按交易日期缓存统计结果（交易数据写入后主动失效）
+        cache_key = CacheKeys.CODE_FORMAT_ANALYSIS.format(trading_date=parsed_date.isoformat())
+        cached_result = redis_cache.get(cache_key)
+        if cached_result is not None:
+            return ORJSONResponse(cached_result)
+        
+        # 按代码格式分组统计（code_format 为写入时计算的生成列，按 (trading_date, code_format, trading_volume) 索引分组）
+        format_stats = db.query(
+            DailyTrading.code_format,
+            func.count(DailyTrading.id).label('count'),
+            func.sum(DailyTrading.trading_volume).label('total_volume'),
+            func.avg(DailyTrading.trading_volume).label('avg_volume'),
+            func.min(DailyTrading.original_stock_code).label('sample_code')
+        ).filter(
+            DailyTrading.trading_date == parsed_date
+        ).group_by(
+            DailyTrading.code_format
+        ).order_by(
+            desc('count')
+        ).all()
         
         formats = []
         total_count = 0
@@ -201,7 +212,7 @@ async def analyze_code_formats(
             volume = int(row.total_volume) if row.total_volume else 0
             
             formats.append({
-                'format_type': row.code_format,
+                'format_type': CODE_FORMAT_LABELS.get(row.code_format, CODE_FORMAT_LABELS[0]),
                 'stock_count': count,
                 'total_volume': volume,
                 'avg_volume': round(float(row.avg_volume), 2) if row.avg_volume else 0,
@@ -218,7 +229,7 @@ async def analyze_code_formats(
                 (format_info['stock_count'] / total_count * 100), 2
             ) if total_count > 0 else 0
         
-        return {
+        response = {
             'trading_date': parsed_date.strftime('%Y-%m-%d'),
             'code_formats': formats,
             'summary': {
@@ -227,12 +238,14 @@ async def analyze_code_formats(
                 'avg_volume': round(total_volume / total_count, 2) if total_count > 0 else 0
             }
         }
+        redis_cache.set(cache_key, response, CacheExpiry.HOUR_1)
+        return ORJSONResponse(response)
         
     except Exception as e:
         logger.error(f"代码格式分析失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
 
-@router.get("/dual-code-query/{stock_identifier}")
+@router.get("/dual-code-query/{stock_identifier}", response_class=ORJSONResponse)
 async def query_by_dual_code(
     stock_identifier: str,
     trading_date: Optional[str] = Query(None, description="交易日期 YYYY-MM-DD"),
@@ -247,30 +260,46 @@ async def query_by_dual_code(
     try:
         # 解析交易日期
         if trading_date:
-            parsed_date = datetime.strptime(trading_date, '%Y-%m-%d').date()
+            parsed_date = parse_date(trading_date)
         else:
-            latest_date = db.query(DailyTrading.trading_date).order_by(
-                DailyTrading.trading_date.desc()
-            ).first()
-            parsed_date = latest_date[0] if latest_date else date.today()
-        
-        # 尝试按原始代码和标准化代码查询
-        trading_record = db.query(DailyTrading).filter(
-            (DailyTrading.original_stock_code == stock_identifier.upper()) |
-            (DailyTrading.normalized_stock_code == stock_identifier),
-            DailyTrading.trading_date == parsed_date
-        ).first()
+            parsed_date = get_latest_trading_date(db) or date.today()
+        
+        # 交易记录、股票信息、概念排名通过外连接一次取回
+        entities = [DailyTrading, Stock]
+        if include_concepts:
+            entities.append(StockConceptRanking)
+        
+        base_query = db.query(*entities).outerjoin(
+            Stock, Stock.stock_code == DailyTrading.normalized_stock_code
+        )
+        if include_concepts:
+            base_query = base_query.outerjoin(
+                StockConceptRanking, and_(
+                    StockConceptRanking.stock_code == DailyTrading.normalized_stock_code,
+                    StockConceptRanking.trading_date == DailyTrading.trading_date
+                )
+            )
         
-        if not trading_record:
+        # 先按原始代码、再按标准化代码查询
+        # 拆成两次走 (trading_date, code) 复合索引的等值查找，避免 OR 条件导致索引失效
+        rows = base_query.filter(
+            DailyTrading.trading_date == parsed_date,
+            DailyTrading.original_stock_code == stock_identifier.upper()
+        ).all()
+        
+        if not rows:
+            rows = base_query.filter(
+                DailyTrading.trading_date == parsed_date,
+                DailyTrading.normalized_stock_code == stock_identifier
+            ).all()
+        
+        if not rows:
             raise HTTPException(
                 status_code=404, 
                 detail=f"未找到股票代码 {stock_identifier} 在 {parsed_date} 的交易数据"
             )
         
-        # 获取股票基础信息
-        stock = db.query(Stock).filter(
-            Stock.stock_code == trading_record.normalized_stock_code
-        ).first()
+        trading_record, stock = rows[0][0], rows[0][1]
         
         result = {
             'stock_info': {
@@ -280,7 +309,7 @@ async def query_by_dual_code(
                 'industry': stock.industry if stock else None,
             },
             'trading_data': {
-                'trading_date': parsed_date.strftime('%Y-%m-%d'),
+                'trading_date': parsed_date,
                 'trading_volume': trading_record.trading_volume,
             },
             'query_matched_by': 'original_code' if stock_identifier.upper() == trading_record.original_stock_code else 'normalized_code'
@@ -288,10 +317,10 @@ async def query_by_dual_code(
         
         # 可选：包含概念信息
         if include_concepts:
-            concept_rankings = db.query(StockConceptRanking).filter(
-                StockConceptRanking.stock_code == trading_record.normalized_stock_code,
-                StockConceptRanking.trading_date == parsed_date
-            ).all()
+            concept_rankings = [
+                row[2] for row in rows
+                if row[0].id == trading_record.id and row[2] is not None
+            ]
             
             concepts = []
             for ranking in concept_rankings:
@@ -305,7 +334,8 @@ async def query_by_dual_code(
             result['concepts'] = concepts
             result['concept_count'] = len(concepts)
         
-        return result
+        # 直接返回 ORJSONResponse，跳过 jsonable_encoder，日期由 orjson 原生序列化
+        return ORJSONResponse(result)
         
     except HTTPException:
         raise
@@ -320,37 +350,26 @@ async def get_migration_status(
 ):
     """检查数据迁移状态"""
     try:
-        # 统计总记录数和已迁移记录数
-        total_records = db.query(DailyTrading).count()
-        
-        migrated_records = db.query(DailyTrading).filter(
-            DailyTrading.original_stock_code.isnot(None),
-            DailyTrading.original_stock_code != '',
-            DailyTrading.normalized_stock_code.isnot(None),
-            DailyTrading.normalized_stock_code != ''
-        ).count()
-        
-        # 统计各种代码格式
-        code_stats = db.execute(text("""
-            SELECT 
-                'total' as category,
-                COUNT(*) as count
+        # 单次扫描完成所有统计（条件聚合，替代多次 COUNT 与 UNION ALL）
+        counts = db.execute(text("""
+            SELECT
+                COUNT(*) AS total,
+                COALESCE(SUM(original_stock_code IS NOT NULL AND original_stock_code != ''), 0) AS with_original,
+                COALESCE(SUM(normalized_stock_code IS NOT NULL AND normalized_stock_code != ''), 0) AS with_normalized,
+                COALESCE(SUM(
+                    original_stock_code IS NOT NULL AND original_stock_code != ''
+                    AND normalized_stock_code IS NOT NULL AND normalized_stock_code != ''
+                ), 0) AS migrated
             FROM daily_trading
-            UNION ALL
-            SELECT 
-                'with_original' as category,
-                COUNT(*) as count
-            FROM daily_trading 
-            WHERE original_stock_code IS NOT NULL AND original_stock_code != ''
-            UNION ALL
-            SELECT 
-                'with_normalized' as category,
-                COUNT(*) as count
-            FROM daily_trading 
-            WHERE normalized_stock_code IS NOT NULL AND normalized_stock_code != ''
-        """)).fetchall()
-        
-        stats = {row.category: row.count for row in code_stats}
+        """)).one()
+        
+        total_records = int(counts.total)
+        migrated_records = int(counts.migrated)
+        stats = {
+            'total': total_records,
+            'with_original': int(counts.with_original),
+            'with_normalized': int(counts.with_normalized),
+        }
         
         # 计算完成率
         migration_rate = (migrated_records / total_records * 100) if total_records > 0 else 0
@@ -1,22 +1,183 @@
-from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, BackgroundTasks
+from typing import List, Dict, Any, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, BackgroundTasks, Request
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.services.historical_txt_import import HistoricalTxtImportService
 from app.core.admin_auth import get_current_admin_user
+from app.core.etag import make_etag, etag_matches, not_modified
+from app.core.progress_store import ProgressStore
+from app.core.txt_upload import DecompressedSizeExceeded, GzipStreamDecoder, is_gzip_file, is_txt_upload
 from app.models.admin_user import AdminUser
 from datetime import date, datetime
 import logging
 import asyncio
-from fastapi.responses import StreamingResponse
-import json
+import os
+import shutil
+import tempfile
+import time
+from collections import deque
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import orjson
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# 全局进度存储 (生产环境建议使用Redis)
-import_progress = {}
+# 导入进度存储（Redis 哈希，过期自动清理，多个 worker 共享）
+import_progress = ProgressStore("historical_import", owner_field="imported_by")
+
+# 上传文件落盘时每次复制的块大小
+UPLOAD_COPY_CHUNK_SIZE = 1024 * 1024
+
+# 导入进度写入的最小间隔（秒），间隔内的回调只更新内存中的计数
+PROGRESS_FLUSH_INTERVAL = 0.25
+
+# 进度中保留的最近成功/失败日期数量，完整结果见任务的 result
+RECENT_DATES_LIMIT = 50
+
+# 预览时每次读取的块大小，以及最多读取的字节数
+PREVIEW_READ_CHUNK_SIZE = 256 * 1024
+PREVIEW_MAX_BYTES = 8 * 1024 * 1024
+
+# 等待进度期间定期发送 SSE 注释行，防止代理断开空闲连接
+SSE_KEEPALIVE_INTERVAL = 15
+SSE_KEEPALIVE_FRAME = b": keepalive\n\n"
+
+# 进度查询响应每次都需向服务器验证 ETag，未变化时返回 304
+PROGRESS_CACHE_CONTROL = "no-cache"
+
+
+def _save_upload_to_temp(file: UploadFile) -> str:
+    """
+    将上传文件按块复制到临时文件并返回路径，不把整个文件读入内存
+
+    gzip 压缩的文件边复制边解压，临时文件始终为解压后的 TXT；
+    解压后超过大小上限返回 413，压缩数据不完整返回 400
+    """
+    temp_fd, temp_path = tempfile.mkstemp(suffix='.txt', prefix='historical_upload_')
+    try:
+        with os.fdopen(temp_fd, 'wb') as temp_file:
+            if is_gzip_file(file.file):
+                decoder = GzipStreamDecoder()
+                try:
+                    while chunk := file.file.read(UPLOAD_COPY_CHUNK_SIZE):
+                        for piece in decoder.decompress(chunk):
+                            temp_file.write(piece)
+                except DecompressedSizeExceeded as e:
+                    raise HTTPException(status_code=413, detail=str(e))
+                if not decoder.eof:
+                    raise HTTPException(status_code=400, detail="压缩文件不完整")
+            else:
+                shutil.copyfileobj(file.file, temp_file, UPLOAD_COPY_CHUNK_SIZE)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+
+async def _read_preview_head(file: UploadFile, preview_lines: int) -> Tuple[bytes, bool, int]:
+    """
+    读取文件开头足够生成预览的内容，gzip 压缩的文件边读边解压
+
+    Returns:
+        (内容, 是否已读到文件末尾, 已读取的上传字节数)；
+        未读完时截断到最后一个完整行，避免切断多字节字符
+    """
+    decoder = GzipStreamDecoder() if is_gzip_file(file.file) else None
+    buf = bytearray()
+    line_count = 0
+    bytes_read = 0
+    while line_count <= preview_lines and len(buf) < PREVIEW_MAX_BYTES:
+        chunk = await file.read(PREVIEW_READ_CHUNK_SIZE)
+        if not chunk:
+            return bytes(buf), True, bytes_read
+        bytes_read += len(chunk)
+        pieces = decoder.decompress(chunk) if decoder is not None else (chunk,)
+        for piece in pieces:
+            buf += piece
+            line_count += piece.count(b'\n')
+            # 解压后的内容已足够预览时不再继续解压，高压缩比的数据块不会整块展开
+            if line_count > preview_lines or len(buf) >= PREVIEW_MAX_BYTES:
+                break
+    return bytes(buf[:buf.rfind(b'\n') + 1]), False, bytes_read
+
+
+def _make_progress_callback(task_id: str):
+    """
+    创建导入进度回调（在导入线程中调用）
+
+    成功/失败日期只保留计数和最近若干个，写入进度存储按时间间隔合并，
+    最后一个日期处理完成时一定写入
+    """
+    completed_dates = deque(maxlen=RECENT_DATES_LIMIT)
+    failed_dates = deque(maxlen=RECENT_DATES_LIMIT)
+    state = {"completed": 0, "failed": 0, "last_flush": 0.0}
+
+    def progress_callback(current: int, total: int, date_str: str, status: str):
+        if status == "success":
+            completed_dates.append(date_str)
+            state["completed"] += 1
+        elif status == "failed":
+            failed_dates.append(date_str)
+            state["failed"] += 1
+
+        finished = current >= total and status != "processing"
+        now = time.monotonic()
+        if not finished and now - state["last_flush"] < PROGRESS_FLUSH_INTERVAL:
+            return
+        state["last_flush"] = now
+
+        fields = {
+            "current": current,
+            "total": total,
+            "current_date": date_str,
+            "completed_count": state["completed"],
+            "failed_count": state["failed"],
+            "completed_dates": list(completed_dates),
+            "failed_dates": list(failed_dates),
+            "last_update": datetime.now().isoformat()
+        }
+
+        # 如果完成了，更新最终状态
+        if finished:
+            fields["status"] = "completed"
+            fields["end_time"] = datetime.now().isoformat()
+
+        import_progress.update(task_id, **fields)
+
+    return progress_callback
+
+
+def _progress_delta(progress: Dict[str, Any], sent_counts: Dict[str, int]) -> Dict[str, Any]:
+    """
+    构造 SSE 中间帧：去掉最近日期列表，只携带自上一帧以来新增的成功/失败日期
+
+    sent_counts 记录已推送的计数，调用后更新为当前计数
+    """
+    frame = dict(progress)
+    for list_key, count_key, new_key in (
+        ("completed_dates", "completed_count", "new_completed_dates"),
+        ("failed_dates", "failed_count", "new_failed_dates"),
+    ):
+        dates = frame.pop(list_key, [])
+        count = frame.get(count_key, 0)
+        new_count = count - sent_counts.get(count_key, 0)
+        frame[new_key] = dates[-new_count:] if new_count > 0 else []
+        sent_counts[count_key] = count
+    return frame
+
+
+def _build_sse_frame(payload: Dict[str, Any]) -> bytes:
+    """构造 SSE 数据帧，直接返回字节，避免响应时再次编码"""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+def _remove_temp_file(temp_path: str) -> None:
+    """删除临时文件，文件不存在时忽略"""
+    try:
+        os.unlink(temp_path)
+    except OSError as e:
+        logger.warning("清理临时文件失败 %s: %s", temp_path, e)
 
 @router.post("/preview")
 async def preview_historical_file(
@@ -28,25 +189,31 @@ async def preview_historical_file(
     """预览历史TXT文件内容和导入信息"""
     try:
         # 验证文件类型
-        if not file.filename.endswith('.txt'):
-            raise HTTPException(status_code=400, detail="只支持TXT格式文件")
+        if not is_txt_upload(file.filename):
+            raise HTTPException(status_code=400, detail="只支持TXT或TXT.GZ格式文件")
 
-        # 读取文件内容
-        content = await file.read()
+        # 只读取预览所需的文件开头部分
+        content, reached_eof, bytes_read = await _read_preview_head(file, preview_lines)
         txt_content = content.decode('utf-8')
+        file_size = file.size if file.size is not None else bytes_read
+
+        # 未读完整个文件时，按已读部分每字节对应的行数估算总行数
+        estimated_total_lines = None
+        if not reached_eof and bytes_read:
+            estimated_total_lines = round(content.count(b'\n') * file_size / bytes_read)
 
         # 生成预览
         historical_service = HistoricalTxtImportService(db)
         preview_result = historical_service.get_historical_import_preview(
-            txt_content, preview_lines
+            txt_content, preview_lines, total_lines=estimated_total_lines
         )
 
         if preview_result["success"]:
             return {
                 "success": True,
                 "filename": file.filename,
-                "file_size": len(content),
-                "file_size_mb": round(len(content) / 1024 / 1024, 2),
+                "file_size": file_size,
+                "file_size_mb": round(file_size / 1024 / 1024, 2),
                 "preview": preview_result["preview"]
             }
         else:
@@ -55,7 +222,7 @@ async def preview_historical_file(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"预览历史文件时出错: {e}")
+        logger.error("预览历史文件时出错: %s", e)
         raise HTTPException(status_code=500, detail=f"预览失败: {str(e)}")
 
 @router.post("/import-sync")
@@ -67,101 +234,87 @@ async def import_historical_file_sync(
     """同步导入历史TXT文件（适用于中小型文件）"""
     try:
         # 验证文件类型
-        if not file.filename.endswith('.txt'):
-            raise HTTPException(status_code=400, detail="只支持TXT格式文件")
+        if not is_txt_upload(file.filename):
+            raise HTTPException(status_code=400, detail="只支持TXT或TXT.GZ格式文件")
 
-        # 读取文件内容
-        content = await file.read()
-        txt_content = content.decode('utf-8')
+        # 上传文件流式写入临时文件，服务按行读取
+        temp_path = await asyncio.to_thread(_save_upload_to_temp, file)
 
         # 执行导入
-        historical_service = HistoricalTxtImportService(db)
-        result = historical_service.import_historical_data(
-            txt_content=txt_content,
-            filename=file.filename,
-            imported_by=current_admin.username
-        )
+        try:
+            historical_service = HistoricalTxtImportService(db)
+            result = historical_service.import_historical_file(
+                file_path=temp_path,
+                filename=file.filename,
+                imported_by=current_admin.username
+            )
+        finally:
+            _remove_temp_file(temp_path)
 
         return result
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"同步导入历史文件时出错: {e}")
+        logger.error("同步导入历史文件时出错: %s", e)
         raise HTTPException(status_code=500, detail=f"导入失败: {str(e)}")
 
 @router.post("/import-async")
 async def import_historical_file_async(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
     current_admin: AdminUser = Depends(get_current_admin_user)
 ):
     """异步导入历史TXT文件（适用于大型文件）"""
     try:
         # 验证文件类型
-        if not file.filename.endswith('.txt'):
-            raise HTTPException(status_code=400, detail="只支持TXT格式文件")
+        if not is_txt_upload(file.filename):
+            raise HTTPException(status_code=400, detail="只支持TXT或TXT.GZ格式文件")
 
         # 生成任务ID
-        import datetime
-        task_id = f"historical_import_{current_admin.username}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        task_id = f"historical_import_{current_admin.username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
-        # 读取文件内容
-        content = await file.read()
-        txt_content = content.decode('utf-8')
+        # 上传文件流式写入临时文件，由后台任务读取并在结束后删除
+        temp_path = await asyncio.to_thread(_save_upload_to_temp, file)
 
         # 初始化进度
-        import_progress[task_id] = {
+        import_progress.create(task_id, {
             "status": "started",
             "current": 0,
             "total": 0,
             "current_date": "",
+            "completed_count": 0,
+            "failed_count": 0,
             "completed_dates": [],
             "failed_dates": [],
-            "start_time": datetime.datetime.now().isoformat(),
+            "start_time": datetime.now().isoformat(),
             "filename": file.filename,
             "imported_by": current_admin.username
-        }
-
-        # 定义进度回调函数
-        def progress_callback(current: int, total: int, date_str: str, status: str):
-            import_progress[task_id].update({
-                "current": current,
-                "total": total,
-                "current_date": date_str,
-                "last_update": datetime.datetime.now().isoformat()
-            })
+        })
+        progress_callback = _make_progress_callback(task_id)
 
-            if status == "success":
-                import_progress[task_id]["completed_dates"].append(date_str)
-            elif status == "failed":
-                import_progress[task_id]["failed_dates"].append(date_str)
-
-            # 如果完成了，更新最终状态
-            if current >= total:
-                import_progress[task_id]["status"] = "completed"
-                import_progress[task_id]["end_time"] = datetime.datetime.now().isoformat()
-
-        # 在后台任务中执行导入
+        # 在后台任务中执行导入，使用独立的数据库会话（请求结束后依赖注入的会话会被关闭）
         async def background_import():
+            db = SessionLocal()
             try:
                 historical_service = HistoricalTxtImportService(db)
-                result = await historical_service.import_historical_data_async(
-                    txt_content=txt_content,
+                result = await historical_service.import_historical_file_async(
+                    file_path=temp_path,
                     filename=file.filename,
                     imported_by=current_admin.username,
                     progress_callback=progress_callback
                 )
 
                 # 更新最终结果
-                import_progress[task_id]["result"] = result
-                import_progress[task_id]["status"] = "completed"
+                import_progress.update(task_id, result=result, status="completed")
 
             except Exception as e:
-                logger.error(f"后台导入任务失败: {e}")
-                import_progress[task_id]["status"] = "failed"
-                import_progress[task_id]["error"] = str(e)
+                logger.error("后台导入任务失败: %s", e)
+                db.rollback()
+                import_progress.update(task_id, status="failed", error=str(e))
+            finally:
+                db.close()
+                _remove_temp_file(temp_path)
 
         # 添加后台任务
         background_tasks.add_task(background_import)
@@ -176,29 +329,41 @@ async def import_historical_file_async(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"启动异步导入时出错: {e}")
+        logger.error("启动异步导入时出错: %s", e)
         raise HTTPException(status_code=500, detail=f"启动导入失败: {str(e)}")
 
-@router.get("/progress/{task_id}")
+@router.get("/progress/{task_id}", response_class=ORJSONResponse)
 async def get_import_progress(
     task_id: str,
+    request: Request,
     current_admin: AdminUser = Depends(get_current_admin_user)
 ):
-    """获取导入进度"""
-    if task_id not in import_progress:
-        raise HTTPException(status_code=404, detail="任务不存在")
+    """
+    获取导入进度
 
-    progress_info = import_progress[task_id]
+    ETag 由进度更新时间和状态生成，轮询时进度未变化则返回 304，不再序列化完整进度
+    """
+    progress_info = import_progress.get(task_id)
+    if progress_info is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
 
     # 检查权限（只能查看自己的任务）
     if progress_info.get("imported_by") != current_admin.username:
         raise HTTPException(status_code=403, detail="无权限查看此任务")
 
-    return {
-        "success": True,
-        "task_id": task_id,
-        "progress": progress_info
-    }
+    # 进度每次更新（包括最后写入 result/error）都会递增版本号
+    etag = make_etag(task_id, progress_info.get("version"))
+    if etag_matches(request, etag):
+        return not_modified(etag, PROGRESS_CACHE_CONTROL)
+
+    return ORJSONResponse(
+        {
+            "success": True,
+            "task_id": task_id,
+            "progress": progress_info
+        },
+        headers={"ETag": etag, "Cache-Control": PROGRESS_CACHE_CONTROL}
+    )
 
 @router.get("/progress/{task_id}/stream")
 async def stream_import_progress(
@@ -206,40 +371,48 @@ async def stream_import_progress(
     current_admin: AdminUser = Depends(get_current_admin_user)
 ):
     """流式获取导入进度（Server-Sent Events）"""
-    if task_id not in import_progress:
+    progress_info = import_progress.get(task_id)
+    if progress_info is None:
         raise HTTPException(status_code=404, detail="任务不存在")
 
-    progress_info = import_progress[task_id]
-
     # 检查权限
     if progress_info.get("imported_by") != current_admin.username:
         raise HTTPException(status_code=403, detail="无权限查看此任务")
 
     async def generate_progress_stream():
-        last_update = None
-
-        while True:
-            current_progress = import_progress.get(task_id, {})
-            current_update = current_progress.get("last_update")
-
-            # 只在有更新时发送数据
-            if current_update != last_update:
-                yield f"data: {json.dumps(current_progress)}\n\n"
-                last_update = current_update
-
-            # 如果任务完成，发送最终数据并结束
-            if current_progress.get("status") in ["completed", "failed"]:
-                break
-
-            await asyncio.sleep(1)  # 每秒检查一次
+        # 先订阅再读进度，读取之后发生的更新一定会唤醒等待
+        sent_counts = {}
+        async with import_progress.subscribe(task_id) as updates:
+            while True:
+                current_progress = import_progress.get(task_id)
+
+                # 任务记录已被清理或过期
+                if current_progress is None:
+                    break
+
+                # 如果任务完成，发送完整的最终数据并结束
+                if current_progress.get("status") in ["completed", "failed"]:
+                    yield _build_sse_frame(current_progress)
+                    break
+
+                # 中间帧只推送增量，帧大小不随导入日期数增长
+                yield _build_sse_frame(_progress_delta(current_progress, sent_counts))
+
+                # 等待下一次进度更新，超时只发送保活帧，不取消等待
+                update = asyncio.ensure_future(updates.wait())
+                try:
+                    while not (await asyncio.wait({update}, timeout=SSE_KEEPALIVE_INTERVAL))[0]:
+                        yield SSE_KEEPALIVE_FRAME
+                    update.result()
+                finally:
+                    update.cancel()
 
     return StreamingResponse(
         generate_progress_stream(),
-        media_type="text/plain",
+        media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Content-Type": "text/event-stream"
+            "Connection": "keep-alive"
         }
     )
 
@@ -249,38 +422,33 @@ async def clear_import_progress(
     current_admin: AdminUser = Depends(get_current_admin_user)
 ):
     """清理导入进度记录"""
-    if task_id not in import_progress:
+    progress_info = import_progress.get(task_id)
+    if progress_info is None:
         raise HTTPException(status_code=404, detail="任务不存在")
 
-    progress_info = import_progress[task_id]
-
     # 检查权限
     if progress_info.get("imported_by") != current_admin.username:
         raise HTTPException(status_code=403, detail="无权限删除此任务")
 
-    del import_progress[task_id]
+    import_progress.delete(task_id)
 
     return {
         "success": True,
         "message": f"任务 {task_id} 的进度记录已清理"
     }
 
-@router.get("/tasks")
+@router.get("/tasks", response_class=ORJSONResponse)
 async def list_import_tasks(
     current_admin: AdminUser = Depends(get_current_admin_user)
 ):
     """列出当前用户的所有导入任务"""
-    user_tasks = {
-        task_id: progress
-        for task_id, progress in import_progress.items()
-        if progress.get("imported_by") == current_admin.username
-    }
+    user_tasks = dict(import_progress.iter_owner_tasks(current_admin.username))
 
-    return {
+    return ORJSONResponse({
         "success": True,
         "tasks": user_tasks,
         "count": len(user_tasks)
-    }
+    })
 
 @router.post("/import-content")
 async def import_historical_content(
@@ -296,7 +464,7 @@ async def import_historical_content(
             raise HTTPException(status_code=400, detail="文件内容不能为空")
 
         # 判断数据规模，选择同步或异步处理
-        line_count = len(txt_content.split('\n'))
+        line_count = txt_content.count('\n') + 1
 
         if line_count <= 10000:  # 小于1万行使用同步处理
             historical_service = HistoricalTxtImportService(db)
@@ -308,33 +476,29 @@ async def import_historical_content(
             return result
         else:  # 大于1万行使用异步处理
             # 生成任务ID
-            import datetime
-            task_id = f"historical_content_{current_admin.username}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            task_id = f"historical_content_{current_admin.username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
             # 初始化进度
-            import_progress[task_id] = {
+            import_progress.create(task_id, {
                 "status": "started",
                 "current": 0,
                 "total": 0,
                 "current_date": "",
+                "completed_count": 0,
+                "failed_count": 0,
                 "completed_dates": [],
                 "failed_dates": [],
-                "start_time": datetime.datetime.now().isoformat(),
+                "start_time": datetime.now().isoformat(),
                 "filename": "uploaded_content.txt",
                 "imported_by": current_admin.username
-            }
+            })
+
+            progress_callback = _make_progress_callback(task_id)
 
-            # 异步处理
+            # 异步处理，使用独立的数据库会话
             async def background_import():
+                db = SessionLocal()
                 try:
-                    def progress_callback(current: int, total: int, date_str: str, status: str):
-                        import_progress[task_id].update({
-                            "current": current,
-                            "total": total,
-                            "current_date": date_str,
-                            "last_update": datetime.datetime.now().isoformat()
-                        })
-
                     historical_service = HistoricalTxtImportService(db)
                     result = await historical_service.import_historical_data_async(
                         txt_content=txt_content,
@@ -343,13 +507,14 @@ async def import_historical_content(
                         progress_callback=progress_callback
                     )
 
-                    import_progress[task_id]["result"] = result
-                    import_progress[task_id]["status"] = "completed"
+                    import_progress.update(task_id, result=result, status="completed")
 
                 except Exception as e:
-                    logger.error(f"内容导入任务失败: {e}")
-                    import_progress[task_id]["status"] = "failed"
-                    import_progress[task_id]["error"] = str(e)
+                    logger.error("内容导入任务失败: %s", e)
+                    db.rollback()
+                    import_progress.update(task_id, status="failed", error=str(e))
+                finally:
+                    db.close()
 
             background_tasks.add_task(background_import)
 
@@ -363,36 +528,5 @@ async def import_historical_content(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"导入历史内容时出错: {e}")
+        logger.error("导入历史内容时出错: %s", e)
         raise HTTPException(status_code=500, detail=f"导入失败: {str(e)}")
-
-# 定期清理超过24小时的进度记录
-@router.post("/cleanup-old-tasks")
-async def cleanup_old_tasks(
-    current_admin: AdminUser = Depends(get_current_admin_user)
-):
-    """清理超过24小时的旧任务记录"""
-    if current_admin.username != "admin":  # 只有管理员可以执行清理
-        raise HTTPException(status_code=403, detail="需要管理员权限")
-
-    from datetime import datetime, timedelta
-    cutoff_time = datetime.now() - timedelta(hours=24)
-
-    cleaned_count = 0
-    to_remove = []
-
-    for task_id, progress in import_progress.items():
-        start_time_str = progress.get("start_time")
-        if start_time_str:
-            start_time = datetime.fromisoformat(start_time_str)
-            if start_time < cutoff_time:
-                to_remove.append(task_id)
-
-    for task_id in to_remove:
-        del import_progress[task_id]
-        cleaned_count += 1
-
-    return {
-        "success": True,
-        "message": f"已清理 {cleaned_count} 个超过24小时的旧任务记录"
-    }
\ No newline at end of file
@@ -1,14 +1,19 @@
 from typing import Dict, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from fastapi.responses import ORJSONResponse
+from app.core.database import SessionLocal
 from app.services.chunked_upload_service import ChunkedUploadService, LargeFileImportService
 from app.core.admin_auth import get_current_admin_user
+from app.core.progress_store import ProgressStore
+from app.core.txt_upload import DecompressedSizeExceeded, GzipStreamDecoder, is_gzip_file, is_txt_upload
 from app.models.admin_user import AdminUser
+from datetime import datetime
 import logging
 import tempfile
 import os
+import time
 import hashlib
+import re
 import aiofiles
 
 logger = logging.getLogger(__name__)
@@ -18,8 +23,51 @@ router = APIRouter()
 # 全局服务实例
 chunked_service = ChunkedUploadService()
 
-# 全局进度存储
-upload_progress = {}
+# 上传文件落盘时每次读写的块大小，较大的块可减少线程池往返次数
+UPLOAD_WRITE_CHUNK_SIZE = 8 * 1024 * 1024
+
+# 导入进度写入的最小间隔（秒），解析阶段每读取一块文件就会回调一次
+PROGRESS_FLUSH_INTERVAL = 0.25
+
+# 上传和导入进度存储（Redis 哈希，过期自动清理，多个 worker 共享）
+upload_progress = ProgressStore("large_file_upload", owner_field="imported_by")
+
+# 已接收分块编号的集合名，完成判断以集合大小为准，重传同一分块不重复计数
+RECEIVED_CHUNKS = "received_chunks"
+
+# 分块上传声明的文件哈希须为 SHA-256 十六进制摘要，合并分块后据此校验文件
+SHA256_HEX_PATTERN = re.compile(r"^[0-9a-fA-F]{64}$")
+
+
+def _make_import_progress_callback(upload_id: str, update_status: bool = False):
+    """
+    创建大文件导入进度回调
+
+    同一阶段内的回调按时间间隔合并写入，阶段切换时立即写入；
+    update_status 为 True 时同时把当前阶段写入任务状态
+    """
+    state = {"stage": None, "last_flush": 0.0}
+
+    async def import_progress_callback(stage: str, progress: float, message: str):
+        now = time.monotonic()
+        if stage == state["stage"] and now - state["last_flush"] < PROGRESS_FLUSH_INTERVAL:
+            return
+        state["stage"] = stage
+        state["last_flush"] = now
+
+        fields = {
+            "import_stage": stage,
+            "import_progress": progress,
+            "import_message": message,
+            "last_update": datetime.now().isoformat()
+        }
+        if update_status and stage in ("parsing", "importing"):
+            fields["status"] = stage
+
+        upload_progress.update(upload_id, **fields)
+
+    return import_progress_callback
+
 
 @router.post("/check-file")
 async def check_large_file(
@@ -54,32 +102,37 @@ async def check_large_file(
         }
 
     except Exception as e:
-        logger.error(f"检查大文件时出错: {e}")
+        logger.error("检查大文件时出错: %s", e)
         raise HTTPException(status_code=500, detail=f"检查失败: {str(e)}")
 
 @router.post("/initiate-chunked-upload")
 async def initiate_chunked_upload(
     filename: str = Form(...),
     file_size: int = Form(...),
-    file_hash: str = Form(...),
+    file_hash: str = Form(..., description="文件内容 SHA-256（十六进制）"),
     current_admin: AdminUser = Depends(get_current_admin_user)
 ):
     """初始化分块上传"""
+    # 合并后按 SHA-256 校验文件，格式不对时在上传分块前拒绝
+    if not SHA256_HEX_PATTERN.match(file_hash):
+        raise HTTPException(status_code=400, detail="file_hash 须为文件内容的 SHA-256 十六进制摘要")
+
     try:
         result = await chunked_service.initiate_upload(filename, file_size, file_hash)
 
         # 初始化进度跟踪
         upload_id = result["upload_id"]
-        upload_progress[upload_id] = {
+        upload_progress.create(upload_id, {
             "status": "initiated",
             "filename": filename,
             "file_size": file_size,
             "uploaded_chunks": 0,
             "total_chunks": result["total_chunks"],
             "progress_percent": 0,
+            "file_hash": file_hash,
             "imported_by": current_admin.username,
-            "start_time": __import__('datetime').datetime.now().isoformat()
-        }
+            "start_time": datetime.now().isoformat()
+        })
 
         return {
             "success": True,
@@ -90,7 +143,7 @@ async def initiate_chunked_upload(
         }
 
     except Exception as e:
-        logger.error(f"初始化分块上传时出错: {e}")
+        logger.error("初始化分块上传时出错: %s", e)
         raise HTTPException(status_code=500, detail=f"初始化失败: {str(e)}")
 
 @router.post("/upload-chunk")
@@ -103,88 +156,85 @@ async def upload_chunk(
     """上传单个分块"""
     try:
         # 检查上传会话
-        if upload_id not in upload_progress:
+        progress_info = upload_progress.get(upload_id)
+        if progress_info is None:
             raise HTTPException(status_code=404, detail="上传会话不存在")
 
-        progress_info = upload_progress[upload_id]
-
         # 检查权限
         if progress_info["imported_by"] != current_admin.username:
             raise HTTPException(status_code=403, detail="无权限访问此上传")
 
-        # 读取分块数据
-        chunk_data = await chunk.read()
+        # 上传分块，直接从上传的临时文件复制到磁盘
+        result = await chunked_service.upload_chunk_from_stream(upload_id, chunk_number, chunk.file)
 
-        # 上传分块
-        result = await chunked_service.upload_chunk(upload_id, chunk_number, chunk_data)
-
-        # 更新进度
-        progress_info["uploaded_chunks"] += 1
-        progress_info["progress_percent"] = (progress_info["uploaded_chunks"] / progress_info["total_chunks"]) * 100
-        progress_info["last_update"] = __import__('datetime').datetime.now().isoformat()
+        # 更新进度（记录分块编号，并发上传多个分块时计数依然准确）
+        uploaded_chunks = upload_progress.add_to_set(upload_id, RECEIVED_CHUNKS, chunk_number)
+        progress_percent = (uploaded_chunks / progress_info["total_chunks"]) * 100
+        upload_progress.update(
+            upload_id,
+            uploaded_chunks=uploaded_chunks,
+            progress_percent=progress_percent,
+            last_update=datetime.now().isoformat()
+        )
 
         return {
             "success": True,
             "chunk_number": chunk_number,
-            "uploaded_chunks": progress_info["uploaded_chunks"],
+            "uploaded_chunks": uploaded_chunks,
             "total_chunks": progress_info["total_chunks"],
-            "progress_percent": progress_info["progress_percent"]
+            "progress_percent": progress_percent
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"上传分块时出错: {e}")
+        logger.error("上传分块时出错: %s", e)
         raise HTTPException(status_code=500, detail=f"上传分块失败: {str(e)}")
 
 @router.post("/complete-chunked-upload")
 async def complete_chunked_upload(
     background_tasks: BackgroundTasks,
     upload_id: str = Form(...),
-    db: Session = Depends(get_db),
     current_admin: AdminUser = Depends(get_current_admin_user)
 ):
     """完成分块上传并开始处理"""
     try:
         # 检查上传会话
-        if upload_id not in upload_progress:
+        progress_info = upload_progress.get(upload_id)
+        if progress_info is None:
             raise HTTPException(status_code=404, detail="上传会话不存在")
 
-        progress_info = upload_progress[upload_id]
-
         # 检查权限
         if progress_info["imported_by"] != current_admin.username:
             raise HTTPException(status_code=403, detail="无权限访问此上传")
 
         # 检查是否所有分块都已上传
-        if progress_info["uploaded_chunks"] != progress_info["total_chunks"]:
+        uploaded_chunks = upload_progress.set_size(upload_id, RECEIVED_CHUNKS)
+        if uploaded_chunks != progress_info["total_chunks"]:
             raise HTTPException(
                 status_code=400,
-                detail=f"分块上传未完成: {progress_info['uploaded_chunks']}/{progress_info['total_chunks']}"
+                detail=f"分块上传未完成: {uploaded_chunks}/{progress_info['total_chunks']}"
             )
 
         filename = progress_info["filename"]
 
-        # 合并分块
-        final_file_path = await chunked_service.complete_upload(upload_id, filename)
+        # 合并分块，同时校验文件 SHA-256
+        try:
+            final_file_path = await chunked_service.complete_upload(
+                upload_id, filename, expected_hash=progress_info.get("file_hash")
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
         # 更新状态
-        progress_info["status"] = "merging_complete"
-        progress_info["final_file_path"] = final_file_path
+        upload_progress.update(upload_id, status="merging_complete", final_file_path=final_file_path)
 
-        # 启动后台导入任务
+        # 启动后台导入任务，使用独立的数据库会话（请求结束后依赖注入的会话会被关闭）
         async def background_import():
+            db = SessionLocal()
             try:
                 large_file_service = LargeFileImportService(db)
-
-                async def import_progress_callback(stage: str, progress: float, message: str):
-                    progress_info["import_stage"] = stage
-                    progress_info["import_progress"] = progress
-                    progress_info["import_message"] = message
-                    progress_info["last_update"] = __import__('datetime').datetime.now().isoformat()
-
-                    if stage == "parsing":
-                        progress_info["status"] = "parsing"
-                    elif stage == "importing":
-                        progress_info["status"] = "importing"
+                import_progress_callback = _make_import_progress_callback(upload_id, update_status=True)
 
                 result = await large_file_service.import_large_file_streaming(
                     final_file_path,
@@ -194,15 +244,24 @@ async def complete_chunked_upload(
                 )
 
                 # 保存最终结果
-                progress_info["import_result"] = result
-                progress_info["status"] = "completed" if result["success"] else "failed"
-                progress_info["end_time"] = __import__('datetime').datetime.now().isoformat()
+                upload_progress.update(
+                    upload_id,
+                    import_result=result,
+                    status="completed" if result["success"] else "failed",
+                    end_time=datetime.now().isoformat()
+                )
 
             except Exception as e:
-                logger.error(f"大文件导入失败: {e}")
-                progress_info["status"] = "failed"
-                progress_info["error"] = str(e)
-                progress_info["end_time"] = __import__('datetime').datetime.now().isoformat()
+                logger.error("大文件导入失败: %s", e)
+                db.rollback()
+                upload_progress.update(
+                    upload_id,
+                    status="failed",
+                    error=str(e),
+                    end_time=datetime.now().isoformat()
+                )
+            finally:
+                db.close()
 
         # 添加后台任务
         background_tasks.add_task(background_import)
@@ -215,30 +274,31 @@ async def complete_chunked_upload(
             "progress_url": f"/api/v1/large-file-upload/progress/{upload_id}"
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"完成分块上传时出错: {e}")
+        logger.error("完成分块上传时出错: %s", e)
         raise HTTPException(status_code=500, detail=f"完成上传失败: {str(e)}")
 
-@router.get("/progress/{upload_id}")
+@router.get("/progress/{upload_id}", response_class=ORJSONResponse)
 async def get_upload_progress(
     upload_id: str,
     current_admin: AdminUser = Depends(get_current_admin_user)
 ):
     """获取上传和导入进度"""
-    if upload_id not in upload_progress:
+    progress_info = upload_progress.get(upload_id)
+    if progress_info is None:
         raise HTTPException(status_code=404, detail="上传会话不存在")
 
-    progress_info = upload_progress[upload_id]
-
     # 检查权限
     if progress_info["imported_by"] != current_admin.username:
         raise HTTPException(status_code=403, detail="无权限访问此进度")
 
-    return {
+    return ORJSONResponse({
         "success": True,
         "upload_id": upload_id,
         "progress": progress_info
-    }
+    })
 
 @router.delete("/progress/{upload_id}")
 async def cleanup_upload_progress(
@@ -246,11 +306,10 @@ async def cleanup_upload_progress(
     current_admin: AdminUser = Depends(get_current_admin_user)
 ):
     """清理上传进度记录"""
-    if upload_id not in upload_progress:
+    progress_info = upload_progress.get(upload_id)
+    if progress_info is None:
         raise HTTPException(status_code=404, detail="上传会话不存在")
 
-    progress_info = upload_progress[upload_id]
-
     # 检查权限
     if progress_info["imported_by"] != current_admin.username:
         raise HTTPException(status_code=403, detail="无权限删除此记录")
@@ -259,83 +318,90 @@ async def cleanup_upload_progress(
     try:
         await chunked_service.cleanup_upload(upload_id)
     except Exception as e:
-        logger.warning(f"清理临时文件失败: {e}")
+        logger.warning("清理临时文件失败: %s", e)
 
     # 删除进度记录
-    del upload_progress[upload_id]
+    upload_progress.delete(upload_id)
 
     return {
         "success": True,
         "message": f"上传记录 {upload_id} 已清理"
     }
 
-@router.get("/active-uploads")
+@router.get("/active-uploads", response_class=ORJSONResponse)
 async def list_active_uploads(
     current_admin: AdminUser = Depends(get_current_admin_user)
 ):
     """列出当前用户的活跃上传"""
-    user_uploads = {
-        upload_id: progress
-        for upload_id, progress in upload_progress.items()
-        if progress.get("imported_by") == current_admin.username
-    }
+    user_uploads = dict(upload_progress.iter_owner_tasks(current_admin.username))
 
-    return {
+    return ORJSONResponse({
         "success": True,
         "uploads": user_uploads,
         "count": len(user_uploads)
-    }
+    })
 
 @router.post("/direct-large-upload")
 async def direct_large_upload(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
     current_admin: AdminUser = Depends(get_current_admin_user)
 ):
     """直接上传大文件（适用于50-100MB文件）"""
     try:
         # 检查文件类型
-        if not file.filename.endswith('.txt'):
-            raise HTTPException(status_code=400, detail="只支持TXT格式文件")
+        if not is_txt_upload(file.filename):
+            raise HTTPException(status_code=400, detail="只支持TXT或TXT.GZ格式文件")
 
         # 生成临时文件
         temp_fd, temp_path = tempfile.mkstemp(suffix='.txt', prefix='large_upload_')
+        # 文件按路径重新打开写入，描述符立即关闭，出错清理时不会重复关闭
+        os.close(temp_fd)
 
         try:
-            # 流式保存文件
+            # 流式保存文件，gzip 压缩的文件边读边解压，写入时顺带计算解压后内容的 SHA-256
+            decoder = GzipStreamDecoder() if is_gzip_file(file.file) else None
+            hasher = hashlib.sha256()
             async with aiofiles.open(temp_path, 'wb') as temp_file:
                 while True:
-                    chunk = await file.read(1024 * 1024)  # 1MB chunks
+                    chunk = await file.read(UPLOAD_WRITE_CHUNK_SIZE)
                     if not chunk:
                         break
-                    await temp_file.write(chunk)
-
-            os.close(temp_fd)
-
-            # 生成上传ID用于跟踪进度
-            upload_id = hashlib.md5(f"{file.filename}_{current_admin.username}_{__import__('datetime').datetime.now()}".encode()).hexdigest()
-
-            # 初始化进度跟踪
-            upload_progress[upload_id] = {
+                    pieces = decoder.decompress(chunk) if decoder is not None else (chunk,)
+                    try:
+                        for piece in pieces:
+                            hasher.update(piece)
+                            await temp_file.write(piece)
+                    except DecompressedSizeExceeded as e:
+                        raise HTTPException(status_code=413, detail=str(e))
+
+            if decoder is not None and not decoder.eof:
+                raise HTTPException(status_code=400, detail="压缩文件不完整")
+
+            # 上传ID由用户名和内容哈希生成，不同管理员上传相同文件互不影响；
+            # 同一管理员相同内容的文件正在导入时不再重复处理
+            file_hash = hasher.hexdigest()
+            upload_id = hashlib.sha256(f"{current_admin.username}:{file_hash}".encode()).hexdigest()
+
+            # 初始化进度跟踪，原子认领上传ID，并发上传同一文件时只有一个请求成功
+            claimed = upload_progress.claim(upload_id, {
                 "status": "processing",
                 "filename": file.filename,
                 "file_size": os.path.getsize(temp_path),
+                "file_hash": file_hash,
                 "imported_by": current_admin.username,
-                "start_time": __import__('datetime').datetime.now().isoformat(),
+                "start_time": datetime.now().isoformat(),
                 "upload_type": "direct"
-            }
+            })
+            if not claimed:
+                raise HTTPException(status_code=409, detail="相同内容的文件正在导入中")
 
-            # 启动后台处理
+            # 启动后台处理，使用独立的数据库会话
             async def background_process():
+                db = SessionLocal()
                 try:
                     large_file_service = LargeFileImportService(db)
-
-                    async def import_progress_callback(stage: str, progress: float, message: str):
-                        upload_progress[upload_id]["import_stage"] = stage
-                        upload_progress[upload_id]["import_progress"] = progress
-                        upload_progress[upload_id]["import_message"] = message
-                        upload_progress[upload_id]["last_update"] = __import__('datetime').datetime.now().isoformat()
+                    import_progress_callback = _make_import_progress_callback(upload_id)
 
                     result = await large_file_service.import_large_file_streaming(
                         temp_path,
@@ -344,15 +410,24 @@ async def direct_large_upload(
                         import_progress_callback
                     )
 
-                    upload_progress[upload_id]["import_result"] = result
-                    upload_progress[upload_id]["status"] = "completed" if result["success"] else "failed"
-                    upload_progress[upload_id]["end_time"] = __import__('datetime').datetime.now().isoformat()
+                    upload_progress.update(
+                        upload_id,
+                        import_result=result,
+                        status="completed" if result["success"] else "failed",
+                        end_time=datetime.now().isoformat()
+                    )
 
                 except Exception as e:
-                    logger.error(f"大文件直接上传处理失败: {e}")
-                    upload_progress[upload_id]["status"] = "failed"
-                    upload_progress[upload_id]["error"] = str(e)
-                    upload_progress[upload_id]["end_time"] = __import__('datetime').datetime.now().isoformat()
+                    logger.error("大文件直接上传处理失败: %s", e)
+                    db.rollback()
+                    upload_progress.update(
+                        upload_id,
+                        status="failed",
+                        error=str(e),
+                        end_time=datetime.now().isoformat()
+                    )
+                finally:
+                    db.close()
 
             background_tasks.add_task(background_process)
 
@@ -364,7 +439,6 @@ async def direct_large_upload(
             }
 
         except Exception as e:
-            os.close(temp_fd)
             if os.path.exists(temp_path):
                 os.unlink(temp_path)
             raise
@@ -372,5 +446,5 @@ async def direct_large_upload(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"直接上传大文件时出错: {e}")
+        logger.error("直接上传大文件时出错: %s", e)
         raise HTTPException(status_code=500, detail=f"上传失败: {str(e)}")
\ No newline at end of file
@@ -3,20 +3,27 @@
 Mock Payment API for Development and Testing
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, joinedload
 from typing import Optional
 
 from app.core.database import get_db
 from app.core.auth import get_current_active_user
 from app.core.logging import logger
 from app.core.config import settings
+from app.core.etag import make_etag, etag_matches, not_modified
 from app.models.user import User
-from app.models.payment import PaymentOrder, PaymentStatus
+from app.models.payment import ORDER_STATUS_LOAD_OPTIONS, PaymentOrder, PaymentStatus
 from app.services.wechat_pay import wechat_pay_service
 from app.services.user_membership import user_membership_service
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# 支付页面和支付状态轮询时每次都向服务器验证 ETag，订单未变化时返回 304
+PAYMENT_STATUS_CACHE_CONTROL = "private, no-cache"
 
 
 @router.post("/simulate-payment/{out_trade_no}")
@@ -36,29 +43,45 @@ async def simulate_payment_success(
         )
     
     try:
-        # 查找支付订单
-        payment_order = db.query(PaymentOrder).filter(
-            PaymentOrder.out_trade_no == out_trade_no
-        ).first()
+        # 锁定当前用户的待支付订单，套餐名称随订单一次查出
+        # 已被其他请求锁定的订单直接跳过，并发的重复支付请求不会重复激活套餐
+        payment_order = db.query(PaymentOrder).options(
+            joinedload(PaymentOrder.payment_package)
+        ).filter(
+            PaymentOrder.out_trade_no == out_trade_no,
+            PaymentOrder.user_id == current_user.id,
+            PaymentOrder.status == PaymentStatus.PENDING
+        ).with_for_update(skip_locked=True, of=PaymentOrder).first()
         
         if not payment_order:
+            # 未取到订单时再查一次，返回具体原因
+            existing_order = db.query(PaymentOrder.user_id, PaymentOrder.status).filter(
+                PaymentOrder.out_trade_no == out_trade_no
+            ).first()
+            
+            if not existing_order:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="支付订单不存在"
+                )
+            
+            # 检查订单所有权
+            if existing_order.user_id != current_user.id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="无权操作此订单"
+                )
+            
+            # 检查订单状态
+            if existing_order.status != PaymentStatus.PENDING:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"订单状态错误，当前状态: {existing_order.status}"
+                )
+            
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="支付订单不存在"
-            )
-        
-        # 检查订单所有权
-        if payment_order.user_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="无权操作此订单"
-            )
-        
-        # 检查订单状态
-        if payment_order.status != PaymentStatus.PENDING:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"订单状态错误，当前状态: {payment_order.status.value}"
+                status_code=status.HTTP_409_CONFLICT,
+                detail="订单正在处理中，请勿重复支付"
             )
         
         # 调用微信支付服务模拟支付成功
@@ -74,7 +97,6 @@ async def simulate_payment_success(
             )
         
         # 更新订单状态
-        from datetime import datetime
         payment_order.status = PaymentStatus.PAID
         payment_order.paid_at = datetime.now()
         payment_order.transaction_id = mock_result['data']['transaction_id']
@@ -88,6 +110,7 @@ async def simulate_payment_success(
             logger.warning(f"Package activation failed for order {payment_order.id}: {activation_result['message']}")
         
         db.commit()
+        user_membership_service.invalidate_user_cache(current_user.id)
         
         logger.info(f"[MOCK] Payment simulated successfully for order: {out_trade_no}")
         
@@ -118,6 +141,8 @@ async def simulate_payment_success(
 @router.get("/payment-page/{out_trade_no}")
 async def mock_payment_page(
     out_trade_no: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
@@ -132,7 +157,10 @@ async def mock_payment_page(
     
     try:
         # 查找支付订单
-        payment_order = db.query(PaymentOrder).filter(
+        # 只查询展示所需的列，套餐名称随订单一次查出
+        payment_order = db.query(PaymentOrder).options(
+            *ORDER_STATUS_LOAD_OPTIONS
+        ).filter(
             PaymentOrder.out_trade_no == out_trade_no
         ).first()
         
@@ -142,6 +170,16 @@ async def mock_payment_page(
                 detail="支付订单不存在"
             )
         
+        etag = make_etag(
+            out_trade_no, payment_order.status, payment_order.paid_at,
+            payment_order.transaction_id, payment_order.expire_time
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag, PAYMENT_STATUS_CACHE_CONTROL)
+        
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = PAYMENT_STATUS_CACHE_CONTROL
+        
         return {
             "status": "success",
             "data": {
@@ -149,13 +187,13 @@ async def mock_payment_page(
                     "out_trade_no": out_trade_no,
                     "package_name": payment_order.payment_package.name,
                     "amount": payment_order.amount,
-                    "status": payment_order.status.value.lower(),
+                    "status": payment_order.status,
                     "created_at": payment_order.created_at.isoformat(),
                     "expire_time": payment_order.expire_time.isoformat() if payment_order.expire_time else None
                 },
                 "payment_info": {
                     "mock_mode": True,
-                    "payment_method": payment_order.payment_method.value.lower(),
+                    "payment_method": payment_order.payment_method,
                     "payment_url": f"{settings.BASE_URL}/api/v1/mock/simulate-payment/{out_trade_no}",
                     "instructions": {
                         "zh": "这是模拟支付环境。点击下方按钮可以模拟支付成功。",
@@ -178,6 +216,8 @@ async def mock_payment_page(
 @router.get("/payment-status/{out_trade_no}")
 async def check_mock_payment_status(
     out_trade_no: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -187,7 +227,10 @@ async def check_mock_payment_status(
     """
     try:
         # 查找支付订单
-        payment_order = db.query(PaymentOrder).filter(
+        # 只查询展示所需的列，套餐名称随订单一次查出
+        payment_order = db.query(PaymentOrder).options(
+            *ORDER_STATUS_LOAD_OPTIONS
+        ).filter(
             PaymentOrder.out_trade_no == out_trade_no
         ).first()
         
@@ -209,12 +252,23 @@ async def check_mock_payment_status(
             db, current_user.id
         )
         
+        # 会员状态随订单支付变化，也参与 ETag 计算
+        etag = make_etag(
+            out_trade_no, payment_order.status, payment_order.paid_at, payment_order.transaction_id,
+            membership_status.get('current_membership'), membership_status.get('active_until')
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag, PAYMENT_STATUS_CACHE_CONTROL)
+        
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = PAYMENT_STATUS_CACHE_CONTROL
+        
         return {
             "status": "success",
             "data": {
                 "order_status": {
                     "out_trade_no": out_trade_no,
-                    "status": payment_order.status.value.lower(),
+                    "status": payment_order.status,
                     "amount": payment_order.amount,
                     "package_name": payment_order.payment_package.name,
                     "created_at": payment_order.created_at.isoformat(),
@@ -246,15 +300,9 @@ async def get_user_membership_info(
     Get user membership information
     """
     try:
-        # 获取用户会员状态
-        membership_status = await user_membership_service.get_user_membership_status(
-            db, current_user.id
-        )
-        
-        # 获取用户购买历史
-        purchase_history = await user_membership_service.get_user_purchase_history(
-            db, current_user.id
-        )
+        # 获取用户会员状态和购买历史
+        membership_status = await user_membership_service.get_user_membership_status(db, current_user.id)
+        purchase_history = await user_membership_service.get_user_purchase_history(db, current_user.id)
         
         return {
             "status": "success",
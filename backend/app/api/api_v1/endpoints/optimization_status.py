@@ -3,111 +3,197 @@
 提供优化功能的状态信息和切换控制
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Optional, Set, Tuple
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import bindparam, text
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_read_db
 from app.core.admin_auth import get_current_admin_user
+from app.core.cache import cache as local_cache
 from app.models.admin_user import AdminUser
 
 import logging
+import orjson
 import os
+from types import MappingProxyType
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# 优化相关的环境变量在进程启动时读取一次，运行期间不会变化
+ENV_CONFIG = MappingProxyType({
+    name: os.getenv(name, 'false')
+    for name in (
+        'USE_OPTIMIZED_TABLES',
+        'ENABLE_PERFORMANCE_LOG',
+        'ENABLE_QUERY_CACHE',
+        'API_PERFORMANCE_MONITORING'
+    )
+})
+OPTIMIZATION_ENABLED = ENV_CONFIG['USE_OPTIMIZED_TABLES'].lower() == 'true'
+
+# 原始表和优化表按日期计数，两条语句形式相同，日期以绑定参数传入
+ORIGINAL_DATE_COUNT_QUERY = text(
+    "SELECT COUNT(*) FROM daily_trading WHERE trading_date = :trading_date"
+)
+OPTIMIZED_DATE_COUNT_QUERY = text(
+    "SELECT COUNT(*) FROM daily_trading_unified WHERE trading_date = :trading_date"
+)
+
+# 优化状态只在执行迁移脚本后才会变化，进程内缓存一段时间，管理后台轮询时不再查库
+OPTIMIZATION_STATUS_CACHE_KEY = "optimization:status"
+OPTIMIZATION_STATUS_CACHE_TTL = 60
+
+# 一次查询当前库中存在的表和视图
+EXISTING_TABLES_QUERY = text(
+    "SELECT TABLE_NAME FROM information_schema.TABLES "
+    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN :names"
+).bindparams(bindparam("names", expanding=True))
+
+
+# 一次查询多张表的估算行数（InnoDB 统计信息，无需全表扫描）
+TABLE_ROWS_QUERY = text(
+    "SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES "
+    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN :names"
+).bindparams(bindparam("names", expanding=True))
+
+
+def _estimated_row_counts(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """返回各表的估算行数，不存在的表记为 0"""
+    names = list(names)
+    rows = db.execute(TABLE_ROWS_QUERY, {"names": names}).fetchall()
+    counts = dict.fromkeys(names, 0)
+    counts.update((row.TABLE_NAME, row.TABLE_ROWS or 0) for row in rows)
+    return counts
+
+
+# 迁移脚本写入的状态文件，按修改时间缓存解析结果
+MIGRATION_STATE_FILE = "migration_state.json"
+_migration_state_cache: Dict[str, Any] = {"stat": None, "data": None}
+
+
+def _read_migration_state() -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """
+    读取迁移状态文件
+
+    Returns:
+        (文件是否存在, 解析后的内容)；文件未变化时直接返回缓存的内容
+    """
+    try:
+        st = os.stat(MIGRATION_STATE_FILE)
+    except FileNotFoundError:
+        return False, None
+
+    stat_key = (st.st_mtime_ns, st.st_size)
+    if _migration_state_cache["stat"] != stat_key:
+        try:
+            with open(MIGRATION_STATE_FILE, 'rb') as f:
+                data = orjson.loads(f.read())
+        except Exception as e:
+            logger.error(f"读取迁移状态文件失败: {e}")
+            return True, None
+        _migration_state_cache.update(stat=stat_key, data=data)
+
+    return True, _migration_state_cache["data"]
+
+
+def _existing_tables(db: Session, names: Iterable[str]) -> Set[str]:
+    """返回 names 中在当前数据库里存在的表或视图名"""
+    return set(db.execute(EXISTING_TABLES_QUERY, {"names": list(names)}).scalars())
+
+
+def _compute_optimization_status(db: Session) -> Dict[str, Any]:
+    """查询数据库优化功能状态"""
+    # 检查优化表是否存在
+    required_tables = [
+        'daily_trading_unified',
+        'concept_daily_metrics', 
+        'stock_concept_daily_snapshot',
+        'today_trading_cache'
+    ]
+    
+    # 检查优化视图是否存在
+    required_views = [
+        'v_stock_daily_summary',
+        'v_concept_daily_ranking',
+        'v_stock_concept_performance',
+        'v_concept_new_highs',
+        'v_today_market_overview'
+    ]
+    
+    # 表和视图在同一次查询中检查
+    existing = _existing_tables(db, required_tables + required_views)
+    table_status = {table: table in existing for table in required_tables}
+    view_status = {view: view in existing for view in required_views}
+    
+    # 计算整体状态
+    optimization_enabled = OPTIMIZATION_ENABLED
+    all_tables_exist = all(table_status.values())
+    all_views_exist = all(view_status.values())
+    
+    ready_for_optimization = all_tables_exist and all_views_exist
+    
+    # 如果启用了优化但表不存在，提供建议
+    suggestions = []
+    if optimization_enabled and not all_tables_exist:
+        suggestions.append("优化表不存在，请运行: mysql < scripts/database/create_optimized_tables.sql")
+    
+    if optimization_enabled and not all_views_exist:
+        suggestions.append("优化视图不存在，请运行: mysql < scripts/database/create_views_and_indexes.sql")
+    
+    if not optimization_enabled and ready_for_optimization:
+        suggestions.append("优化表已就绪，可以运行: python scripts/database/enable_optimization.py enable --mode optimized")
+    
+    return {
+        "optimization_enabled": optimization_enabled,
+        "ready_for_optimization": ready_for_optimization,
+        "environment_config": dict(ENV_CONFIG),
+        "table_status": table_status,
+        "view_status": view_status,
+        "suggestions": suggestions,
+        "performance_summary": {
+            "tables_ready": f"{sum(table_status.values())}/{len(required_tables)}",
+            "views_ready": f"{sum(view_status.values())}/{len(required_views)}",
+            "overall_status": "可用" if ready_for_optimization else "未就绪"
+        }
+    }
 
 
 @router.get("/optimization/status")
 async def get_optimization_status(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin: AdminUser = Depends(get_current_admin_user)
 ):
-    """获取数据库优化功能状态"""
+    """获取数据库优化功能状态（结果缓存 60 秒）"""
     try:
-        # 检查环境变量配置
-        env_config = {
-            "USE_OPTIMIZED_TABLES": os.getenv('USE_OPTIMIZED_TABLES', 'false'),
-            "ENABLE_PERFORMANCE_LOG": os.getenv('ENABLE_PERFORMANCE_LOG', 'false'),
-            "ENABLE_QUERY_CACHE": os.getenv('ENABLE_QUERY_CACHE', 'false'),
-            "API_PERFORMANCE_MONITORING": os.getenv('API_PERFORMANCE_MONITORING', 'false')
-        }
-        
-        # 检查优化表是否存在
-        required_tables = [
-            'daily_trading_unified',
-            'concept_daily_metrics', 
-            'stock_concept_daily_snapshot',
-            'today_trading_cache'
-        ]
-        
-        table_status = {}
-        for table in required_tables:
-            try:
-                result = db.execute(f"SHOW TABLES LIKE '{table}'").fetchone()
-                table_status[table] = result is not None
-            except Exception as e:
-                table_status[table] = False
-                logger.error(f"检查表 {table} 失败: {e}")
-        
-        # 检查优化视图是否存在
-        required_views = [
-            'v_stock_daily_summary',
-            'v_concept_daily_ranking',
-            'v_stock_concept_performance',
-            'v_concept_new_highs',
-            'v_today_market_overview'
-        ]
-        
-        view_status = {}
-        for view in required_views:
-            try:
-                result = db.execute(f"SHOW TABLES LIKE '{view}'").fetchone()
-                view_status[view] = result is not None
-            except Exception as e:
-                view_status[view] = False
-        
-        # 计算整体状态
-        optimization_enabled = env_config["USE_OPTIMIZED_TABLES"].lower() == 'true'
-        all_tables_exist = all(table_status.values())
-        all_views_exist = all(view_status.values())
-        
-        ready_for_optimization = all_tables_exist and all_views_exist
-        
-        # 如果启用了优化但表不存在，提供建议
-        suggestions = []
-        if optimization_enabled and not all_tables_exist:
-            suggestions.append("优化表不存在，请运行: mysql < scripts/database/create_optimized_tables.sql")
-        
-        if optimization_enabled and not all_views_exist:
-            suggestions.append("优化视图不存在，请运行: mysql < scripts/database/create_views_and_indexes.sql")
-        
-        if not optimization_enabled and ready_for_optimization:
-            suggestions.append("优化表已就绪，可以运行: python scripts/database/enable_optimization.py enable --mode optimized")
-        
-        return {
-            "optimization_enabled": optimization_enabled,
-            "ready_for_optimization": ready_for_optimization,
-            "environment_config": env_config,
-            "table_status": table_status,
-            "view_status": view_status,
-            "suggestions": suggestions,
-            "performance_summary": {
-                "tables_ready": f"{sum(table_status.values())}/{len(required_tables)}",
-                "views_ready": f"{sum(view_status.values())}/{len(required_views)}",
-                "overall_status": "可用" if ready_for_optimization else "未就绪"
-            }
-        }
-        
+        cached_status = local_cache.get(OPTIMIZATION_STATUS_CACHE_KEY)
+        if cached_status is not None:
+            return cached_status
+
+        optimization_status = _compute_optimization_status(db)
+        local_cache.set(OPTIMIZATION_STATUS_CACHE_KEY, optimization_status, OPTIMIZATION_STATUS_CACHE_TTL)
+        return optimization_status
+
     except Exception as e:
         logger.error(f"获取优化状态失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取优化状态失败: {str(e)}")
 
 
+@router.post("/optimization/status/invalidate")
+async def invalidate_optimization_status(
+    current_admin: AdminUser = Depends(get_current_admin_user)
+):
+    """清除优化状态缓存，执行迁移脚本后调用以立即获取最新状态"""
+    local_cache.delete(OPTIMIZATION_STATUS_CACHE_KEY)
+    return {"success": True, "message": "优化状态缓存已清除"}
+
+
 @router.get("/optimization/test")
 async def test_optimization_performance(
     trading_date: str = "2025-09-02",
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin: AdminUser = Depends(get_current_admin_user)
 ):
     """测试优化查询性能"""
@@ -116,37 +202,35 @@ async def test_optimization_performance(
         import time
         
         parsed_date = datetime.strptime(trading_date, '%Y-%m-%d').date()
+        params = {"trading_date": parsed_date}
+        
+        # 优化表是否存在在计时之前检查，不计入优化查询的耗时
+        try:
+            optimized_available = bool(_existing_tables(db, ['daily_trading_unified']))
+        except Exception as e:
+            optimized_available = False
+            logger.error(f"检查优化表失败: {e}")
         
         # 测试原始查询性能
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
-            from app.models.daily_trading import DailyTrading
-            original_count = db.query(DailyTrading).filter(
-                DailyTrading.trading_date == parsed_date
-            ).count()
-            original_time = (time.time() - start_time) * 1000
+            original_count = db.execute(ORIGINAL_DATE_COUNT_QUERY, params).scalar()
+            original_time = (time.perf_counter() - start_time) * 1000
         except Exception as e:
             original_count = 0
             original_time = -1
             logger.error(f"原始查询测试失败: {e}")
         
         # 测试优化查询性能（如果可用）
-        start_time = time.time()
-        try:
-            # 检查优化表是否存在
-            result = db.execute(f"SHOW TABLES LIKE 'daily_trading_unified'").fetchone()
-            if result:
-                optimized_count = db.execute(
-                    f"SELECT COUNT(*) FROM daily_trading_unified WHERE trading_date = '{parsed_date}'"
-                ).scalar()
-                optimized_time = (time.time() - start_time) * 1000
-            else:
-                optimized_count = 0
-                optimized_time = -1
-        except Exception as e:
-            optimized_count = 0
-            optimized_time = -1
-            logger.error(f"优化查询测试失败: {e}")
+        optimized_count = 0
+        optimized_time = -1
+        if optimized_available:
+            start_time = time.perf_counter()
+            try:
+                optimized_count = db.execute(OPTIMIZED_DATE_COUNT_QUERY, params).scalar()
+                optimized_time = (time.perf_counter() - start_time) * 1000
+            except Exception as e:
+                logger.error(f"优化查询测试失败: {e}")
         
         # 计算性能提升
         performance_improvement = None
@@ -179,57 +263,27 @@ async def test_optimization_performance(
 
 @router.get("/optimization/migration-status")
 async def get_migration_status(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin: AdminUser = Depends(get_current_admin_user)
 ):
     """获取数据迁移状态"""
     try:
-        import json
-        from pathlib import Path
-        
         # 检查迁移状态文件
-        migration_state_file = Path("migration_state.json")
-        migration_status = None
-        
-        if migration_state_file.exists():
-            try:
-                with open(migration_state_file, 'r') as f:
-                    migration_status = json.load(f)
-            except Exception as e:
-                logger.error(f"读取迁移状态文件失败: {e}")
+        migration_file_exists, migration_status = _read_migration_state()
         
         # 检查数据量对比
         data_comparison = {}
         try:
-            # 检查原始表数据量
-            from app.models.daily_trading import DailyTrading, ConceptDailySummary, StockConceptRanking
-            
-            original_counts = {
-                "daily_trading": db.query(DailyTrading).count(),
-                "concept_daily_summary": db.query(ConceptDailySummary).count(),
-                "stock_concept_ranking": db.query(StockConceptRanking).count()
-            }
-            
-            # 检查优化表数据量
-            optimized_counts = {}
-            optimized_tables = {
-                "daily_trading_unified": "daily_trading_unified",
-                "concept_daily_metrics": "concept_daily_metrics", 
-                "stock_concept_daily_snapshot": "stock_concept_daily_snapshot"
-            }
+            # 原始表和优化表的数据量在一次查询中取得，使用估算行数避免全表 COUNT
+            original_tables = ["daily_trading", "concept_daily_summary", "stock_concept_ranking"]
+            optimized_tables = ["daily_trading_unified", "concept_daily_metrics", "stock_concept_daily_snapshot"]
             
-            for key, table in optimized_tables.items():
-                try:
-                    result = db.execute(f"SHOW TABLES LIKE '{table}'").fetchone()
-                    if result:
-                        count = db.execute(f"SELECT COUNT(*) FROM {table}").scalar()
-                        optimized_counts[key] = count
-                    else:
-                        optimized_counts[key] = 0
-                except Exception:
-                    optimized_counts[key] = 0
+            row_counts = _estimated_row_counts(db, original_tables + optimized_tables)
+            original_counts = {table: row_counts[table] for table in original_tables}
+            optimized_counts = {table: row_counts[table] for table in optimized_tables}
             
             data_comparison = {
+                "counts_estimated": True,
                 "original_tables": original_counts,
                 "optimized_tables": optimized_counts,
                 "migration_progress": {
@@ -244,7 +298,7 @@ async def get_migration_status(
             data_comparison["error"] = str(e)
         
         return {
-            "migration_file_exists": migration_state_file.exists(),
+            "migration_file_exists": migration_file_exists,
             "migration_status": migration_status,
             "data_comparison": data_comparison,
             "recommendations": [
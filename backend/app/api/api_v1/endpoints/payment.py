@@ -3,21 +3,30 @@
 Payment API endpoints
 """
 
+import asyncio
+import base64
+import binascii
+import uuid
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from typing import List, Dict, Any, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, text
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import and_, or_, case, func, select, text, update
+from sqlalchemy.exc import IntegrityError
 
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.core.auth import get_current_active_user
 from app.core.logging import logger
+from app.core.redis_cache import cache as redis_cache, CacheKeys, CacheExpiry
 from app.models.user import User
-from app.models.payment import PaymentPackage, PaymentOrder, PaymentNotification, MembershipLog, PaymentStatus, RefundRecord, RefundStatus
+from app.models.payment import ORDER_STATUS_LOAD_OPTIONS, PaymentPackage, PaymentOrder, PaymentNotification, MembershipLog, PaymentStatus, RefundRecord, RefundStatus
 from app.schemas.payment import (
     PaymentPackage as PaymentPackageSchema,
-    PaymentOrderCreate, PaymentOrderResponse, PaymentOrderQuery,
+    PaymentOrderCreate, PaymentOrderResponse, PaymentOrderPage, PaymentOrderQuery,
     PaymentNotifyResponse, OrderStatusCheck
 )
 from app.services.wechat_pay import wechat_pay_service, WechatPayException
@@ -25,7 +34,111 @@ from app.core.config import settings
 from app.services.user_membership import user_membership_service
 from app.services.mock_payment import mock_payment_service
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# 微信订单查询结果的缓存时间（秒），前端轮询支付状态时多个请求共用一次查询
+WECHAT_QUERY_CACHE_TTL = 2
+
+# 查询锁的超时时间（秒），持有锁的请求异常退出时锁自动释放
+WECHAT_QUERY_LOCK_TIMEOUT = 5
+
+# 仅当锁的值仍是本请求的令牌时才删除，锁超时后被其他请求取得时不会误删
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# 未拿到查询锁的请求等待查询结果的轮询间隔和次数
+WECHAT_QUERY_WAIT_INTERVAL = 0.1
+WECHAT_QUERY_WAIT_ATTEMPTS = 20
+
+
+def _encode_order_cursor(order: PaymentOrder) -> str:
+    """以订单的创建时间和ID生成分页游标"""
+    raw = f"{order.created_at.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_order_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析分页游标，格式错误时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError("无效的分页游标") from e
+    created_at, sep, order_id = raw.rpartition("|")
+    if not sep:
+        raise ValueError("无效的分页游标")
+    return datetime.fromisoformat(created_at), int(order_id)
+
+
+async def _get_pending_order(db: AsyncSession, user_id: int, package_type: str) -> Optional[PaymentOrder]:
+    """查询用户指定套餐类型的待支付订单（含已过期但尚未标记的订单）"""
+    return (await db.execute(
+        select(PaymentOrder).where(
+            PaymentOrder.user_id == user_id,
+            PaymentOrder.package_type == package_type,
+            PaymentOrder.status == PaymentStatus.PENDING
+        )
+    )).scalars().first()
+
+
+async def _query_wechat_order(out_trade_no: str) -> Dict[str, Any]:
+    """
+    查询微信订单状态，结果短暂缓存在 Redis 中
+
+    同一订单同时只有一个请求调用微信接口，其他请求等待并读取该请求缓存的结果；
+    等待超时抛出 WechatPayException，调用方按查询失败处理，保持订单原状态
+    """
+    cache_key = CacheKeys.WECHAT_ORDER_QUERY.format(out_trade_no=out_trade_no)
+    cached_result = redis_cache.get(cache_key)
+    if cached_result is not None:
+        return cached_result
+    
+    redis_client = redis_cache.redis_client
+    if redis_client is None:
+        return await wechat_pay_service.query_order(out_trade_no)
+    
+    lock_key = CacheKeys.WECHAT_ORDER_QUERY_LOCK.format(out_trade_no=out_trade_no)
+    lock_token = uuid.uuid4().hex
+    if redis_client.set(lock_key, lock_token, nx=True, ex=WECHAT_QUERY_LOCK_TIMEOUT):
+        try:
+            result = await wechat_pay_service.query_order(out_trade_no)
+            redis_cache.set(cache_key, result, WECHAT_QUERY_CACHE_TTL)
+            return result
+        finally:
+            redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, lock_token)
+    
+    for _ in range(WECHAT_QUERY_WAIT_ATTEMPTS):
+        await asyncio.sleep(WECHAT_QUERY_WAIT_INTERVAL)
+        cached_result = redis_cache.get(cache_key)
+        if cached_result is not None:
+            return cached_result
+    raise WechatPayException(f"等待订单查询结果超时: {out_trade_no}")
+
+
+async def _update_pending_order(db: AsyncSession, order: PaymentOrder, *criteria, **values) -> bool:
+    """
+    以单条条件 UPDATE 更新仍处于待支付状态的订单并提交，返回是否由本次调用完成更新
+
+    订单已被其他请求（支付通知、并发轮询）处理时不做修改，重新读取订单的最新状态
+    """
+    result = await db.execute(
+        update(PaymentOrder)
+        .where(PaymentOrder.id == order.id, PaymentOrder.status == PaymentStatus.PENDING, *criteria)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    
+    if result.rowcount != 1:
+        await db.refresh(order)
+        return False
+    
+    for key, value in values.items():
+        set_committed_value(order, key, value)
+    return True
 
 
 # ============ 支付套餐管理 ============
@@ -33,9 +146,18 @@ router = APIRouter()
 @router.get("/packages", response_model=List[PaymentPackageSchema])
 async def get_payment_packages(
     is_active: bool = True,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取支付套餐列表"""
+    """
+    获取支付套餐列表
+
+    缓存的是序列化后的结果，命中时直接返回；套餐变更时由管理端接口清除
+    """
+    cache_key = CacheKeys.PAYMENT_PACKAGES_LIST.format(is_active=is_active)
+    cached_result = redis_cache.get(cache_key)
+    if cached_result is not None:
+        return ORJSONResponse(cached_result)
+    
     try:
         # 使用原生SQL查询避免枚举映射问题
         sql = text("""
@@ -46,7 +168,7 @@ async def get_payment_packages(
         WHERE is_active = :is_active 
         ORDER BY sort_order, id
         """)
-        result = db.execute(sql, {"is_active": is_active})
+        result = await db.execute(sql, {"is_active": is_active})
         rows = result.fetchall()
         
         packages = []
@@ -67,7 +189,10 @@ async def get_payment_packages(
             }
             packages.append(package)
         
-        return packages
+        result = [PaymentPackageSchema.model_validate(package).model_dump(mode="json") for package in packages]
+        redis_cache.set(cache_key, result, CacheExpiry.MINUTE_5)
+        
+        return ORJSONResponse(result)
     except Exception as e:
         logger.error(f"Get payment packages error: {e}")
         raise HTTPException(
@@ -79,12 +204,12 @@ async def get_payment_packages(
 @router.get("/packages/{package_type}", response_model=PaymentPackageSchema)
 async def get_payment_package(
     package_type: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取指定支付套餐详情"""
-    package = db.query(PaymentPackage).filter(
-        PaymentPackage.package_type == package_type
-    ).first()
+    package = (await db.execute(
+        select(PaymentPackage).where(PaymentPackage.package_type == package_type)
+    )).scalars().first()
     
     if not package:
         raise HTTPException(
@@ -102,37 +227,40 @@ async def create_payment_order(
     order_data: PaymentOrderCreate,
     request: Request,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """创建支付订单"""
     try:
-        # 获取套餐配置
-        package = db.query(PaymentPackage).filter(
-            and_(
+        # 获取套餐配置，同时查出用户未支付的同类型订单，一次往返完成下单前的检查
+        row = (await db.execute(
+            select(PaymentPackage, PaymentOrder)
+            .outerjoin(PaymentOrder, and_(
+                PaymentOrder.package_type == PaymentPackage.package_type,
+                PaymentOrder.user_id == current_user.id,
+                PaymentOrder.status == PaymentStatus.PENDING
+            ))
+            .where(
                 PaymentPackage.package_type == order_data.package_type,
                 PaymentPackage.is_active == True
             )
-        ).first()
+        )).first()
         
-        if not package:
+        if not row:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="支付套餐不存在或已下架"
             )
         
-        # 检查用户是否有未支付的同类型订单
-        existing_order = db.query(PaymentOrder).filter(
-            and_(
-                PaymentOrder.user_id == current_user.id,
-                PaymentOrder.package_type == order_data.package_type,
-                PaymentOrder.status == PaymentStatus.PENDING,
-                PaymentOrder.expire_time > datetime.now()
-            )
-        ).first()
+        package, existing_order = row
         
         if existing_order:
-            # 返回现有订单
-            return existing_order
+            if existing_order.expire_time > datetime.now():
+                # 返回现有订单
+                return existing_order
+            # 已过期的待支付订单会占用唯一索引，先标记为过期
+            await _update_pending_order(
+                db, existing_order, PaymentOrder.expire_time <= datetime.now(), status=PaymentStatus.EXPIRED
+            )
         
         # 获取客户端IP
         client_ip = order_data.client_ip or request.client.host
@@ -167,12 +295,27 @@ async def create_payment_order(
         )
         
         db.add(order)
-        db.commit()
-        db.refresh(order)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # 并发请求已创建了同类型的待支付订单（唯一索引 uk_payment_orders_pending），
+            # 关闭本次创建的微信订单并返回已有订单
+            await db.rollback()
+            existing_order = await _get_pending_order(db, current_user.id, order_data.package_type)
+            if existing_order is None:
+                raise
+            if (existing_order.out_trade_no != payment_result["out_trade_no"]
+                    and not payment_result.get("mock_mode")):
+                await wechat_pay_service.close_order(payment_result["out_trade_no"])
+            return existing_order
+        await db.refresh(order)
+        user_membership_service.invalidate_user_cache(current_user.id)
         
         logger.info(f"Payment order created: {order.out_trade_no} for user {current_user.id}")
         return order
         
+    except HTTPException:
+        raise
     except WechatPayException as e:
         logger.error(f"Wechat pay error: {e}")
         raise HTTPException(
@@ -181,33 +324,65 @@ async def create_payment_order(
         )
     except Exception as e:
         logger.error(f"Create payment order error: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="创建支付订单失败"
         )
 
 
-@router.get("/orders", response_model=List[PaymentOrderResponse])
+@router.get("/orders", response_model=PaymentOrderPage)
 async def get_user_payment_orders(
-    status: str = None,
-    page: int = 1,
-    size: int = 20,
+    order_status: Optional[str] = Query(None, alias="status"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，为空时从第一页开始"),
+    page: int = Query(1, ge=1, deprecated=True, description="已废弃，仅支持 1，翻页请使用 cursor"),
+    size: int = Query(20, ge=1, le=100),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取用户支付订单列表"""
+    """
+    获取用户支付订单列表
+
+    按创建时间倒序，使用 (created_at, id) 游标分页，翻页深度不影响查询耗时
+    """
+    if page > 1 and not cursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="page 参数已废弃，请使用 next_cursor 翻页"
+        )
+    
     try:
-        query = db.query(PaymentOrder).filter(PaymentOrder.user_id == current_user.id)
+        stmt = select(PaymentOrder).where(PaymentOrder.user_id == current_user.id)
+        
+        if order_status:
+            stmt = stmt.where(PaymentOrder.status == order_status)
+        
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = _decode_order_cursor(cursor)
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="无效的分页游标"
+                )
+            stmt = stmt.where(or_(
+                PaymentOrder.created_at < cursor_created_at,
+                and_(PaymentOrder.created_at == cursor_created_at, PaymentOrder.id < cursor_id)
+            ))
         
-        if status:
-            query = query.filter(PaymentOrder.status == status)
+        # 多取一条判断是否还有下一页
+        orders = (await db.execute(
+            stmt.order_by(PaymentOrder.created_at.desc(), PaymentOrder.id.desc()).limit(size + 1)
+        )).scalars().all()
         
-        # 分页
-        offset = (page - 1) * size
-        orders = query.order_by(PaymentOrder.created_at.desc()).offset(offset).limit(size).all()
+        next_cursor = None
+        if len(orders) > size:
+            orders = orders[:size]
+            next_cursor = _encode_order_cursor(orders[-1])
         
-        return orders
+        return {"items": orders, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Get user payment orders error: {e}")
         raise HTTPException(
@@ -220,15 +395,15 @@ async def get_user_payment_orders(
 async def get_payment_order(
     out_trade_no: str,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取支付订单详情"""
-    order = db.query(PaymentOrder).filter(
-        and_(
+    order = (await db.execute(
+        select(PaymentOrder).where(
             PaymentOrder.out_trade_no == out_trade_no,
             PaymentOrder.user_id == current_user.id
         )
-    ).first()
+    )).scalar_one_or_none()
     
     if not order:
         raise HTTPException(
@@ -243,16 +418,16 @@ async def get_payment_order(
 async def check_payment_status(
     out_trade_no: str,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """检查支付状态"""
     try:
-        order = db.query(PaymentOrder).filter(
-            and_(
+        order = (await db.execute(
+            select(PaymentOrder).options(*ORDER_STATUS_LOAD_OPTIONS).where(
                 PaymentOrder.out_trade_no == out_trade_no,
                 PaymentOrder.user_id == current_user.id
             )
-        ).first()
+        )).scalar_one_or_none()
         
         if not order:
             raise HTTPException(
@@ -268,24 +443,24 @@ async def check_payment_status(
                     payment_result = await mock_payment_service.query_order(out_trade_no)
                 else:
                     # 查询真实微信支付状态
-                    payment_result = await wechat_pay_service.query_order(out_trade_no)
+                    payment_result = await _query_wechat_order(out_trade_no)
                 
                 # 更新订单状态
                 trade_state = payment_result.get("trade_state") if settings.PAYMENT_MOCK_MODE else payment_result.get("trade_state")
                 if trade_state == "SUCCESS":
-                    order.status = PaymentStatus.PAID
-                    order.transaction_id = payment_result.get("transaction_id")
-                    order.paid_at = datetime.now()
-                    
-                    # 处理会员权益
-                    result = await user_membership_service.activate_package_for_user(db, order.user_id, order.id)
-                    if not result.get('success', False):
-                        logger.warning(f"Package activation failed for order {order.id}: {result.get('message', 'Unknown error')}")
-                    
-                    db.commit()
+                    # 只有完成状态更新的请求处理会员权益，与支付通知并发时不会重复激活
+                    if await _update_pending_order(
+                        db, order,
+                        status=PaymentStatus.PAID,
+                        transaction_id=payment_result.get("transaction_id"),
+                        paid_at=datetime.now()
+                    ):
+                        result = await user_membership_service.activate_package_for_user(db, order.user_id, order.id)
+                        if not result.get('success', False):
+                            logger.warning(f"Package activation failed for order {order.id}: {result.get('message', 'Unknown error')}")
                 elif trade_state in ["CLOSED", "REVOKED", "PAYERROR"]:
-                    order.status = PaymentStatus.FAILED
-                    db.commit()
+                    if await _update_pending_order(db, order, status=PaymentStatus.FAILED):
+                        user_membership_service.invalidate_user_cache(order.user_id)
                     
             except (WechatPayException, Exception):
                 # 查询失败，保持原状态
@@ -293,8 +468,10 @@ async def check_payment_status(
         
         # 检查订单是否过期
         elif order.status == PaymentStatus.PENDING and order.expire_time <= datetime.now():
-            order.status = PaymentStatus.EXPIRED
-            db.commit()
+            if await _update_pending_order(
+                db, order, PaymentOrder.expire_time <= datetime.now(), status=PaymentStatus.EXPIRED
+            ):
+                user_membership_service.invalidate_user_cache(order.user_id)
         
         return OrderStatusCheck(
             out_trade_no=order.out_trade_no,
@@ -303,6 +480,8 @@ async def check_payment_status(
             transaction_id=order.transaction_id
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Check payment status error: {e}")
         raise HTTPException(
@@ -315,17 +494,17 @@ async def check_payment_status(
 async def cancel_payment_order(
     out_trade_no: str,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """取消支付订单"""
     try:
-        order = db.query(PaymentOrder).filter(
-            and_(
+        order = (await db.execute(
+            select(PaymentOrder).where(
                 PaymentOrder.out_trade_no == out_trade_no,
                 PaymentOrder.user_id == current_user.id,
                 PaymentOrder.status == PaymentStatus.PENDING
             )
-        ).first()
+        )).scalar_one_or_none()
         
         if not order:
             raise HTTPException(
@@ -339,7 +518,8 @@ async def cancel_payment_order(
         # 更新订单状态
         order.status = PaymentStatus.CANCELLED
         order.cancelled_at = datetime.now()
-        db.commit()
+        await db.commit()
+        user_membership_service.invalidate_user_cache(current_user.id)
         
         return {"message": "订单已取消"}
         
@@ -356,42 +536,57 @@ async def cancel_payment_order(
 @router.post("/notify", response_class=Response)
 async def payment_notify(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """微信支付通知回调"""
     try:
-        # 获取原始XML数据
+        # 获取原始XML数据，解码一次后用于解析和记录
         xml_data = await request.body()
+        xml_str = xml_data.decode('utf-8')
         client_ip = request.client.host
         
         logger.info(f"Payment notify received from {client_ip}")
         
         # 处理支付通知
-        result = wechat_pay_service.process_notify(xml_data.decode('utf-8'))
+        result = wechat_pay_service.process_notify(xml_str)
         
         # 记录通知
         notification = PaymentNotification(
             out_trade_no=result["data"].get("out_trade_no", ""),
             transaction_id=result["data"].get("transaction_id", ""),
-            raw_data=xml_data.decode('utf-8'),
+            raw_data=xml_str,
             is_valid=result["success"],
             client_ip=client_ip
         )
         db.add(notification)
         
         if result["success"]:
-            # 查找对应订单
             notify_data = result["data"]
-            order = db.query(PaymentOrder).filter(
-                PaymentOrder.out_trade_no == notify_data["out_trade_no"]
-            ).first()
             
-            if order and order.status == PaymentStatus.PENDING:
-                # 更新订单状态
-                order.status = PaymentStatus.PAID
-                order.transaction_id = notify_data["transaction_id"]
-                order.paid_at = datetime.now()
-                order.notify_data = notify_data["raw_data"]
+            # 以条件 UPDATE 完成状态变更，重复通知或与状态轮询并发时只有一个请求会更新成功
+            update_result = await db.execute(
+                update(PaymentOrder)
+                .where(
+                    PaymentOrder.out_trade_no == notify_data["out_trade_no"],
+                    PaymentOrder.status == PaymentStatus.PENDING
+                )
+                .values(
+                    status=PaymentStatus.PAID,
+                    transaction_id=notify_data["transaction_id"],
+                    paid_at=datetime.now(),
+                    notify_data=notify_data["raw_data"]
+                )
+                .execution_options(synchronize_session=False)
+            )
+            
+            if update_result.rowcount == 1:
+                order = (await db.execute(
+                    select(PaymentOrder.id, PaymentOrder.user_id, PaymentOrder.out_trade_no)
+                    .where(PaymentOrder.out_trade_no == notify_data["out_trade_no"])
+                )).one()
+                
+                # 先提交支付状态和通知记录，激活失败回滚时不会丢失已支付状态
+                await db.commit()
                 
                 # 激活用户套餐权限
                 activation_result = await user_membership_service.activate_package_for_user(
@@ -400,11 +595,11 @@ async def payment_notify(
                 
                 if not activation_result['success']:
                     logger.warning(f"Package activation failed for order {order.id}: {activation_result['message']}")
+                    notification.process_result = f"Package activation failed: {activation_result['message']}"
                 else:
                     logger.info(f"Package activated successfully for user {order.user_id}: {activation_result['message']}")
-                
-                notification.processed = True
-                notification.process_result = "Payment processed successfully"
+                    notification.processed = True
+                    notification.process_result = "Payment processed successfully"
                 
                 logger.info(f"Payment success processed: {order.out_trade_no}")
             else:
@@ -413,7 +608,7 @@ async def payment_notify(
             notification.process_result = f"Invalid notification: {result['message']}"
         
         notification.processed_at = datetime.now()
-        db.commit()
+        await db.commit()
         
         # 返回响应
         if result["success"]:
@@ -429,7 +624,7 @@ async def payment_notify(
             
     except Exception as e:
         logger.error(f"Payment notify error: {e}")
-        db.rollback()
+        await db.rollback()
         return Response(
             content=wechat_pay_service.create_fail_response("SYSTEM_ERROR"),
             media_type="application/xml"
@@ -523,25 +718,20 @@ async def simulate_payment_success(
 @router.get("/stats")
 async def get_payment_stats(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取用户支付统计"""
+    """
+    获取用户支付统计
+
+    三项统计在同一次聚合中完成，由 (user_id, status, amount) 覆盖索引提供数据，不回表
+    """
     try:
-        user_stats = db.query(
-            func.count(PaymentOrder.id).label("total_orders"),
-            func.sum(
-                func.case(
-                    (PaymentOrder.status == PaymentStatus.PAID, PaymentOrder.amount),
-                    else_=0
-                )
-            ).label("total_amount"),
-            func.count(
-                func.case(
-                    (PaymentOrder.status == PaymentStatus.PAID, 1),
-                    else_=None
-                )
-            ).label("paid_orders")
-        ).filter(PaymentOrder.user_id == current_user.id).first()
+        is_paid = PaymentOrder.status == PaymentStatus.PAID
+        user_stats = (await db.execute(select(
+            func.count().label("total_orders"),
+            func.coalesce(func.sum(case((is_paid, PaymentOrder.amount), else_=0)), 0).label("total_amount"),
+            func.coalesce(func.sum(case((is_paid, 1), else_=0)), 0).label("paid_orders")
+        ).where(PaymentOrder.user_id == current_user.id))).one()
         
         return {
             "total_orders": user_stats.total_orders or 0,
@@ -637,6 +827,7 @@ async def apply_refund(
             order.refund_amount = Decimal(str(refund_fee / 100))
             
             db.commit()
+            user_membership_service.invalidate_user_cache(order.user_id)
             
             return {
                 "message": "退款申请已提交",
@@ -3,23 +3,48 @@
 System Monitoring and Health Check API
 """
 
+import asyncio
 from datetime import datetime
 from typing import Dict, Any
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
-from app.core.database import get_db, engine
+from app.core.database import get_db, engine, monitor_engine
 from app.core.redis_cache import cache
 
 router = APIRouter()
 
 
+# 健康检查时需要确认可访问的核心表
+HEALTH_CHECK_TABLES = ['users', 'payment_orders', 'payment_packages', 'stocks']
+
+
+def _check_database() -> None:
+    """数据库连接探测（每个探测使用监控连接池中的独立连接，可在线程中并发执行）"""
+    with monitor_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def _check_table(table: str) -> None:
+    """数据表探测，只读取一行，不做全表计数"""
+    with monitor_engine.connect() as conn:
+        conn.execute(text(f"SELECT 1 FROM {table} LIMIT 1"))
+
+
+def _check_cache() -> bool:
+    """Redis 探测，返回是否启用了 Redis"""
+    if not cache.redis_client:
+        return False
+    cache.redis_client.ping()
+    return True
+
+
 @router.get("/health", summary="系统健康检查")
-async def health_check(db: Session = Depends(get_db)) -> Dict[str, Any]:
+async def health_check() -> Dict[str, Any]:
     """
     全面的系统健康检查
-    检查数据库、缓存、文件系统等组件状态
+    检查数据库、缓存、文件系统等组件状态，各项探测在线程池中并发执行
     """
     
     health_status = {
@@ -28,59 +53,60 @@ async def health_check(db: Session = Depends(get_db)) -> Dict[str, Any]:
         "checks": {}
     }
     
+    database_result, cache_result, *table_results = await asyncio.gather(
+        asyncio.to_thread(_check_database),
+        asyncio.to_thread(_check_cache),
+        *[asyncio.to_thread(_check_table, table) for table in HEALTH_CHECK_TABLES],
+        return_exceptions=True
+    )
+    
     # 1. 数据库连接检查
-    try:
-        db.execute(text("SELECT 1"))
-        health_status["checks"]["database"] = {
-            "status": "healthy",
-            "message": "数据库连接正常"
-        }
-    except Exception as e:
+    if isinstance(database_result, Exception):
         health_status["checks"]["database"] = {
             "status": "unhealthy", 
-            "message": f"数据库连接失败: {str(e)}"
+            "message": f"数据库连接失败: {str(database_result)}"
         }
         health_status["status"] = "unhealthy"
+    else:
+        health_status["checks"]["database"] = {
+            "status": "healthy",
+            "message": "数据库连接正常"
+        }
     
     # 2. Redis缓存检查
-    try:
-        if cache.redis_client:
-            cache.redis_client.ping()
-            health_status["checks"]["cache"] = {
-                "status": "healthy",
-                "message": "Redis缓存连接正常"
-            }
-        else:
-            health_status["checks"]["cache"] = {
-                "status": "degraded",
-                "message": "Redis未启用，使用内存缓存"
-            }
-    except Exception as e:
+    if isinstance(cache_result, Exception):
         health_status["checks"]["cache"] = {
             "status": "unhealthy",
-            "message": f"Redis连接失败: {str(e)}"
+            "message": f"Redis连接失败: {str(cache_result)}"
         }
-    
-    # 3. 数据库表检查
-    try:
-        # 检查核心表是否存在
-        tables = ['users', 'payment_orders', 'payment_packages', 'stocks']
-        missing_tables = []
-        
-        for table in tables:
-            result = db.execute(text(f"SELECT COUNT(*) FROM {table} LIMIT 1"))
-            
-        health_status["checks"]["database_tables"] = {
+    elif cache_result:
+        health_status["checks"]["cache"] = {
             "status": "healthy",
-            "message": "核心数据表正常"
+            "message": "Redis缓存连接正常"
         }
-        
-    except Exception as e:
+    else:
+        health_status["checks"]["cache"] = {
+            "status": "degraded",
+            "message": "Redis未启用，使用内存缓存"
+        }
+    
+    # 3. 数据库表检查
+    table_errors = [
+        f"{table}: {str(result)}"
+        for table, result in zip(HEALTH_CHECK_TABLES, table_results)
+        if isinstance(result, Exception)
+    ]
+    if table_errors:
         health_status["checks"]["database_tables"] = {
             "status": "unhealthy",
-            "message": f"数据表检查失败: {str(e)}"
+            "message": f"数据表检查失败: {'; '.join(table_errors)}"
         }
         health_status["status"] = "unhealthy"
+    else:
+        health_status["checks"]["database_tables"] = {
+            "status": "healthy",
+            "message": "核心数据表正常"
+        }
     
     return health_status
 
@@ -17,13 +17,13 @@ class SimpleCache:
     
     def get(self, key: str) -> Optional[Any]:
         """获取缓存值"""
-        if key in self._cache:
-            cache_item = self._cache[key]
+        cache_item = self._cache.get(key)
+        if cache_item is not None:
             if cache_item['expires_at'] > time.time():
                 return cache_item['value']
             else:
-                # 过期删除
-                del self._cache[key]
+                # 过期删除（使用 pop，线程池中并发过期时不会抛 KeyError）
+                self._cache.pop(key, None)
         return None
     
     def set(self, key: str, value: Any, ttl: int = 300) -> None:
@@ -35,8 +35,7 @@ class SimpleCache:
     
     def delete(self, key: str) -> None:
         """删除缓存"""
-        if key in self._cache:
-            del self._cache[key]
+        self._cache.pop(key, None)
     
     def clear(self) -> None:
         """清空所有缓存"""
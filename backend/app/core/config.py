@@ -82,6 +82,11 @@ class Settings(BaseSettings):
     DATABASE_MAX_OVERFLOW: int = 20
     DATABASE_POOL_TIMEOUT: int = 30
     DATABASE_POOL_RECYCLE: int = 3600
+    # 健康检查等监控探测使用的独立连接池（与业务连接池隔离）
+    DATABASE_MONITOR_POOL_SIZE: int = 5
+    DATABASE_MONITOR_POOL_TIMEOUT: int = 5
+    # 只读副本连接串，配置后只读查询接口使用副本；未配置时使用主库
+    DATABASE_READ_URL: Optional[str] = None
     
     # 支付配置
     PAYMENT_ORDER_TIMEOUT_HOURS: int = 2  # 支付订单超时时间（小时）
@@ -3,10 +3,11 @@
 Database Connection and Session Management
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from app.core.config import settings, get_database_url
 
 # 创建数据库引擎
@@ -23,6 +24,62 @@ engine = create_engine(
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 监控探测专用引擎：连接数固定且不溢出，健康检查并发探测时不会占满业务连接池
+monitor_engine = create_engine(
+    get_database_url(),
+    pool_pre_ping=True,
+    pool_size=settings.DATABASE_MONITOR_POOL_SIZE,
+    max_overflow=0,
+    pool_timeout=settings.DATABASE_MONITOR_POOL_TIMEOUT,
+    pool_recycle=settings.DATABASE_POOL_RECYCLE,
+    echo=settings.DEBUG
+)
+
+
+# 只读副本引擎：配置了 DATABASE_READ_URL 时只读接口的查询走副本，减轻主库压力
+if settings.DATABASE_READ_URL:
+    read_engine = create_engine(
+        settings.DATABASE_READ_URL,
+        pool_pre_ping=True,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        echo=settings.DEBUG
+    )
+
+    @event.listens_for(read_engine, "connect")
+    def _set_read_only_session(dbapi_connection, connection_record):
+        """副本连接设为只读事务，InnoDB 对只读事务有更轻量的处理"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("SET SESSION TRANSACTION READ ONLY")
+        cursor.close()
+else:
+    read_engine = engine
+
+# 只读会话工厂
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
+def get_async_database_url() -> str:
+    """将同步驱动 (pymysql) 的连接串转换为异步驱动 (aiomysql)"""
+    return get_database_url().replace("mysql+pymysql://", "mysql+aiomysql://", 1)
+
+
+# 创建异步数据库引擎（供高并发的只读查询接口使用）
+async_engine = create_async_engine(
+    get_async_database_url(),
+    pool_pre_ping=True,
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+    pool_recycle=settings.DATABASE_POOL_RECYCLE,
+    echo=settings.DEBUG
+)
+
+# 创建异步会话工厂
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # 创建基础模型类
 Base = declarative_base()
 
@@ -39,6 +96,27 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_read_db() -> Generator[Session, None, None]:
+    """
+    获取只读数据库会话
+    用作只读查询接口的依赖注入，配置了只读副本时连接副本
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    获取异步数据库会话
+    用作 FastAPI 的依赖注入，查询期间不占用线程池
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def create_tables():
     """创建所有数据表"""
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,29 @@
+"""
+日期解析工具函数
+"""
+
+from datetime import date, datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1024)
+def parse_date(value: str) -> date:
+    """
+    解析 YYYY-MM-DD 格式的日期字符串
+
+    常规格式直接拆分转换并缓存结果，避免 strptime 每次加锁和正则匹配；
+    非常规输入回退到 strptime，保持原有的 ValueError 行为
+    """
+    parts = value.split('-')
+    if (
+        len(parts) == 3
+        and len(parts[0]) == 4
+        and 1 <= len(parts[1]) <= 2
+        and 1 <= len(parts[2]) <= 2
+        and all(part.isascii() and part.isdigit() for part in parts)
+    ):
+        try:
+            return date(int(parts[0]), int(parts[1]), int(parts[2]))
+        except ValueError:
+            pass
+    return datetime.strptime(value, '%Y-%m-%d').date()
@@ -0,0 +1,42 @@
+"""
+HTTP 条件请求 (ETag / If-None-Match) 工具函数
+"""
+
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts: Any, weak: bool = False) -> str:
+    """根据给定的组成部分生成 ETag（带引号）"""
+    raw = ":".join("" if part is None else str(part) for part in parts)
+    digest = hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """检查请求头 If-None-Match 是否命中当前 ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    # If-None-Match 采用弱比较：忽略 W/ 前缀
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def not_modified(etag: str, cache_control: Optional[str] = None) -> Response:
+    """构造 304 Not Modified 响应"""
+    headers = {"ETag": etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    return Response(status_code=304, headers=headers)
@@ -4,6 +4,7 @@
 
 import logging
 import logging.handlers
+import queue
 import sys
 from pathlib import Path
 from typing import Optional
@@ -40,12 +41,17 @@ class JSONFormatter(logging.Formatter):
         return json.dumps(log_entry, ensure_ascii=False)
 
 
+# 后台日志监听线程（异步写日志时使用）
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
 def setup_logging(
     log_level: str = "INFO",
     log_file: Optional[str] = None,
     max_file_size: int = 10 * 1024 * 1024,  # 10MB
     backup_count: int = 5,
     use_json_format: bool = False,
+    use_queue: bool = True,
 ) -> None:
     """
     配置应用程序日志
@@ -56,14 +62,18 @@ def setup_logging(
         max_file_size: 单个日志文件最大大小
         backup_count: 保留的日志文件数量
         use_json_format: 是否使用JSON格式
+        use_queue: 是否通过队列异步写日志（请求线程只入队，由后台线程写控制台/文件）
     """
+    global _queue_listener
     
     # 创建根日志器
     root_logger = logging.getLogger()
     root_logger.setLevel(getattr(logging, log_level.upper()))
     
     # 清除现有的处理器
+    shutdown_logging()
     root_logger.handlers.clear()
+    handlers = []
     
     # 设置日志格式
     if use_json_format:
@@ -77,7 +87,7 @@ def setup_logging(
     # 控制台处理器
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    handlers.append(console_handler)
     
     # 文件处理器
     if log_file:
@@ -93,13 +103,33 @@ def setup_logging(
             encoding='utf-8'
         )
         file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    if use_queue:
+        # 请求路径上只做入队操作，实际的格式化和 I/O 在后台线程完成
+        log_queue = queue.SimpleQueue()
+        root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        _queue_listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        _queue_listener.start()
+    else:
+        for handler in handlers:
+            root_logger.addHandler(handler)
     
     # 配置第三方库的日志级别
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
 
 
+def shutdown_logging() -> None:
+    """停止后台日志线程，并把队列中剩余的日志写完"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
 def get_logger(name: str) -> logging.Logger:
     """获取指定名称的日志器"""
     return logging.getLogger(name)
@@ -0,0 +1,360 @@
+"""
+后台任务进度存储
+
+进度记录保存在 Redis 哈希中并设置过期时间，任意 worker 都能读取同一任务的进度，
+过期记录由 Redis 自动清理；进度变更通过 Redis 发布/订阅通知 SSE 连接。
+Redis 不可用时降级为进程内存储，通知改用 asyncio.Event。
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+import orjson
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+from app.core.redis_cache import cache as redis_cache
+
+logger = logging.getLogger(__name__)
+
+# 进度记录的保留时间（秒），每次更新后重新计时
+PROGRESS_TTL = 24 * 60 * 60
+
+# 进度版本号字段，每次更新递增，可用于生成 ETag
+VERSION_FIELD = "version"
+
+# 认领任务ID：记录不存在，或属于同一用户且状态为可重新创建时才写入，检查与写入在同一脚本中原子执行
+# KEYS: 进度键, 用户索引键
+# ARGV: 任务ID, 过期时间, 所属用户字段, 所属用户, 状态字段, 可重新创建的状态数 n, n 个状态, 字段/值...
+CLAIM_SCRIPT = """
+local n = tonumber(ARGV[6])
+if redis.call("exists", KEYS[1]) == 1 then
+    if redis.call("hget", KEYS[1], ARGV[3]) ~= ARGV[4] then
+        return 0
+    end
+    local status = redis.call("hget", KEYS[1], ARGV[5])
+    local reclaimable = false
+    for i = 7, 6 + n do
+        if status == ARGV[i] then
+            reclaimable = true
+        end
+    end
+    if not reclaimable then
+        return 0
+    end
+    redis.call("del", KEYS[1])
+end
+redis.call("hset", KEYS[1], unpack(ARGV, 7 + n))
+redis.call("expire", KEYS[1], ARGV[2])
+redis.call("sadd", KEYS[2], ARGV[1])
+redis.call("expire", KEYS[2], ARGV[2])
+return 1
+"""
+
+
+def _encode(fields: Dict[str, Any]) -> Dict[str, bytes]:
+    """哈希字段值统一按 JSON 编码，保留数字、列表等类型"""
+    return {key: orjson.dumps(value) for key, value in fields.items()}
+
+
+def _decode(data: Dict[bytes, bytes]) -> Dict[str, Any]:
+    return {key.decode("utf-8"): orjson.loads(value) for key, value in data.items()}
+
+
+class ProgressStore:
+    """
+    任务进度存储，namespace 用于区分不同模块的任务
+
+    owner_field 指定进度记录中表示任务所属用户的字段，按用户列出任务时
+    通过所属用户到任务ID的索引查找，不遍历所有任务
+    """
+
+    def __init__(self, namespace: str, owner_field: str, ttl: int = PROGRESS_TTL):
+        self.namespace = namespace
+        self.owner_field = owner_field
+        self.ttl = ttl
+        self._async_client: Optional[aioredis.Redis] = None
+
+        # Redis 不可用时的进程内降级存储
+        self._local: Dict[str, Dict[str, Any]] = {}
+        self._local_sets: Dict[str, Dict[str, set]] = {}
+        self._local_owners: Dict[str, set] = defaultdict(set)
+        self._events: Dict[str, asyncio.Event] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def _redis(self):
+        return redis_cache.redis_client
+
+    def _key(self, task_id: str) -> str:
+        return f"progress:{self.namespace}:{task_id}"
+
+    def _channel(self, task_id: str) -> str:
+        return f"{self._key(task_id)}:events"
+
+    def _set_key(self, task_id: str, name: str) -> str:
+        # 与进度哈希使用不同前缀，遍历任务时不会匹配到集合键
+        return f"progress_set:{self.namespace}:{task_id}:{name}"
+
+    def _owner_key(self, owner: str) -> str:
+        return f"progress_owner:{self.namespace}:{owner}"
+
+    def _get_async_client(self) -> aioredis.Redis:
+        """SSE 订阅使用异步客户端，等待消息时不阻塞事件循环"""
+        if self._async_client is None:
+            self._async_client = aioredis.Redis(
+                host=getattr(settings, 'REDIS_HOST', 'localhost'),
+                port=getattr(settings, 'REDIS_PORT', 6379),
+                db=getattr(settings, 'REDIS_DB', 0),
+                password=getattr(settings, 'REDIS_PASSWORD', None),
+                socket_connect_timeout=5
+            )
+        return self._async_client
+
+    def create(self, task_id: str, progress: Dict[str, Any]) -> None:
+        """创建任务进度记录（需在事件循环线程中调用）"""
+        owner = progress.get(self.owner_field)
+        progress = {**progress, VERSION_FIELD: 0}
+
+        if self._redis is None:
+            self._loop = asyncio.get_running_loop()
+            self._local[task_id] = dict(progress)
+            self._events[task_id] = asyncio.Event()
+            if owner:
+                self._local_owners[owner].add(task_id)
+            return
+
+        key = self._key(task_id)
+        pipe = self._redis.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping=_encode(progress))
+        pipe.expire(key, self.ttl)
+        if owner:
+            owner_key = self._owner_key(owner)
+            pipe.sadd(owner_key, task_id)
+            pipe.expire(owner_key, self.ttl)
+        pipe.execute()
+
+    def claim(self, task_id: str, progress: Dict[str, Any], status_field: str = "status",
+              reclaimable_statuses: Tuple[str, ...] = ("completed", "failed")) -> bool:
+        """
+        原子地创建任务进度记录，返回是否创建成功（需在事件循环线程中调用）
+
+        任务ID已被其他用户占用，或同一用户的任务尚未结束时不覆盖，返回 False；
+        同一用户已结束的任务可以重新创建
+        """
+        owner = progress[self.owner_field]
+
+        if self._redis is None:
+            existing = self._local.get(task_id)
+            if existing is not None and (
+                existing.get(self.owner_field) != owner
+                or existing.get(status_field) not in reclaimable_statuses
+            ):
+                return False
+            self.create(task_id, progress)
+            return True
+
+        fields = []
+        for field, value in _encode({**progress, VERSION_FIELD: 0}).items():
+            fields.extend((field, value))
+        claimed = self._redis.eval(
+            CLAIM_SCRIPT, 2, self._key(task_id), self._owner_key(owner),
+            task_id, self.ttl, self.owner_field, orjson.dumps(owner), status_field,
+            len(reclaimable_statuses), *(orjson.dumps(status) for status in reclaimable_statuses),
+            *fields
+        )
+        return claimed == 1
+
+    def update(self, task_id: str, **fields: Any) -> None:
+        """
+        更新进度字段并通知订阅者，可在导入线程中调用
+
+        进度只是辅助信息，写入失败只记录日志，不中断导入
+        """
+        if not fields:
+            return
+
+        if self._redis is None:
+            progress = self._local.get(task_id)
+            if progress is not None:
+                progress.update(fields)
+                progress[VERSION_FIELD] = progress.get(VERSION_FIELD, 0) + 1
+                self._notify_local(task_id)
+            return
+
+        try:
+            key = self._key(task_id)
+            pipe = self._redis.pipeline()
+            pipe.hset(key, mapping=_encode(fields))
+            # 版本号按 JSON 编码后就是整数字符串，可以直接 HINCRBY
+            pipe.hincrby(key, VERSION_FIELD, 1)
+            pipe.expire(key, self.ttl)
+            pipe.publish(self._channel(task_id), b"1")
+            pipe.execute()
+        except Exception as e:
+            logger.warning("更新任务进度失败 %s: %s", task_id, e)
+
+    def add_to_set(self, task_id: str, name: str, member: Any) -> int:
+        """
+        向任务关联的集合中加入成员，返回加入后的集合大小
+
+        SADD 与 SCARD 在同一事务中执行，并发请求（包括不同 worker）下计数准确，
+        重复加入同一成员不会重复计数
+        """
+        if self._redis is None:
+            members = self._local_sets.setdefault(task_id, {}).setdefault(name, set())
+            members.add(member)
+            return len(members)
+
+        key = self._set_key(task_id, name)
+        pipe = self._redis.pipeline()
+        pipe.sadd(key, member)
+        pipe.expire(key, self.ttl)
+        pipe.scard(key)
+        return pipe.execute()[-1]
+
+    def set_size(self, task_id: str, name: str) -> int:
+        """返回任务关联集合的大小"""
+        if self._redis is None:
+            return len(self._local_sets.get(task_id, {}).get(name, ()))
+        return self._redis.scard(self._set_key(task_id, name))
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """读取任务进度，任务不存在或已过期时返回 None"""
+        if self._redis is None:
+            progress = self._local.get(task_id)
+            return dict(progress) if progress is not None else None
+
+        data = self._redis.hgetall(self._key(task_id))
+        return _decode(data) if data else None
+
+    def delete(self, task_id: str) -> None:
+        """删除任务进度记录，并通知订阅者结束"""
+        if self._redis is None:
+            progress = self._local.pop(task_id, None)
+            if progress and progress.get(self.owner_field):
+                self._local_owners[progress[self.owner_field]].discard(task_id)
+            self._local_sets.pop(task_id, None)
+            event = self._events.pop(task_id, None)
+            if event is not None:
+                event.set()
+            return
+
+        key = self._key(task_id)
+        owner = self._redis.hget(key, self.owner_field)
+        pipe = self._redis.pipeline()
+        pipe.delete(key)
+        if owner:
+            pipe.srem(self._owner_key(orjson.loads(owner)), task_id)
+        for set_key in self._redis.scan_iter(match=self._set_key(task_id, "*")):
+            pipe.delete(set_key)
+        pipe.publish(self._channel(task_id), b"1")
+        pipe.execute()
+
+    def iter_owner_tasks(self, owner: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """遍历指定用户的任务进度，已过期的任务顺带从索引中移除"""
+        if self._redis is None:
+            for task_id in list(self._local_owners.get(owner, ())):
+                progress = self._local.get(task_id)
+                if progress is not None:
+                    yield task_id, dict(progress)
+            return
+
+        owner_key = self._owner_key(owner)
+        task_ids = [member.decode("utf-8") for member in self._redis.smembers(owner_key)]
+        if not task_ids:
+            return
+
+        pipe = self._redis.pipeline()
+        for task_id in task_ids:
+            pipe.hgetall(self._key(task_id))
+        expired = []
+        for task_id, data in zip(task_ids, pipe.execute()):
+            if data:
+                yield task_id, _decode(data)
+            else:
+                expired.append(task_id)
+        if expired:
+            self._redis.srem(owner_key, *expired)
+
+    def _notify_local(self, task_id: str) -> None:
+        """降级模式下唤醒等待该任务的订阅者，导入线程中调用时转交事件循环执行"""
+        if self._loop is None:
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._swap_event(task_id)
+        else:
+            self._loop.call_soon_threadsafe(self._swap_event, task_id)
+
+    def _swap_event(self, task_id: str) -> None:
+        """
+        触发当前事件并换上新事件
+
+        每个订阅者等待的是读取进度前取到的事件，多个订阅者之间不会互相清除通知
+        """
+        event = self._events.get(task_id)
+        if event is not None:
+            self._events[task_id] = asyncio.Event()
+            event.set()
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator["ProgressSubscription"]:
+        """
+        订阅任务进度变更
+
+        先订阅再读取进度，读取之后发生的更新一定会唤醒 wait()
+        """
+        if self._redis is None:
+            yield _LocalSubscription(self, task_id)
+            return
+
+        pubsub = self._get_async_client().pubsub()
+        await pubsub.subscribe(self._channel(task_id))
+        try:
+            yield _RedisSubscription(pubsub)
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+
+
+class ProgressSubscription(ABC):
+    """进度变更订阅"""
+
+    @abstractmethod
+    async def wait(self) -> None:
+        """等待下一次进度变更"""
+
+
+class _LocalSubscription(ProgressSubscription):
+
+    def __init__(self, store: ProgressStore, task_id: str):
+        self._store = store
+        self._task_id = task_id
+        self._event = store._events.get(task_id)
+
+    async def wait(self) -> None:
+        if self._event is not None:
+            await self._event.wait()
+        self._event = self._store._events.get(self._task_id)
+
+
+class _RedisSubscription(ProgressSubscription):
+
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    async def wait(self) -> None:
+        while await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=None) is None:
+            pass
+        # 合并已到达的多条通知，只推送一次最新进度
+        while await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=0) is not None:
+            pass
@@ -169,12 +169,26 @@ class CacheKeys:
     USER_PROFILE = "user:profile:{user_id}"
     USER_STATS = "user:stats:{user_id}"
     USER_PERMISSIONS = "user:permissions:{user_id}"
+    USER_MEMBERSHIP = "user:membership:{user_id}"
+    USER_PURCHASE_HISTORY = "user:purchase_history:{user_id}"
     
     # 支付相关缓存
     PAYMENT_PACKAGES = "payment:packages"
+    PAYMENT_PACKAGES_LIST = "payment:packages:list:{is_active}"
+    ADMIN_PACKAGES_LIST = "payment:packages:admin:list:{skip}:{limit}:{is_active}"
+    ADMIN_PACKAGES_STATS = "payment:packages:admin:stats"
+    ADMIN_PACKAGES_VERSION = "payment:packages:admin:version"
+    PAYMENT_PACKAGES_ALL = "payment:packages*"
     PAYMENT_ORDER = "payment:order:{order_id}"
+    WECHAT_ORDER_QUERY = "payment:wechat_query:{out_trade_no}"
+    WECHAT_ORDER_QUERY_LOCK = "payment:wechat_query:{out_trade_no}:lock"
     PAYMENT_STATS = "payment:stats"
     
+    # 每日交易统计缓存（按交易日期）
+    MARKET_DISTRIBUTION = "daily_trading:market_distribution:{trading_date}"
+    CODE_FORMAT_ANALYSIS = "daily_trading:code_formats:{trading_date}"
+    DAILY_TRADING_REPORTS = "daily_trading:*"
+    
     # 系统配置缓存
     SYSTEM_CONFIG = "system:config"
     API_STATS = "api:stats"
@@ -0,0 +1,74 @@
+"""
+TXT 上传文件工具函数
+
+支持直接上传 .txt 文件或 gzip 压缩后的 .txt.gz 文件；
+是否需要解压按文件头判断，不依赖扩展名
+"""
+
+import zlib
+from typing import BinaryIO, Iterator
+
+# 允许上传的文件扩展名
+TXT_UPLOAD_SUFFIXES = ('.txt', '.txt.gz')
+
+# gzip 文件头魔数
+GZIP_MAGIC = b'\x1f\x8b'
+
+# zlib 解压 gzip 格式数据时使用的 wbits
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+# 每次解压输出的最大字节数，高压缩比的数据块也不会一次解压到内存中
+DECOMPRESS_OUTPUT_CHUNK_SIZE = 1024 * 1024
+
+# 解压后内容的总大小上限，防止压缩炸弹占满内存或磁盘
+MAX_DECOMPRESSED_BYTES = 1024 * 1024 * 1024
+
+
+class DecompressedSizeExceeded(ValueError):
+    """解压后内容超过大小上限"""
+
+
+def is_txt_upload(filename: str) -> bool:
+    """文件名是否为允许上传的 TXT 或 TXT.GZ 文件"""
+    return filename.lower().endswith(TXT_UPLOAD_SUFFIXES)
+
+
+def is_gzip_file(fileobj: BinaryIO) -> bool:
+    """根据文件头判断是否为 gzip 数据，读取后回到文件开头"""
+    fileobj.seek(0)
+    head = fileobj.read(len(GZIP_MAGIC))
+    fileobj.seek(0)
+    return head == GZIP_MAGIC
+
+
+class GzipStreamDecoder:
+    """
+    增量解压 gzip 数据，支持多个 gzip 成员拼接的文件
+
+    解压结果按不超过 DECOMPRESS_OUTPUT_CHUNK_SIZE 的块逐个返回，
+    累计解压大小超过 max_output 时抛出 DecompressedSizeExceeded
+    """
+
+    def __init__(self, max_output: int = MAX_DECOMPRESSED_BYTES):
+        self._decompressor = zlib.decompressobj(GZIP_WBITS)
+        self.max_output = max_output
+        self.total_output = 0
+
+    def decompress(self, data: bytes) -> Iterator[bytes]:
+        """解压一块数据，逐块返回已解出的内容"""
+        while data:
+            if self._decompressor.eof:
+                self._decompressor = zlib.decompressobj(GZIP_WBITS)
+            piece = self._decompressor.decompress(data, DECOMPRESS_OUTPUT_CHUNK_SIZE)
+            self.total_output += len(piece)
+            if self.total_output > self.max_output:
+                raise DecompressedSizeExceeded(f"解压后内容超过 {self.max_output} 字节")
+            if piece:
+                yield piece
+            # 输出达到上限时剩余输入在 unconsumed_tail 中，成员结束时下一个成员在 unused_data 中
+            data = self._decompressor.unconsumed_tail or self._decompressor.unused_data
+
+    @property
+    def eof(self) -> bool:
+        """当前 gzip 成员是否已完整解压"""
+        return self._decompressor.eof
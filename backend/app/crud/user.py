@@ -64,7 +64,7 @@ class UserCRUD:
         if not db_user:
             return None
         
-        update_data = user_update.dict(exclude_unset=True)
+        update_data = user_update.model_dump(exclude_unset=True)
         
         # 检查用户名是否已存在
         if 'username' in update_data:
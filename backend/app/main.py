@@ -9,13 +9,16 @@ from contextlib import asynccontextmanager
 
 # 导入路由和配置
 from app.api.api_v1.api import api_router
+from app.api.api_v1.endpoints.data_import import UPLOAD_SIZE_LIMITS as DATA_IMPORT_UPLOAD_LIMITS
 from app.api.simple_import import router as simple_import_router
 from app.core.config import settings
-from app.core.logging import setup_logging
+from app.core.logging import setup_logging, shutdown_logging
+from app.core.database import async_engine
 from app.core.exception_handlers import setup_exception_handlers
 from app.middleware.request_middleware import (
     RequestLoggingMiddleware,
-    RateLimitMiddleware
+    RateLimitMiddleware,
+    UploadSizeLimitMiddleware
 )
 
 
@@ -32,7 +35,9 @@ async def lifespan(app: FastAPI):
     print("📊 日志系统已初始化")
     yield
     # 关闭时执行
+    await async_engine.dispose()
     print("🛑 股票分析系统已关闭")
+    shutdown_logging()
 
 
 # 创建 FastAPI 应用
@@ -51,6 +56,10 @@ setup_exception_handlers(app)
 # 添加中间件
 app.add_middleware(RequestLoggingMiddleware, log_requests=True, log_responses=False)
 app.add_middleware(RateLimitMiddleware, max_requests=200, window_seconds=60)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={f"/api/v1/data{path}": max_bytes for path, max_bytes in DATA_IMPORT_UPLOAD_LIMITS.items()}
+)
 
 # 配置 CORS 中间件
 app.add_middleware(
@@ -4,7 +4,7 @@
 
 import time
 import uuid
-from typing import Callable
+from typing import Callable, Dict
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -183,6 +183,37 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             self.requests[client_ip].append((current_time, 1))
 
 
+class UploadSizeLimitMiddleware(BaseHTTPMiddleware):
+    """
+    上传大小预检中间件
+    根据 Content-Length 在读取请求体之前拒绝超限的上传，避免接收并落盘整个文件后才返回错误
+    """
+    
+    # multipart 边界和字段头的额外开销
+    MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+    
+    def __init__(self, app, limits: Dict[str, int] = None):
+        super().__init__(app)
+        self.limits = limits or {}  # {路径: 文件大小上限(字节)}
+    
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        max_bytes = self.limits.get(request.url.path)
+        content_length = request.headers.get("content-length")
+        
+        if max_bytes is not None and content_length and content_length.isdigit():
+            if int(content_length) > max_bytes + self.MULTIPART_OVERHEAD_BYTES:
+                return JSONResponse(
+                    status_code=413,
+                    content={
+                        "error": True,
+                        "message": f"上传内容过大，最大允许 {max_bytes // (1024 * 1024)}MB",
+                        "status_code": 413
+                    }
+                )
+        
+        return await call_next(request)
+
+
 class CORSMiddleware(BaseHTTPMiddleware):
     """简单的CORS中间件"""
     
@@ -2,7 +2,7 @@
 概念相关数据模型
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, Date, DECIMAL, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, DECIMAL, Boolean, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -53,4 +53,10 @@ class DailyConceptSum(Base):
     created_at = Column(DateTime, default=func.now(), comment="创建时间")
     
     # 关联关系
-    concept = relationship("Concept", back_populates="concept_sums")
\ No newline at end of file
+    concept = relationship("Concept", back_populates="concept_sums")
+    
+    # 复合索引：覆盖按日期筛选新高概念、按日期取热度排行两类热点查询
+    __table_args__ = (
+        Index('idx_dcs_date_new_high_days', 'trade_date', 'is_new_high', 'days_for_high_check'),
+        Index('idx_dcs_date_heat', trade_date, total_heat_value.desc()),
+    )
\ No newline at end of file
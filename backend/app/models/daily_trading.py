@@ -1,8 +1,28 @@
-from sqlalchemy import Column, String, Integer, Date, DateTime, Index, Boolean, Float, Text
+from sqlalchemy import Column, String, Integer, SmallInteger, Date, DateTime, Index, Boolean, Float, Text, Computed
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import deferred
 from app.core.database import Base
 import datetime
 
+# 原始股票代码格式分类（生成列 code_format 的取值）
+CODE_FORMAT_LABELS = {
+    1: 'SH前缀',
+    2: 'SZ前缀',
+    3: 'BJ前缀',
+    4: '纯数字6位',
+    0: '其他格式',
+}
+
+# 写入时计算一次格式分类，统计接口不再逐行匹配正则
+CODE_FORMAT_EXPRESSION = (
+    "CASE "
+    "WHEN LEFT(original_stock_code, 2) = 'SH' THEN 1 "
+    "WHEN LEFT(original_stock_code, 2) = 'SZ' THEN 2 "
+    "WHEN LEFT(original_stock_code, 2) = 'BJ' THEN 3 "
+    "WHEN original_stock_code REGEXP '^[0-9]{6}$' THEN 4 "
+    "ELSE 0 END"
+)
+
 class DailyTrading(Base):
     """每日交易数据表"""
     __tablename__ = "daily_trading"
@@ -13,12 +33,20 @@ class DailyTrading(Base):
     stock_code = Column(String(20), nullable=False, index=True, comment="股票代码")
     trading_date = Column(Date, nullable=False, index=True, comment="交易日期")
     trading_volume = Column(Integer, nullable=False, comment="交易量")
+    # 只在按市场统计时显式查询，默认不加载；已有数据库需先执行 scripts/database/migrate_stock_codes.py
+    market_prefix = deferred(Column(String(2), Computed("LEFT(original_stock_code, 2)", persisted=True), comment="市场前缀（由原始代码生成）"))
+    # 代码格式分类，取值含义见 CODE_FORMAT_LABELS；同样只在统计时查询，由 migrate_stock_codes.py 添加
+    code_format = deferred(Column(SmallInteger, Computed(CODE_FORMAT_EXPRESSION, persisted=True), comment="代码格式（由原始代码生成）"))
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     
     # 索引结构
     __table_args__ = (
         Index('idx_stock_date', 'stock_code', 'trading_date'),
         Index('idx_date_volume', 'trading_date', 'trading_volume'),
+        Index('idx_date_original_code', 'trading_date', 'original_stock_code'),
+        Index('idx_date_normalized_code', 'trading_date', 'normalized_stock_code'),
+        Index('idx_date_prefix_volume', 'trading_date', 'market_prefix', 'trading_volume'),
+        Index('idx_date_format_volume', 'trading_date', 'code_format', 'trading_volume'),
     )
 
 
@@ -3,6 +3,7 @@
 """
 
 from sqlalchemy import Column, Integer, String, Date, Text, DateTime, Enum, Index
+from sqlalchemy.orm import deferred
 from app.core.database import Base
 from datetime import datetime
 import enum
@@ -30,6 +31,8 @@ class DataImportRecord(Base):
     import_date = Column(Date, nullable=False, comment='导入日期')
     import_type = Column(Enum('csv', 'txt', 'both', name='importtype'), nullable=False, comment='导入类型')
     file_name = Column(String(255), nullable=False, comment='文件名')
+    # 已有数据库需执行 scripts/database/migrate_import_file_hash.py 添加该字段；延迟加载，未迁移时常规查询不受影响
+    file_sha256 = deferred(Column(String(64), nullable=True, comment='文件内容SHA-256'))
     imported_records = Column(Integer, default=0, comment='导入记录数')
     skipped_records = Column(Integer, default=0, comment='跳过记录数')
     import_status = Column(Enum('success', 'failed', 'partial', name='importstatus'), default='success', comment='导入状态')
@@ -42,5 +45,9 @@ class DataImportRecord(Base):
         Index('idx_import_type', 'import_type'),
         Index('idx_import_status', 'import_status'),
         Index('uk_date_type_file', 'import_date', 'import_type', 'file_name', unique=True),
+        # 完整性检查按 (日期, 类型, 状态) 过滤，uk_date_type_file 只能覆盖前两列
+        Index('idx_date_type_status', 'import_date', 'import_type', 'import_status'),
+        # 重复上传检测按 (哈希, 类型, 状态) 查找
+        Index('idx_sha256_type_status', 'file_sha256', 'import_type', 'import_status'),
         {'comment': '数据导入记录表'}
     )
\ No newline at end of file
@@ -8,8 +8,8 @@ Payment related models - Fixed version
 3. 提供验证方法确保数据一致性
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, DECIMAL, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, DECIMAL, ForeignKey, JSON, Index, Computed
+from sqlalchemy.orm import relationship, deferred, joinedload, load_only
 from sqlalchemy.sql import func
 from datetime import datetime
 from typing import List
@@ -160,6 +160,8 @@ class PaymentOrder(Base):
     client_ip = Column(String(45))
     user_agent = Column(Text)
     notify_data = Column(JSON)
+    # 只用于唯一索引去重，查询时不加载；已有数据库需先执行 scripts/database/migrate_payment_pending_dedupe.py
+    pending_user_id = deferred(Column(Integer, Computed("CASE WHEN status = 'pending' THEN user_id END"), comment="待支付订单的用户ID（由状态生成，用于去重）"))
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -169,6 +171,29 @@ class PaymentOrder(Base):
     membership_logs = relationship("MembershipLog", back_populates="payment_order")
     refund_records = relationship("RefundRecord", back_populates="payment_order")
 
+    # 复合索引：用户+状态+时间（按状态筛选的订单列表、会员状态查询）
+    # 用户+时间+ID（订单列表游标分页）
+    # 用户+状态+金额（支付统计覆盖索引）
+    # 唯一索引：每个用户同一套餐类型最多一个待支付订单
+    __table_args__ = (
+        Index('idx_payment_orders_user_status_time', 'user_id', 'status', created_at.desc()),
+        Index('idx_payment_orders_user_created', 'user_id', created_at.desc(), id.desc()),
+        Index('idx_payment_orders_user_status_amount', 'user_id', 'status', 'amount'),
+        Index('uk_payment_orders_pending', 'pending_user_id', 'package_type', unique=True),
+    )
+
+
+# 支付页面和支付状态查询只加载用到的订单列和套餐名称，
+# 轮询时不加载二维码链接、通知数据等大字段
+ORDER_STATUS_LOAD_OPTIONS = (
+    load_only(
+        PaymentOrder.user_id, PaymentOrder.out_trade_no, PaymentOrder.amount, PaymentOrder.status,
+        PaymentOrder.payment_method, PaymentOrder.created_at, PaymentOrder.paid_at,
+        PaymentOrder.transaction_id, PaymentOrder.expire_time
+    ),
+    joinedload(PaymentOrder.payment_package).load_only(PaymentPackage.name),
+)
+
 
 class PaymentNotification(Base):
     """支付通知记录表"""
@@ -6,7 +6,7 @@ Payment related schemas
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional, List, Any, Dict
-from pydantic import BaseModel, Field, validator, field_serializer
+from pydantic import BaseModel, ConfigDict, Field, field_serializer
 from enum import Enum
 
 
@@ -34,8 +34,7 @@ class PaymentPackage(PaymentPackageBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ============ 支付订单相关 Schema ============
@@ -69,8 +68,13 @@ class PaymentOrderResponse(BaseModel):
     def serialize_payment_method(self, value):
         return value.value.lower() if hasattr(value, 'value') else str(value).lower()
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PaymentOrderPage(BaseModel):
+    """支付订单分页响应（游标分页）"""
+    items: List[PaymentOrderResponse]
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有更多数据时为空")
 
 
 # ============ 支付通知相关 Schema ============
@@ -115,8 +119,7 @@ class PaymentCreate(BaseModel):
     payment_type: str = Field(..., description="支付类型")
     payment_method: str = Field(default="wechat", description="支付方式")
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class PaymentResponse(BaseModel):
@@ -130,5 +133,4 @@ class PaymentResponse(BaseModel):
     created_at: datetime
     completed_at: Optional[datetime] = None
     
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
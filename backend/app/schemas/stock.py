@@ -2,7 +2,7 @@
 股票相关的 Pydantic 模式
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
 from datetime import date, datetime
 from decimal import Decimal
@@ -22,8 +22,7 @@ class StockResponse(StockBase):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ConceptBase(BaseModel):
@@ -37,8 +36,7 @@ class ConceptResponse(ConceptBase):
     id: int
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class StockWithConcepts(BaseModel):
@@ -57,5 +55,4 @@ class StockChartData(BaseModel):
     pages_count: int
     total_reads: int
     
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -5,7 +5,7 @@ Stock Data Pydantic Schemas
 
 from typing import Optional, List
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class StockBase(BaseModel):
@@ -35,8 +35,7 @@ class StockResponse(StockBase):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class TradingDataBase(BaseModel):
@@ -60,8 +59,7 @@ class TradingDataResponse(TradingDataBase):
     stock_id: int
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ConceptBase(BaseModel):
@@ -91,8 +89,7 @@ class ConceptResponse(ConceptBase):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class StockConceptBase(BaseModel):
@@ -113,8 +110,7 @@ class StockConceptResponse(StockConceptBase):
     concept_id: int
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class AnalysisDataBase(BaseModel):
@@ -140,8 +136,7 @@ class AnalysisDataResponse(AnalysisDataBase):
     id: int
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ImportResult(BaseModel):
@@ -159,5 +154,4 @@ class StockConceptSummary(BaseModel):
     stock_name: str = Field(..., description="股票名称")
     concepts: List[str] = Field(..., description="概念列表")
     
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
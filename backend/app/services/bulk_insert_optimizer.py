@@ -2,6 +2,7 @@ from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.models.daily_trading import DailyTrading, ConceptDailySummary, StockConceptRanking, ConceptHighRecord
+from app.services.txt_import import invalidate_daily_trading_cache
 import logging
 from contextlib import contextmanager
 import time
@@ -79,6 +80,7 @@ class BulkInsertOptimizer:
 
                     logger.debug(f"批量插入交易数据: {len(batch)} 条 (总共: {total_inserted})")
 
+            invalidate_daily_trading_cache()
             end_time = time.time()
             logger.info(f"批量插入 {total_inserted} 条交易数据完成，耗时: {end_time - start_time:.2f} 秒")
 
@@ -2,15 +2,32 @@ from typing import List, Dict, Optional, BinaryIO
 from fastapi import UploadFile
 from sqlalchemy.orm import Session
 import os
+import shutil
 import tempfile
 import hashlib
 import logging
 from pathlib import Path
 import aiofiles
 import asyncio
+from app.core.dates import parse_date
 
 logger = logging.getLogger(__name__)
 
+# 合并分块时每次读写的块大小
+MERGE_BUFFER_SIZE = 8 * 1024 * 1024
+
+# 分块从上传流写入磁盘时每次复制的块大小
+CHUNK_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def _copy_stream_to_file(source: BinaryIO, target_path: Path) -> int:
+    """将文件对象从头复制到目标路径，返回写入的字节数"""
+    source.seek(0)
+    with open(target_path, 'wb') as target:
+        shutil.copyfileobj(source, target, CHUNK_COPY_BUFFER_SIZE)
+        return target.tell()
+
+
 class ChunkedUploadService:
     """分块上传服务 - 处理大文件上传"""
 
@@ -40,26 +57,34 @@ class ChunkedUploadService:
             "upload_path": str(upload_path)
         }
 
-    async def upload_chunk(self, upload_id: str, chunk_number: int,
-                          chunk_data: bytes) -> Dict[str, any]:
-        """上传单个分块"""
+    async def upload_chunk_from_stream(self, upload_id: str, chunk_number: int,
+                                       chunk_file: BinaryIO) -> Dict[str, any]:
+        """
+        上传单个分块，直接从上传文件对象复制到磁盘
+
+        在线程中按块复制，不把整个分块读入内存
+        """
         upload_path = self.upload_dir / upload_id
         if not upload_path.exists():
             raise ValueError("上传会话不存在")
 
-        chunk_file = upload_path / f"chunk_{chunk_number:06d}"
-
-        async with aiofiles.open(chunk_file, 'wb') as f:
-            await f.write(chunk_data)
+        chunk_path = upload_path / f"chunk_{chunk_number:06d}"
+        chunk_size = await asyncio.to_thread(_copy_stream_to_file, chunk_file, chunk_path)
 
         return {
             "chunk_number": chunk_number,
-            "chunk_size": len(chunk_data),
+            "chunk_size": chunk_size,
             "status": "uploaded"
         }
 
-    async def complete_upload(self, upload_id: str, filename: str) -> str:
-        """完成上传，合并所有分块"""
+    async def complete_upload(self, upload_id: str, filename: str,
+                              expected_hash: Optional[str] = None) -> str:
+        """
+        完成上传，合并所有分块
+
+        合并时按顺序计算文件的 SHA-256，传入 expected_hash 时校验文件完整性，
+        不一致则删除合并结果并抛出 ValueError
+        """
         upload_path = self.upload_dir / upload_id
         if not upload_path.exists():
             raise ValueError("上传会话不存在")
@@ -69,26 +94,31 @@ class ChunkedUploadService:
 
         # 合并文件
         final_file = upload_path / filename
+        hasher = hashlib.sha256()
         async with aiofiles.open(final_file, 'wb') as output_file:
             for chunk_file in chunk_files:
                 async with aiofiles.open(chunk_file, 'rb') as input_file:
                     while True:
-                        data = await input_file.read(8192)
+                        data = await input_file.read(MERGE_BUFFER_SIZE)
                         if not data:
                             break
+                        hasher.update(data)
                         await output_file.write(data)
 
         # 清理分块文件
         for chunk_file in chunk_files:
             chunk_file.unlink()
 
+        if expected_hash and hasher.hexdigest() != expected_hash.lower():
+            final_file.unlink()
+            raise ValueError("文件校验失败，SHA-256 与上传前声明的不一致")
+
         return str(final_file)
 
     async def cleanup_upload(self, upload_id: str):
         """清理上传临时文件"""
         upload_path = self.upload_dir / upload_id
         if upload_path.exists():
-            import shutil
             shutil.rmtree(upload_path)
 
 
@@ -171,8 +201,7 @@ class StreamingTxtProcessor:
             stock_code, date_str, volume_str = parts
 
             # 验证日期格式
-            from datetime import datetime
-            datetime.strptime(date_str, '%Y-%m-%d')
+            parse_date(date_str)
 
             # 验证交易量
             try:
@@ -3,7 +3,7 @@
 """
 
 from datetime import datetime, date
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import text, desc, asc, func
 import pandas as pd
@@ -249,6 +249,11 @@ class DailyAnalysisService:
     def get_concept_rankings(self, analysis_date: date, concept: Optional[str] = None, 
                            limit: int = 50) -> List[Dict[str, Any]]:
         """获取概念内个股排名"""
+        return list(self.iter_concept_rankings(analysis_date, concept, limit))
+    
+    def iter_concept_rankings(self, analysis_date: date, concept: Optional[str] = None,
+                              limit: int = 50, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """逐条产出概念内个股排名，分批从数据库拉取，内存占用与 limit 无关"""
         
         query = self.db.query(DailyConceptRanking).filter(
             DailyConceptRanking.analysis_date == analysis_date
@@ -260,10 +265,10 @@ class DailyAnalysisService:
         rankings = query.order_by(
             DailyConceptRanking.concept,
             DailyConceptRanking.net_inflow_rank
-        ).limit(limit).all()
+        ).limit(limit).yield_per(batch_size)
         
-        return [
-            {
+        for r in rankings:
+            yield {
                 "concept": r.concept,
                 "stock_code": r.stock_code,
                 "stock_name": r.stock_name,
@@ -277,8 +282,6 @@ class DailyAnalysisService:
                 "total_reads": r.total_reads or 0,
                 "industry": r.industry
             }
-            for r in rankings
-        ]
     
     def get_concept_summaries(self, analysis_date: date, limit: int = 50) -> List[Dict[str, Any]]:
         """获取概念汇总排名"""
@@ -3,19 +3,55 @@
 """
 
 import pandas as pd
+import asyncio
 import io
-from typing import Dict, List, Any, Optional
+import re
+from typing import Dict, List, Any, Optional, Union, BinaryIO, Iterator, Set, Tuple
+from sqlalchemy import insert, inspect, func, or_, and_
 from sqlalchemy.orm import Session
 from app.models import Stock, Concept, StockConcept, DailyStockData, DataImportRecord
 from datetime import datetime, date
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 批量插入时每条 INSERT 语句包含的行数
+BULK_INSERT_CHUNK_SIZE = 5000
+
+# 文件名中的日期格式（预编译正则，按顺序匹配）
+FILENAME_DATE_PATTERNS = [
+    (re.compile(r'(\d{4}-\d{2}-\d{2})'), '%Y-%m-%d'),  # 2025-08-28
+    (re.compile(r'(\d{4}_\d{2}_\d{2})'), '%Y_%m_%d'),  # 2025_08_28
+    (re.compile(r'(\d{8})'), '%Y%m%d'),                # 20250828
+    (re.compile(r'(\d{4})(\d{2})(\d{2})'), '%Y%m%d'),  # 分组形式的20250828
+    (re.compile(r'(\d{2}-\d{2}-\d{4})'), '%m-%d-%Y'),  # MM-DD-YYYY
+    (re.compile(r'(\d{2}/\d{2}/\d{4})'), '%m/%d/%Y'),  # MM/DD/YYYY
+]
 
 
 class DataImportService:
     """数据导入服务类"""
     
+    # data_import_records 是否已有 file_sha256 字段（首次使用时检查一次）
+    _file_sha256_available: Optional[bool] = None
+    
     def __init__(self, db: Session):
         self.db = db
     
+    def _has_file_sha256_column(self) -> bool:
+        """file_sha256 字段由迁移脚本添加，未迁移的数据库跳过按哈希去重"""
+        if DataImportService._file_sha256_available is None:
+            columns = inspect(self.db.get_bind()).get_columns(DataImportRecord.__tablename__)
+            DataImportService._file_sha256_available = any(column['name'] == 'file_sha256' for column in columns)
+            if not DataImportService._file_sha256_available:
+                logger.warning("data_import_records 缺少 file_sha256 字段，请执行 scripts/database/migrate_import_file_hash.py")
+        return DataImportService._file_sha256_available
+    
+    def _bulk_insert_daily_data(self, rows: List[Dict[str, Any]]) -> None:
+        """分批以多行 INSERT 写入每日股票数据，替代逐条 ORM add"""
+        for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+            self.db.execute(insert(DailyStockData), rows[start:start + BULK_INSERT_CHUNK_SIZE])
+    
     def check_existing_import(self, import_date: date, import_type: str, file_name: str) -> Optional[DataImportRecord]:
         """检查指定日期和类型的导入记录"""
         return self.db.query(DataImportRecord).filter(
@@ -24,9 +60,31 @@ class DataImportService:
             DataImportRecord.file_name == file_name
         ).first()
     
+    def find_import_by_hash(self, file_sha256: str, import_type: str) -> Optional[DataImportRecord]:
+        """按文件内容哈希查找已成功导入的同类型记录（用于跳过重复上传）"""
+        if not self._has_file_sha256_column():
+            return None
+        return self.db.query(DataImportRecord).filter(
+            DataImportRecord.file_sha256 == file_sha256,
+            DataImportRecord.import_type == import_type,
+            DataImportRecord.import_status == 'success'
+        ).first()
+    
+    @staticmethod
+    def _duplicate_upload_result(record: DataImportRecord) -> Dict[str, Any]:
+        """构造重复上传时的返回结果"""
+        return {
+            "message": f"相同内容的文件已于 {record.import_date} 导入（{record.file_name}），如需覆盖请设置allow_overwrite=True",
+            "imported_records": record.imported_records,
+            "skipped_records": record.skipped_records,
+            "import_date": record.import_date.isoformat(),
+            "already_exists": True
+        }
+    
     def create_import_record(self, import_date: date, import_type: str, file_name: str, 
                            imported_records: int = 0, skipped_records: int = 0,
-                           import_status: str = 'success', error_message: str = None) -> DataImportRecord:
+                           import_status: str = 'success', error_message: str = None,
+                           file_sha256: str = None) -> DataImportRecord:
         """创建导入记录"""
         record = DataImportRecord(
             import_date=import_date,
@@ -37,22 +95,47 @@ class DataImportService:
             import_status=import_status,
             error_message=error_message
         )
+        if file_sha256 and self._has_file_sha256_column():
+            record.file_sha256 = file_sha256
         self.db.add(record)
         return record
     
     def update_import_record(self, record: DataImportRecord, imported_records: int = 0, 
                            skipped_records: int = 0, import_status: str = 'success', 
-                           error_message: str = None):
+                           error_message: str = None, file_sha256: str = None):
         """更新导入记录"""
+        if file_sha256 and self._has_file_sha256_column():
+            record.file_sha256 = file_sha256
         record.imported_records = imported_records
         record.skipped_records = skipped_records
         record.import_status = import_status
         record.error_message = error_message
         record.updated_at = datetime.now()
     
-    async def import_csv_data(self, content: bytes, filename: str, allow_overwrite: bool = False, trade_date: date = None) -> Dict[str, Any]:
+    @staticmethod
+    def _as_binary_stream(content: Union[bytes, BinaryIO]) -> BinaryIO:
+        """将 bytes 或文件对象统一为从头读取的二进制流"""
+        if isinstance(content, (bytes, bytearray)):
+            return io.BytesIO(content)
+        content.seek(0)
+        return content
+    
+    def _iter_text_lines(self, content: Union[bytes, BinaryIO]) -> Iterator[str]:
+        """逐行读取文本内容，避免整体解码和 split 产生的内存副本"""
+        wrapper = io.TextIOWrapper(self._as_binary_stream(content), encoding='utf-8', newline='')
+        try:
+            for line in wrapper:
+                yield line
+        finally:
+            # 分离包装器，避免其回收时关闭上传文件本身
+            wrapper.detach()
+    
+    async def import_csv_data(self, content: Union[bytes, BinaryIO], filename: str, allow_overwrite: bool = False, trade_date: date = None,
+                              file_sha256: str = None) -> Dict[str, Any]:
         """
         导入CSV格式的股票数据
+        content 可以是 bytes，也可以是已落盘的上传文件对象（按流读取）
+        file_sha256 为文件内容哈希，相同内容已成功导入时直接返回，不再解析
         支持两种格式:
         1. 英文格式: stock_code,stock_name,concept,industry,date,price,turnover_rate,net_inflow
         2. 中文格式: 股票代码,股票名称,全部页数,热帖首页页阅读总数,价格,行业,概念,换手,净流入
@@ -67,6 +150,12 @@ class DataImportService:
         
         import_type = 'csv'
         
+        # 相同内容的文件已成功导入过，直接返回
+        if file_sha256 and not allow_overwrite:
+            duplicate_record = self.find_import_by_hash(file_sha256, import_type)
+            if duplicate_record:
+                return self._duplicate_upload_result(duplicate_record)
+        
         try:
             # 检查是否已经导入过
             existing_record = self.check_existing_import(import_date, import_type, filename)
@@ -79,8 +168,12 @@ class DataImportService:
                     "already_exists": True
                 }
             
-            # 解析CSV内容
-            df = pd.read_csv(io.BytesIO(content), encoding='utf-8')
+            # 解析CSV内容（股票代码按字符串读取，跳过类型推断并保留前导零）
+            df = pd.read_csv(
+                self._as_binary_stream(content),
+                encoding='utf-8',
+                dtype={'stock_code': str, '股票代码': str}
+            )
             
             # 检测CSV格式并进行列名映射
             df = self._normalize_csv_columns(df)
@@ -108,8 +201,7 @@ class DataImportService:
             # 如果是覆盖导入，先删除相关数据
             if allow_overwrite and existing_record:
                 # 获取CSV文件中涉及的股票代码
-                stock_codes_in_csv = set(str(row['stock_code']).strip() for _, row in df.iterrows() 
-                                       if pd.notna(row.get('stock_code')))
+                stock_codes_in_csv = set(df['stock_code'].dropna().astype(str).str.strip())
                 
                 # 只删除CSV中涉及的股票在该日期的数据
                 if stock_codes_in_csv:
@@ -127,7 +219,7 @@ class DataImportService:
                             DailyStockData.stock_id.in_(stock_ids)
                         ).delete(synchronize_session=False)
                         self.db.flush()
-                        print(f"🗑️ 已删除 {len(stock_codes_in_csv)} 只股票在 {import_date} 的 {deleted_count} 条数据记录")
+                        logger.info("🗑️ 已删除 %d 只股票在 %s 的 %d 条数据记录", len(stock_codes_in_csv), import_date, deleted_count)
                 
                 # 清理可能过时的股票概念关联（可选）
                 # 注意：这里不删除概念关联，因为其他日期可能仍然有效
@@ -135,43 +227,45 @@ class DataImportService:
             # 用于跟踪已处理的股票-日期组合，避免重复插入DailyStockData
             processed_stock_dates = set()
             
+            # 新增的每日数据先收集，最后批量插入
+            new_daily_rows = []
+            
             # 用于跟踪本次CSV中的股票和概念关系
             csv_stock_concepts = {}  # {stock_code: [concept_names]}
             csv_stocks_info = {}     # {stock_code: {'name': ..., 'industry': ...}}
             
             # 第一遍：收集CSV中的所有股票和概念信息
-            print(f"📊 第一步：分析CSV文件中的股票和概念关系...")
-            for index, row in df.iterrows():
-                try:
-                    if pd.isna(row.get('stock_code')) or pd.isna(row.get('stock_name')):
-                        continue
-                    
-                    stock_code = str(row['stock_code']).strip()
-                    stock_name = str(row['stock_name']).strip()
-                    industry = str(row.get('industry', '')).strip() if not pd.isna(row.get('industry')) else ''
-                    concept_name = str(row['concept']).strip()
-                    
-                    if not stock_code or not stock_name or not concept_name:
-                        continue
-                    
-                    # 收集股票基本信息（总是使用最新的）
-                    csv_stocks_info[stock_code] = {
-                        'name': stock_name,
-                        'industry': industry
-                    }
-                    
-                    # 收集概念关系
-                    if stock_code not in csv_stock_concepts:
-                        csv_stock_concepts[stock_code] = set()
-                    csv_stock_concepts[stock_code].add(concept_name)
-                    
-                except Exception as e:
-                    continue
+            logger.info("📊 第一步：分析CSV文件中的股票和概念关系...")
+            # 按列向量化清洗，替代逐行 iterrows
+            first_pass = df[df['stock_code'].notna() & df['stock_name'].notna()]
+            codes = first_pass['stock_code'].astype(str).str.strip()
+            names = first_pass['stock_name'].astype(str).str.strip()
+            concepts = first_pass['concept'].astype(str).str.strip()
+            if 'industry' in first_pass.columns:
+                industries = first_pass['industry'].where(first_pass['industry'].notna(), '').astype(str).str.strip()
+            else:
+                industries = pd.Series('', index=first_pass.index)
+            
+            valid_mask = (codes != '') & (names != '') & (concepts != '')
+            for stock_code, stock_name, industry, concept_name in zip(
+                codes[valid_mask], names[valid_mask], industries[valid_mask], concepts[valid_mask]
+            ):
+                # 收集股票基本信息（总是使用最新的）
+                csv_stocks_info[stock_code] = {
+                    'name': stock_name,
+                    'industry': industry
+                }
+                
+                # 收集概念关系
+                csv_stock_concepts.setdefault(stock_code, set()).add(concept_name)
             
-            print(f"📈 CSV中包含 {len(csv_stocks_info)} 只股票，{sum(len(concepts) for concepts in csv_stock_concepts.values())} 个股票-概念关系")
+            logger.info(
+                "📈 CSV中包含 %d 只股票，%d 个股票-概念关系",
+                len(csv_stocks_info), sum(len(concepts) for concepts in csv_stock_concepts.values())
+            )
             
-            # 第二遍：处理股票基础信息和概念关系
-            for index, row in df.iterrows():
+            # 第二遍：处理股票基础信息和概念关系（按字典逐行访问，避免 iterrows 为每行构造 Series）
+            for index, row in enumerate(df.to_dict('records')):
                 try:
                     # 跳过空行或无效行
                     if pd.isna(row.get('stock_code')) or pd.isna(row.get('stock_name')):
@@ -212,7 +306,7 @@ class DataImportService:
                         self.db.add(stock)
                         self.db.flush()  # 获取ID
                         stats['new_stocks'] += 1
-                        print(f"✨ 创建新股票: {stock_code} - {stock_name}")
+                        logger.debug("✨ 创建新股票: %s - %s", stock_code, stock_name)
                     else:
                         # 更新现有股票的基本信息（总是使用最新CSV的数据）
                         updated_fields = []
@@ -224,7 +318,7 @@ class DataImportService:
                             updated_fields.append(f"行业: {industry or '无'}")
                         if updated_fields:
                             stats['updated_stocks'] += 1
-                            print(f"🔄 更新股票 {stock_code}: {', '.join(updated_fields)}")
+                            logger.debug("🔄 更新股票 %s: %s", stock_code, updated_fields)
                     
                     # 获取或创建概念记录
                     concept = self.db.query(Concept).filter(
@@ -236,7 +330,7 @@ class DataImportService:
                         self.db.add(concept)
                         self.db.flush()  # 获取ID
                         stats['new_concepts'] += 1
-                        print(f"✨ 创建新概念: {concept_name}")
+                        logger.debug("✨ 创建新概念: %s", concept_name)
                     
                     # 创建股票概念关联（增量模式：只添加，不删除旧关系）
                     stock_concept = self.db.query(StockConcept).filter(
@@ -251,7 +345,7 @@ class DataImportService:
                         )
                         self.db.add(stock_concept)
                         stats['new_relations'] += 1
-                        print(f"🔗 添加关联: {stock_code} -> {concept_name}")
+                        logger.debug("🔗 添加关联: %s -> %s", stock_code, concept_name)
                     
                     # 处理每日数据（现在总是有日期信息）
                     if 'date' in df.columns:
@@ -282,17 +376,16 @@ class DataImportService:
                                 stats['updated_daily_data'] += 1
                             else:
                                 # 创建新记录
-                                daily_data = DailyStockData(
-                                    stock_id=stock.id,
-                                    trade_date=trade_date,
-                                    price=price,
-                                    turnover_rate=turnover_rate,
-                                    net_inflow=net_inflow,
-                                    pages_count=pages_count,
-                                    total_reads=total_reads,
-                                    heat_value=0  # 默认热度值为0
-                                )
-                                self.db.add(daily_data)
+                                new_daily_rows.append({
+                                    "stock_id": stock.id,
+                                    "trade_date": trade_date,
+                                    "price": price,
+                                    "turnover_rate": turnover_rate,
+                                    "net_inflow": net_inflow,
+                                    "pages_count": pages_count,
+                                    "total_reads": total_reads,
+                                    "heat_value": 0  # 默认热度值为0
+                                })
                                 stats['new_daily_data'] += 1
                             
                             # 标记该股票-日期组合已处理
@@ -305,32 +398,34 @@ class DataImportService:
                     errors.append(f"第{index+1}行: {str(e)}")
                     continue
             
+            # 批量写入新增的每日数据
+            self._bulk_insert_daily_data(new_daily_rows)
+            
             # 创建或更新导入记录
             if existing_record and allow_overwrite:
                 self.update_import_record(
                     existing_record, imported_records, skipped_records, 
                     'success' if not errors else 'partial',
-                    '\n'.join(errors[:5]) if errors else None  # 只保存前5个错误
+                    '\n'.join(errors[:5]) if errors else None,  # 只保存前5个错误
+                    file_sha256
                 )
             else:
                 self.create_import_record(
                     import_date, import_type, filename, imported_records, 
                     skipped_records, 'success' if not errors else 'partial',
-                    '\n'.join(errors[:5]) if errors else None
+                    '\n'.join(errors[:5]) if errors else None,
+                    file_sha256
                 )
             
             # 打印导入总结
-            print(f"\n📈 CSV导入完成总结:")
-            print(f"   📋 文件名: {filename}")
-            print(f"   📅 导入日期: {import_date}")
-            print(f"   📊 处理记录: {imported_records} 成功, {skipped_records} 跳过")
-            print(f"   🏢 股票信息: {stats['new_stocks']} 新增, {stats['updated_stocks']} 更新")
-            print(f"   🏷️  概念信息: {stats['new_concepts']} 新增概念")
-            print(f"   🔗 关联关系: {stats['new_relations']} 新增关联")
-            print(f"   📈 每日数据: {stats['new_daily_data']} 新增, {stats['updated_daily_data']} 更新")
-            if errors:
-                print(f"   ⚠️  错误数量: {len(errors)} 个")
-            print(f"   ✅ 导入状态: {'完全成功' if not errors else '部分成功'}")
+            logger.info(
+                "📈 CSV导入完成总结: 文件名=%s 导入日期=%s 处理记录=%d成功/%d跳过 "
+                "股票=%d新增/%d更新 概念=%d新增 关联=%d新增 每日数据=%d新增/%d更新 错误数=%d 状态=%s",
+                filename, import_date, imported_records, skipped_records,
+                stats['new_stocks'], stats['updated_stocks'], stats['new_concepts'],
+                stats['new_relations'], stats['new_daily_data'], stats['updated_daily_data'],
+                len(errors), '完全成功' if not errors else '部分成功'
+            )
             
             # 提交事务
             self.db.commit()
@@ -348,29 +443,15 @@ class DataImportService:
             self.db.rollback()
             raise Exception(f"CSV解析失败: {str(e)}")
     
-    async def import_txt_data(self, content: bytes, filename: str, allow_overwrite: bool = False, trade_date: date = None) -> Dict[str, Any]:
+    def _preparse_txt_lines(self, content: Union[bytes, BinaryIO]) -> Tuple[Set[date], List[Tuple[int, str, date]]]:
         """
-        导入TXT格式的每日交易数据
-        
-        TXT文件特点：
-        1. 包含每日交易数据，每行格式: 股票代码\t日期\t热度值
-        2. 支持基于日期的完全覆盖导入
-        3. 日期来源：优先使用文件内容中的日期，其次是参数，最后是文件名
-        
-        导入策略：
-        - 如果是同一日期的重复导入，完全覆盖该日期的所有数据
-        - 支持数据纠正：重新导入可以覆盖之前错误的数据
+        预解析TXT内容，提取文件中出现的日期和有效行
+        不访问数据库，可在线程池中与CSV导入并行执行
         """
-        
-        # 第一步：预解析TXT内容以确定日期和数据范围
-        text_content = content.decode('utf-8')
-        lines = text_content.strip().split('\n')
-        
-        # 从文件内容中提取日期
         detected_dates = set()
         valid_lines = []
         
-        for line_num, line in enumerate(lines, 1):
+        for line_num, line in enumerate(self._iter_text_lines(content), 1):
             line = line.strip()
             if not line:
                 continue
@@ -387,33 +468,64 @@ class DataImportService:
                 except:
                     continue
         
+        return detected_dates, valid_lines
+    
+    async def import_txt_data(self, content: Union[bytes, BinaryIO], filename: str, allow_overwrite: bool = False, trade_date: date = None,
+                              preparsed: Optional[Tuple[Set[date], List[Tuple[int, str, date]]]] = None,
+                              file_sha256: str = None) -> Dict[str, Any]:
+        """
+        导入TXT格式的每日交易数据
+        
+        TXT文件特点：
+        1. 包含每日交易数据，每行格式: 股票代码\t日期\t热度值
+        2. 支持基于日期的完全覆盖导入
+        3. 日期来源：优先使用文件内容中的日期，其次是参数，最后是文件名
+        
+        导入策略：
+        - 如果是同一日期的重复导入，完全覆盖该日期的所有数据
+        - 支持数据纠正：重新导入可以覆盖之前错误的数据
+        
+        preparsed: 已由 _preparse_txt_lines 得到的预解析结果，提供时不再重复解析
+        file_sha256: 文件内容哈希，相同内容已成功导入时直接返回，不再解析
+        """
+        
+        # 相同内容的文件已成功导入过，直接返回
+        if file_sha256 and not allow_overwrite:
+            duplicate_record = self.find_import_by_hash(file_sha256, 'txt')
+            if duplicate_record:
+                return self._duplicate_upload_result(duplicate_record)
+        
+        # 第一步：逐行预解析TXT内容以确定日期和数据范围
+        if preparsed is None:
+            preparsed = self._preparse_txt_lines(content)
+        detected_dates, valid_lines = preparsed
+        
         # 确定导入的目标日期
         if trade_date:
             target_date = trade_date
-            print(f"📅 使用指定日期: {target_date}")
+            logger.info("📅 使用指定日期: %s", target_date)
         elif len(detected_dates) == 1:
             target_date = list(detected_dates)[0]
-            print(f"📅 从文件内容检测到日期: {target_date}")
+            logger.info("📅 从文件内容检测到日期: %s", target_date)
         elif len(detected_dates) > 1:
             # 如果检测到多个日期，使用最常见的日期
             from collections import Counter
             date_counts = Counter([line[2] for line in valid_lines])
             target_date = date_counts.most_common(1)[0][0]
-            print(f"📅 检测到多个日期，使用最常见的: {target_date} (出现{date_counts[target_date]}次)")
+            logger.info("📅 检测到多个日期，使用最常见的: %s (出现%d次)", target_date, date_counts[target_date])
         else:
             # 从文件名提取日期
             target_date = self._extract_date_from_filename(filename)
             if not target_date:
                 target_date = date.today()
-            print(f"📅 从文件名提取日期: {target_date}")
+            logger.info("📅 从文件名提取日期: %s", target_date)
         
         import_type = 'txt'
         
-        print(f"📊 TXT文件预分析:")
-        print(f"   📋 文件名: {filename}")
-        print(f"   📅 目标日期: {target_date}")  
-        print(f"   📝 有效行数: {len(valid_lines)}")
-        print(f"   🔍 检测到日期: {sorted(detected_dates)}")
+        logger.info(
+            "📊 TXT文件预分析: 文件名=%s 目标日期=%s 有效行数=%d 检测到日期=%s",
+            filename, target_date, len(valid_lines), sorted(detected_dates)
+        )
         
         try:
             # 检查是否已经导入过该日期的数据
@@ -421,7 +533,7 @@ class DataImportService:
             
             # TXT文件支持重复导入和覆盖（用于数据纠正）
             if existing_record and not allow_overwrite:
-                print(f"⚠️  该日期 {target_date} 已有TXT数据，如需覆盖请设置allow_overwrite=True")
+                logger.warning("⚠️  该日期 %s 已有TXT数据，如需覆盖请设置allow_overwrite=True", target_date)
                 return {
                     "message": f"该日期 {target_date} 已有数据，如需覆盖请设置allow_overwrite=True",
                     "imported_records": existing_record.imported_records,
@@ -457,7 +569,7 @@ class DataImportService:
                     if stock_code.isdigit() and len(stock_code) == 6:
                         txt_stock_codes.add(stock_code)
             
-            print(f"🔄 准备处理 {len(txt_stock_codes)} 只股票在 {target_date} 的热度数据")
+            logger.info("🔄 准备处理 %d 只股票在 %s 的热度数据", len(txt_stock_codes), target_date)
             
             # 2. 如果是覆盖模式或已存在数据，先删除该日期的相关数据
             if allow_overwrite or existing_record:
@@ -480,10 +592,18 @@ class DataImportService:
                         self.db.flush()
                         
                         if deleted_count > 0:
-                            print(f"🗑️  删除了 {deleted_count} 条 {target_date} 的旧数据，准备导入新数据")
+                            logger.info("🗑️  删除了 %d 条 %s 的旧数据，准备导入新数据", deleted_count, target_date)
             
             # 3. 处理每一行数据
-            print(f"📝 开始处理TXT数据...")
+            logger.info("📝 开始处理TXT数据...")
+            
+            # 一次性加载涉及的股票，避免逐行查询
+            stock_id_map = {}
+            if txt_stock_codes:
+                stock_id_map = dict(self.db.query(Stock.stock_code, Stock.id).filter(
+                    Stock.stock_code.in_(txt_stock_codes)
+                ).all())
+            daily_rows = []
             
             for line_num, line, line_date in valid_lines:
                 try:
@@ -524,11 +644,9 @@ class DataImportService:
                         continue
                     
                     # 查找股票记录
-                    stock = self.db.query(Stock).filter(
-                        Stock.stock_code == stock_code
-                    ).first()
+                    stock_id = stock_id_map.get(stock_code)
                     
-                    if not stock:
+                    if stock_id is None:
                         # 为不存在的股票创建基础记录
                         is_convertible_bond = (
                             len(stock_code) == 6 and 
@@ -543,26 +661,26 @@ class DataImportService:
                         )
                         self.db.add(stock)
                         self.db.flush()  # 获取ID
-                        print(f"💫 自动创建股票记录: {stock_code}")
-                    
-                    # 创建每日数据记录（因为之前已删除，这里都是新建）
-                    daily_data = DailyStockData(
-                        stock_id=stock.id,
-                        trade_date=target_date,
-                        heat_value=heat_value,
+                        stock_id = stock_id_map[stock_code] = stock.id
+                        logger.debug("💫 自动创建股票记录: %s", stock_code)
+                    
+                    # 收集每日数据记录（因为之前已删除，这里都是新建），最后批量插入
+                    daily_rows.append({
+                        "stock_id": stock_id,
+                        "trade_date": target_date,
+                        "heat_value": heat_value,
                         # 其他字段使用默认值
-                        price=0,
-                        turnover_rate=0,
-                        net_inflow=0,
-                        pages_count=0,
-                        total_reads=0
-                    )
-                    self.db.add(daily_data)
+                        "price": 0,
+                        "turnover_rate": 0,
+                        "net_inflow": 0,
+                        "pages_count": 0,
+                        "total_reads": 0
+                    })
                     stats['new_records'] += 1
                     imported_records += 1
                     
                     if imported_records % 100 == 0:
-                        print(f"   ... 已处理 {imported_records} 条记录")
+                        logger.debug("   ... 已处理 %d 条记录", imported_records)
                     
                 except Exception as e:
                     skipped_records += 1
@@ -570,33 +688,35 @@ class DataImportService:
                     errors.append(f"第{line_num}行: {str(e)}")
                     continue
             
+            # 批量写入热度数据
+            self._bulk_insert_daily_data(daily_rows)
+            
             # 打印导入总结
-            print(f"\n📈 TXT导入完成总结:")
-            print(f"   📋 文件名: {filename}")
-            print(f"   📅 目标日期: {target_date}")
-            print(f"   📊 处理记录: {imported_records} 成功, {skipped_records} 跳过")
-            print(f"   🗑️  删除记录: {stats['deleted_records']} 条旧数据")
-            print(f"   ✨ 新增记录: {stats['new_records']} 条热度数据")
-            print(f"   ❌ 错误记录: {stats['error_records']} 条")
+            logger.info(
+                "📈 TXT导入完成总结: 文件名=%s 目标日期=%s 处理记录=%d成功/%d跳过 "
+                "删除旧数据=%d 新增热度数据=%d 错误记录=%d 状态=%s 覆盖模式=%s",
+                filename, target_date, imported_records, skipped_records,
+                stats['deleted_records'], stats['new_records'], stats['error_records'],
+                '完全成功' if not errors else '部分成功',
+                '是' if (allow_overwrite or existing_record) else '否'
+            )
             if errors:
-                print(f"   ⚠️  错误详情: 显示前3个")
-                for error in errors[:3]:
-                    print(f"      - {error}")
-            print(f"   ✅ 导入状态: {'完全成功' if not errors else '部分成功'}")
-            print(f"   🔄 覆盖模式: {'是' if (allow_overwrite or existing_record) else '否'}")
+                logger.warning("⚠️  TXT导入错误详情(前3个): %s", errors[:3])
             
             # 创建或更新导入记录
             if existing_record and allow_overwrite:
                 self.update_import_record(
                     existing_record, imported_records, skipped_records,
                     'success' if not errors else 'partial',
-                    '\n'.join(errors[:5]) if errors else None
+                    '\n'.join(errors[:5]) if errors else None,
+                    file_sha256
                 )
             else:
                 self.create_import_record(
                     target_date, import_type, filename, imported_records,
                     skipped_records, 'success' if not errors else 'partial',
-                    '\n'.join(errors[:5]) if errors else None
+                    '\n'.join(errors[:5]) if errors else None,
+                    file_sha256
                 )
             
             # 提交事务
@@ -617,20 +737,8 @@ class DataImportService:
     
     def _extract_date_from_filename(self, filename: str) -> date:
         """从文件名中提取日期，支持多种格式"""
-        import re
-        
-        # 支持的日期格式模式
-        patterns = [
-            (r'(\d{4}-\d{2}-\d{2})', '%Y-%m-%d'),  # 2025-08-28
-            (r'(\d{4}_\d{2}_\d{2})', '%Y_%m_%d'),  # 2025_08_28
-            (r'(\d{8})', '%Y%m%d'),                # 20250828
-            (r'(\d{4})(\d{2})(\d{2})', '%Y%m%d'),  # 分组形式的20250828
-            (r'(\d{2}-\d{2}-\d{4})', '%m-%d-%Y'),  # MM-DD-YYYY
-            (r'(\d{2}/\d{2}/\d{4})', '%m/%d/%Y'),  # MM/DD/YYYY
-        ]
-        
-        for pattern, date_format in patterns:
-            match = re.search(pattern, filename)
+        for pattern, date_format in FILENAME_DATE_PATTERNS:
+            match = pattern.search(filename)
             if match:
                 if len(match.groups()) == 1:
                     date_str = match.group(1)
@@ -733,10 +841,11 @@ class DataImportService:
         
         return stock_code
     
-    async def import_daily_batch(self, csv_content: bytes, csv_filename: str, 
-                                txt_content: bytes, txt_filename: str, 
+    async def import_daily_batch(self, csv_content: Union[bytes, BinaryIO], csv_filename: str, 
+                                txt_content: Union[bytes, BinaryIO], txt_filename: str, 
                                 trade_date: date = None, allow_overwrite: bool = False,
-                                import_mode: str = "smart") -> Dict[str, Any]:
+                                import_mode: str = "smart",
+                                csv_sha256: str = None, txt_sha256: str = None) -> Dict[str, Any]:
         """
         批量导入每日数据（CSV + TXT）
         确保两个文件都成功导入才算完成
@@ -747,6 +856,7 @@ class DataImportService:
                 - "skip": 跳过已存在的文件
                 - "update": 更新模式，只更新已存在的数据
                 - "overwrite": 完全覆盖模式
+            csv_sha256 / txt_sha256: 文件内容哈希，用于跳过重复上传
         """
         if not trade_date:
             # 优先从CSV文件名解析日期
@@ -766,13 +876,17 @@ class DataImportService:
         
         try:
             # 1. 先导入CSV数据（股票基础信息和概念）
-            print(f"🔄 开始导入CSV数据: {csv_filename}")
-            csv_result = await self.import_csv_data(csv_content, csv_filename, allow_overwrite)
+            # TXT预解析不依赖数据库，放到线程池中与CSV导入并行执行
+            logger.info("🔄 开始导入CSV数据: %s", csv_filename)
+            txt_preparsed, csv_result = await asyncio.gather(
+                asyncio.to_thread(self._preparse_txt_lines, txt_content),
+                self.import_csv_data(csv_content, csv_filename, allow_overwrite, file_sha256=csv_sha256)
+            )
             results["csv_result"] = csv_result
             
             if csv_result.get("already_exists") and not allow_overwrite:
                 # CSV已存在，继续检查TXT是否也存在
-                print(f"⚠️ CSV文件已存在，检查TXT文件状态...")
+                logger.info("⚠️ CSV文件已存在，检查TXT文件状态...")
                 txt_existing = self.check_existing_import(trade_date, 'txt', txt_filename)
                 if txt_existing:
                     results["message"] = "CSV和TXT文件都已存在，如需重新导入请设置allow_overwrite=True"
@@ -785,8 +899,8 @@ class DataImportService:
                     return results
                 else:
                     # 只导入TXT文件
-                    print(f"🔄 CSV已存在，仅导入TXT数据...")
-                    txt_result = await self.import_txt_data(txt_content, txt_filename, allow_overwrite, trade_date)
+                    logger.info("🔄 CSV已存在，仅导入TXT数据...")
+                    txt_result = await self.import_txt_data(txt_content, txt_filename, allow_overwrite, trade_date, txt_preparsed, txt_sha256)
                     results["txt_result"] = txt_result
                     
                     txt_success = not txt_result.get("already_exists", False) or txt_result.get("imported_records", 0) > 0
@@ -798,8 +912,8 @@ class DataImportService:
                     return results
             
             # 2. 再导入TXT数据（热度数据）
-            print(f"🔄 开始导入TXT数据: {txt_filename}")
-            txt_result = await self.import_txt_data(txt_content, txt_filename, allow_overwrite, trade_date)
+            logger.info("🔄 开始导入TXT数据: %s", txt_filename)
+            txt_result = await self.import_txt_data(txt_content, txt_filename, allow_overwrite, trade_date, txt_preparsed, txt_sha256)
             results["txt_result"] = txt_result
             
             # 3. 检查两个文件是否都成功导入
@@ -821,13 +935,13 @@ class DataImportService:
                 
                 # 触发每日分析计算
                 try:
-                    print(f"🚀 触发 {trade_date} 的每日分析计算...")
+                    logger.info("🚀 触发 %s 的每日分析计算...", trade_date)
                     from app.services.ranking_calculator import RankingCalculatorService
                     ranking_service = RankingCalculatorService(self.db)
                     analysis_result = await ranking_service.trigger_full_analysis(trade_date)
-                    print(f"✅ 分析计算完成: {analysis_result['message']}")
+                    logger.info("✅ 分析计算完成: %s", analysis_result['message'])
                 except Exception as e:
-                    print(f"⚠️ 分析计算失败（但导入成功）: {str(e)}")
+                    logger.warning("⚠️ 分析计算失败（但导入成功）: %s", e)
                     # 不影响导入结果，只记录警告
                 
             else:
@@ -845,31 +959,33 @@ class DataImportService:
         检查指定日期的导入完整性
         确保CSV和TXT数据都已导入
         """
-        csv_records = self.db.query(DataImportRecord).filter(
+        # 一次分组计数代替三次加载全部记录
+        type_counts = dict(self.db.query(
+            DataImportRecord.import_type,
+            func.count(DataImportRecord.id)
+        ).filter(
             DataImportRecord.import_date == trade_date,
-            DataImportRecord.import_type == 'csv',
-            DataImportRecord.import_status.in_(['success', 'partial'])
-        ).all()
+            or_(
+                and_(
+                    DataImportRecord.import_type.in_(['csv', 'txt']),
+                    DataImportRecord.import_status.in_(['success', 'partial'])
+                ),
+                DataImportRecord.import_type == 'both'
+            )
+        ).group_by(DataImportRecord.import_type).all())
         
-        txt_records = self.db.query(DataImportRecord).filter(
-            DataImportRecord.import_date == trade_date,
-            DataImportRecord.import_type == 'txt',
-            DataImportRecord.import_status.in_(['success', 'partial'])
-        ).all()
-        
-        batch_records = self.db.query(DataImportRecord).filter(
-            DataImportRecord.import_date == trade_date,
-            DataImportRecord.import_type == 'both'
-        ).all()
+        csv_count = type_counts.get('csv', 0)
+        txt_count = type_counts.get('txt', 0)
+        batch_count = type_counts.get('both', 0)
         
         return {
             "trade_date": trade_date.isoformat(),
-            "csv_imported": len(csv_records) > 0,
-            "txt_imported": len(txt_records) > 0,
-            "batch_imported": len(batch_records) > 0,
-            "complete": len(csv_records) > 0 and len(txt_records) > 0,
-            "csv_records": len(csv_records),
-            "txt_records": len(txt_records),
-            "batch_records": len(batch_records),
-            "ready_for_analysis": len(csv_records) > 0 and len(txt_records) > 0
+            "csv_imported": csv_count > 0,
+            "txt_imported": txt_count > 0,
+            "batch_imported": batch_count > 0,
+            "complete": csv_count > 0 and txt_count > 0,
+            "csv_records": csv_count,
+            "txt_records": txt_count,
+            "batch_records": batch_count,
+            "ready_for_analysis": csv_count > 0 and txt_count > 0
         }
\ No newline at end of file
@@ -1,10 +1,11 @@
-from typing import List, Dict, Optional, Tuple, Generator
+from typing import List, Dict, Optional, Tuple, Generator, Iterable
 from sqlalchemy.orm import Session
 from app.models.daily_trading import (
     DailyTrading, ConceptDailySummary,
     StockConceptRanking, ConceptHighRecord, TxtImportRecord
 )
 from app.services.txt_import import TxtImportService
+from app.core.dates import parse_date
 from datetime import datetime, date
 import logging
 import time
@@ -35,10 +36,27 @@ class HistoricalTxtImportService:
         Returns:
             Dict[date_str, List[line]]: 按日期分组的数据行
         """
-        date_groups = defaultdict(list)
         lines = txt_content.strip().split('\n')
-
         logger.info(f"开始解析包含 {len(lines)} 行的历史数据文件")
+        return self._group_lines_by_date(lines)
+
+    def parse_txt_file_by_date(self, file_path: str) -> Dict[str, List[str]]:
+        """
+        按日期分组解析磁盘上的TXT文件，逐行读取，不把整个文件内容载入内存
+
+        Args:
+            file_path: TXT文件路径
+
+        Returns:
+            Dict[date_str, List[line]]: 按日期分组的数据行
+        """
+        logger.info(f"开始解析历史数据文件: {file_path}")
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return self._group_lines_by_date(f)
+
+    def _group_lines_by_date(self, lines: Iterable[str]) -> Dict[str, List[str]]:
+        """将数据行按日期分组，跳过格式不正确的行"""
+        date_groups = defaultdict(list)
 
         for line_num, line in enumerate(lines, 1):
             line = line.strip()
@@ -53,9 +71,9 @@ class HistoricalTxtImportService:
 
                 stock_code, date_str, volume_str = parts
 
-                # 验证日期格式
+                # 验证日期格式（parse_date 带缓存，同一日期字符串只解析一次）
                 try:
-                    datetime.strptime(date_str, '%Y-%m-%d')
+                    parse_date(date_str)
                 except ValueError:
                     logger.warning(f"第{line_num}行日期格式错误: {date_str}")
                     continue
@@ -123,7 +141,7 @@ class HistoricalTxtImportService:
             stock_code, date_str, volume_str = parts
 
             # 验证日期格式
-            datetime.strptime(date_str, '%Y-%m-%d')
+            parse_date(date_str)
 
             return date_str, line
 
@@ -177,6 +195,35 @@ class HistoricalTxtImportService:
         Returns:
             导入结果统计
         """
+        return self._import_historical(
+            lambda: self.parse_large_txt_by_date(txt_content),
+            filename, imported_by, progress_callback
+        )
+
+    def import_historical_file(self, file_path: str, filename: str = "historical.txt",
+                             imported_by: str = "system",
+                             progress_callback: Optional[callable] = None) -> Dict:
+        """
+        从磁盘文件导入历史多日期数据（适用于上传的大文件）
+
+        Args:
+            file_path: TXT文件路径
+            filename: 原始文件名
+            imported_by: 导入人
+            progress_callback: 进度回调函数 callback(current, total, date_str, status)
+
+        Returns:
+            导入结果统计
+        """
+        return self._import_historical(
+            lambda: self.parse_txt_file_by_date(file_path),
+            filename, imported_by, progress_callback
+        )
+
+    def _import_historical(self, parse_date_groups: callable, filename: str,
+                           imported_by: str,
+                           progress_callback: Optional[callable] = None) -> Dict:
+        """按日期分组后逐日期导入，parse_date_groups 返回按日期分组的数据行"""
         start_time = time.time()
         total_results = {
             "success": True,
@@ -192,7 +239,7 @@ class HistoricalTxtImportService:
         try:
             # 1. 按日期分组数据
             logger.info("开始解析历史数据文件...")
-            date_groups = self.parse_large_txt_by_date(txt_content)
+            date_groups = parse_date_groups()
             total_results["total_dates"] = len(date_groups)
 
             if not date_groups:
@@ -324,13 +371,45 @@ class HistoricalTxtImportService:
 
         return result
 
-    def get_historical_import_preview(self, txt_content: str, preview_lines: int = 1000) -> Dict:
+    async def import_historical_file_async(self, file_path: str, filename: str = "historical.txt",
+                                         imported_by: str = "system",
+                                         progress_callback: Optional[callable] = None) -> Dict:
+        """
+        异步从磁盘文件导入历史数据（用于大文件处理）
+
+        Args:
+            file_path: TXT文件路径
+            filename: 原始文件名
+            imported_by: 导入人
+            progress_callback: 进度回调函数
+
+        Returns:
+            导入结果统计
+        """
+        loop = asyncio.get_event_loop()
+
+        # 在线程池中执行导入操作
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            result = await loop.run_in_executor(
+                executor,
+                self.import_historical_file,
+                file_path,
+                filename,
+                imported_by,
+                progress_callback
+            )
+
+        return result
+
+    def get_historical_import_preview(self, txt_content: str, preview_lines: int = 1000,
+                                      total_lines: Optional[int] = None) -> Dict:
         """
         预览历史文件的导入情况
 
         Args:
-            txt_content: 文件内容
+            txt_content: 文件内容（可以只是文件开头部分）
             preview_lines: 预览行数
+            total_lines: 整个文件的总行数，txt_content 只是文件开头时由调用方估算传入
 
         Returns:
             预览信息
@@ -341,7 +420,8 @@ class HistoricalTxtImportService:
 
             date_groups = self.parse_large_txt_by_date(preview_content)
 
-            total_lines = len(lines)
+            if total_lines is None:
+                total_lines = len(lines)
             preview_stats = {
                 "total_lines": total_lines,
                 "preview_lines": min(preview_lines, total_lines),
@@ -10,11 +10,43 @@ from app.models import (
     Stock, DailyStockData, Concept, StockConcept, 
     DailyConceptRanking, DailyConceptSummary, DailyAnalysisTask
 )
+import numpy as np
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def rank_within_groups(group_ids: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    组内降序排名（向量化实现）
+    一次排序完成所有概念的排名计算，替代逐概念的 Python 循环
+    
+    Args:
+        group_ids: 分组ID数组（如 concept_id）
+        values: 排名依据的数值数组（如 heat_value）
+        
+    Returns:
+        与输入等长的排名数组，组内从1开始
+    """
+    n = len(group_ids)
+    ranks = np.empty(n, dtype=np.int64)
+    if n == 0:
+        return ranks
+    
+    # 先按分组升序、再按数值降序排序（lexsort 以最后一个键为主键）
+    order = np.lexsort((-values, group_ids))
+    sorted_groups = group_ids[order]
+    
+    # 每个分组在排序结果中的起始位置
+    is_group_start = np.empty(n, dtype=bool)
+    is_group_start[0] = True
+    np.not_equal(sorted_groups[1:], sorted_groups[:-1], out=is_group_start[1:])
+    group_start_pos = np.maximum.accumulate(np.where(is_group_start, np.arange(n), 0))
+    
+    ranks[order] = np.arange(n) - group_start_pos + 1
+    return ranks
+
+
 class RankingCalculatorService:
     """排名计算服务"""
     
@@ -37,40 +69,42 @@ class RankingCalculatorService:
                 DailyConceptRanking.trade_date == trade_date
             ).delete(synchronize_session=False)
             
-            total_rankings = 0
+            # 一次查询取出当日所有 概念-股票-热度 数据，避免逐概念查询
+            concept_stocks = self.db.query(
+                StockConcept.concept_id,
+                StockConcept.stock_id,
+                DailyStockData.heat_value
+            ).join(DailyStockData, StockConcept.stock_id == DailyStockData.stock_id).filter(
+                DailyStockData.trade_date == trade_date,
+                DailyStockData.heat_value > 0
+            ).all()
             
-            # 获取所有概念
-            concepts = self.db.query(Concept).all()
+            concepts_count = self.db.query(func.count(Concept.id)).scalar() or 0
+            total_rankings = len(concept_stocks)
             
-            for concept in concepts:
-                # 获取该概念下的股票及其热度数据
-                concept_stocks = self.db.query(
-                    StockConcept.stock_id,
-                    DailyStockData.heat_value
-                ).join(DailyStockData, StockConcept.stock_id == DailyStockData.stock_id).filter(
-                    StockConcept.concept_id == concept.id,
-                    DailyStockData.trade_date == trade_date,
-                    DailyStockData.heat_value > 0
-                ).order_by(desc(DailyStockData.heat_value)).all()
+            if concept_stocks:
+                concept_ids = np.fromiter((row[0] for row in concept_stocks), dtype=np.int64, count=total_rankings)
+                stock_ids = np.fromiter((row[1] for row in concept_stocks), dtype=np.int64, count=total_rankings)
+                heat_values = np.fromiter((float(row[2]) for row in concept_stocks), dtype=np.float64, count=total_rankings)
                 
-                if not concept_stocks:
-                    continue
+                # 向量化计算每个概念内的热度排名
+                ranks = rank_within_groups(concept_ids, heat_values)
                 
-                # 为该概念的股票分配排名
-                rankings_to_insert = []
-                for rank, (stock_id, heat_value) in enumerate(concept_stocks, 1):
-                    ranking = DailyConceptRanking(
-                        concept_id=concept.id,
-                        stock_id=stock_id,
-                        trade_date=trade_date,
-                        rank_in_concept=rank,
-                        heat_value=float(heat_value)
+                rankings_to_insert = [
+                    {
+                        "concept_id": int(concept_id),
+                        "stock_id": int(stock_id),
+                        "trade_date": trade_date,
+                        "rank_in_concept": int(rank),
+                        "heat_value": float(heat_value)
+                    }
+                    for concept_id, stock_id, rank, heat_value in zip(
+                        concept_ids.tolist(), stock_ids.tolist(), ranks.tolist(), heat_values.tolist()
                     )
-                    rankings_to_insert.append(ranking)
+                ]
                 
                 # 批量插入排名数据
-                self.db.bulk_save_objects(rankings_to_insert)
-                total_rankings += len(rankings_to_insert)
+                self.db.bulk_insert_mappings(DailyConceptRanking, rankings_to_insert)
             
             self.db.commit()
             
@@ -80,8 +114,8 @@ class RankingCalculatorService:
                 "success": True,
                 "trade_date": trade_date.isoformat(),
                 "total_rankings_created": total_rankings,
-                "concepts_processed": len(concepts),
-                "message": f"成功计算 {len(concepts)} 个概念的股票排名"
+                "concepts_processed": concepts_count,
+                "message": f"成功计算 {concepts_count} 个概念的股票排名"
             }
             
         except Exception as e:
@@ -6,6 +6,9 @@ from app.models.daily_trading import (
 )
 from app.models.stock import Stock
 from app.models.concept import Concept, StockConcept
+from app.core.cache import cache
+from app.core.redis_cache import cache as redis_cache, CacheKeys
+from sqlalchemy import func
 from datetime import datetime, date, timedelta
 import logging
 import csv
@@ -15,6 +18,27 @@ from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
+# 最新交易日期缓存（进程内，60秒过期，写入交易数据后主动失效）
+LATEST_TRADING_DATE_CACHE_KEY = "daily_trading:latest_trading_date"
+LATEST_TRADING_DATE_TTL = 60
+
+
+def get_latest_trading_date(db: Session) -> Optional[date]:
+    """获取 daily_trading 中的最新交易日期，使用 MAX 走索引并缓存结果"""
+    latest_date = cache.get(LATEST_TRADING_DATE_CACHE_KEY)
+    if latest_date is None:
+        latest_date = db.query(func.max(DailyTrading.trading_date)).scalar()
+        if latest_date is not None:
+            cache.set(LATEST_TRADING_DATE_CACHE_KEY, latest_date, LATEST_TRADING_DATE_TTL)
+    return latest_date
+
+
+def invalidate_daily_trading_cache() -> None:
+    """交易数据变更后清除最新交易日期缓存及按日期缓存的统计结果"""
+    cache.delete(LATEST_TRADING_DATE_CACHE_KEY)
+    redis_cache.clear_pattern(CacheKeys.DAILY_TRADING_REPORTS)
+
+
 class TxtImportService:
     """TXT文件导入和数据汇总服务"""
     
@@ -261,6 +285,8 @@ class TxtImportService:
             ).delete()
         
         self.db.commit()
+        if not keep_trading_data:
+            invalidate_daily_trading_cache()
         logger.info(f"已清理{trading_date}的{'汇总' if keep_trading_data else '所有'}数据")
     
     def insert_daily_trading(self, trading_data: List[Dict]) -> int:
@@ -278,6 +304,7 @@ class TxtImportService:
             count += 1
 
         self.db.commit()
+        invalidate_daily_trading_cache()
         logger.info(f"插入{count}条交易数据（原始代码 + 标准化代码）")
         return count
     
@@ -4,15 +4,23 @@ User Membership Management Service
 """
 
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
-from sqlalchemy.orm import Session
+from typing import Optional, Dict, Any, List, Union
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager, joinedload
 from sqlalchemy import and_, or_
 
 from app.core.database import get_db
 from app.core.logging import logger
+from app.core.redis_cache import cache as redis_cache, CacheKeys, CacheExpiry
 from app.models.user import User
 from app.models.payment import PaymentOrder, PaymentPackage, PaymentStatus
 
+# 会员状态缓存时间（秒），会员到期时间更早时以到期时间为准
+MEMBERSHIP_STATUS_CACHE_TTL = CacheExpiry.MINUTE_5
+
+# 购买历史缓存时间（秒）
+PURCHASE_HISTORY_CACHE_TTL = 10 * 60
+
 
 class UserMembershipService:
     """用户会员权限管理服务"""
@@ -40,8 +48,34 @@ class UserMembershipService:
             }
         }
     
+    def invalidate_user_cache(self, user_id: int) -> None:
+        """清除用户的会员状态和购买历史缓存，订单或会员权益变化并提交后调用"""
+        redis_cache.delete(CacheKeys.USER_MEMBERSHIP.format(user_id=user_id))
+        redis_cache.delete(CacheKeys.USER_PURCHASE_HISTORY.format(user_id=user_id))
+
     async def get_user_membership_status(self, db: Session, user_id: int) -> Dict[str, Any]:
-        """获取用户会员状态"""
+        """获取用户会员状态（优先读取缓存）"""
+        cache_key = CacheKeys.USER_MEMBERSHIP.format(user_id=user_id)
+        cached_status = redis_cache.get(cache_key)
+        if cached_status is not None:
+            return cached_status
+
+        membership_status = self._load_user_membership_status(db, user_id)
+
+        # 查询出错的结果不缓存
+        if 'error' not in membership_status:
+            ttl = MEMBERSHIP_STATUS_CACHE_TTL
+            if membership_status['active_until']:
+                # 会员到期后缓存随之失效，避免继续返回已过期的会员状态
+                remaining = datetime.fromisoformat(membership_status['active_until']) - datetime.now()
+                ttl = min(ttl, int(remaining.total_seconds()))
+            if ttl > 0:
+                redis_cache.set(cache_key, membership_status, ttl)
+
+        return membership_status
+
+    def _load_user_membership_status(self, db: Session, user_id: int) -> Dict[str, Any]:
+        """从数据库查询用户会员状态"""
         try:
             user = db.query(User).filter(User.id == user_id).first()
             if not user:
@@ -52,7 +86,9 @@ class UserMembershipService:
             
             # 获取用户当前有效的付费订单
             current_time = datetime.now()
-            active_orders = db.query(PaymentOrder).join(PaymentPackage).filter(
+            active_orders = db.query(PaymentOrder).join(PaymentPackage).options(
+                contains_eager(PaymentOrder.payment_package)
+            ).filter(
                 and_(
                     PaymentOrder.user_id == user_id,
                     PaymentOrder.status == PaymentStatus.PAID,
@@ -142,11 +178,21 @@ class UserMembershipService:
         
         return True
     
-    async def activate_package_for_user(self, db: Session, user_id: int, payment_order_id: int) -> Dict[str, Any]:
-        """为用户激活套餐权限"""
+    async def activate_package_for_user(
+        self, db: Union[Session, AsyncSession], user_id: int, payment_order_id: int
+    ) -> Dict[str, Any]:
+        """为用户激活套餐权限，同时支持同步会话和异步会话"""
+        if isinstance(db, AsyncSession):
+            return await db.run_sync(self._activate_package, user_id, payment_order_id)
+        return self._activate_package(db, user_id, payment_order_id)
+
+    def _activate_package(self, db: Session, user_id: int, payment_order_id: int) -> Dict[str, Any]:
+        """在数据库中激活套餐权限"""
         try:
-            # 获取支付订单
-            payment_order = db.query(PaymentOrder).filter(
+            # 获取支付订单，套餐信息随订单一起查询
+            payment_order = db.query(PaymentOrder).options(
+                joinedload(PaymentOrder.payment_package)
+            ).filter(
                 and_(
                     PaymentOrder.id == payment_order_id,
                     PaymentOrder.user_id == user_id,
@@ -168,6 +214,7 @@ class UserMembershipService:
                 payment_order.expire_time = None
             
             db.commit()
+            self.invalidate_user_cache(user_id)
             
             logger.info(f"Package activated for user {user_id}: {payment_order.payment_package.name}")
             
@@ -224,9 +271,35 @@ class UserMembershipService:
             }
     
     async def get_user_purchase_history(self, db: Session, user_id: int) -> List[Dict[str, Any]]:
-        """获取用户购买历史"""
+        """获取用户购买历史（优先读取缓存）"""
+        cache_key = CacheKeys.USER_PURCHASE_HISTORY.format(user_id=user_id)
+        cached_history = redis_cache.get(cache_key)
+        if cached_history is not None:
+            return self._mark_active_orders(cached_history)
+
+        purchase_history = self._load_user_purchase_history(db, user_id)
+        if purchase_history is None:
+            return []
+
+        redis_cache.set(cache_key, purchase_history, PURCHASE_HISTORY_CACHE_TTL)
+        return self._mark_active_orders(purchase_history)
+
+    def _mark_active_orders(self, purchase_history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按当前时间计算订单是否在有效期内，缓存中只保存订单数据，有效期内过期的订单不会仍显示为有效"""
+        now = datetime.now()
+        for item in purchase_history:
+            expire_time = item['expire_time']
+            item['is_active'] = item['status'] == PaymentStatus.PAID and (
+                expire_time is None or datetime.fromisoformat(expire_time) > now
+            )
+        return purchase_history
+
+    def _load_user_purchase_history(self, db: Session, user_id: int) -> Optional[List[Dict[str, Any]]]:
+        """从数据库查询用户购买历史，查询出错时返回 None"""
         try:
-            orders = db.query(PaymentOrder).join(PaymentPackage).filter(
+            orders = db.query(PaymentOrder).join(PaymentPackage).options(
+                contains_eager(PaymentOrder.payment_package)
+            ).filter(
                 PaymentOrder.user_id == user_id
             ).order_by(PaymentOrder.created_at.desc()).all()
             
@@ -239,19 +312,18 @@ class UserMembershipService:
                     'package_type': order.payment_package.package_type,
                     'membership_type': order.payment_package.membership_type,
                     'amount': float(order.amount),
-                    'status': order.status.value.lower(),
-                    'payment_method': order.payment_method.value.lower(),
+                    'status': order.status,
+                    'payment_method': order.payment_method,
                     'created_at': order.created_at.isoformat(),
                     'paid_at': order.paid_at.isoformat() if order.paid_at else None,
-                    'expire_time': order.expire_time.isoformat() if order.expire_time else None,
-                    'is_active': order.expire_time is None or order.expire_time > datetime.now() if order.status == PaymentStatus.PAID else False
+                    'expire_time': order.expire_time.isoformat() if order.expire_time else None
                 })
             
             return purchase_history
             
         except Exception as e:
             logger.error(f"Get purchase history error: {e}")
-            return []
+            return None
     
     async def upgrade_membership_limits(self, membership_type: str, new_limits: Dict[str, Any]) -> bool:
         """更新会员权限配置（管理员功能）"""
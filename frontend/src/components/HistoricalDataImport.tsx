@@ -32,6 +32,8 @@ interface ImportProgress {
   current_date: string;
   completed_dates: string[];
   failed_dates: string[];
+  completed_count?: number;
+  failed_count?: number;
   start_time: string;
   end_time?: string;
   filename: string;
@@ -73,8 +75,9 @@ const HistoricalDataImport: React.FC = () => {
       console.log('实际文件对象:', actualFile);
 
       // 验证文件类型
-      if (!actualFile.name.endsWith('.txt')) {
-        message.error('请选择TXT格式的文件');
+      const lowerName = actualFile.name.toLowerCase();
+      if (!lowerName.endsWith('.txt') && !lowerName.endsWith('.txt.gz')) {
+        message.error('请选择TXT或TXT.GZ格式的文件');
         return;
       }
 
@@ -427,7 +430,7 @@ const HistoricalDataImport: React.FC = () => {
           <Card>
             <div style={{ textAlign: 'center', padding: '48px 24px' }}>
               <Upload.Dragger
-                accept=".txt"
+                accept=".txt,.gz"
                 multiple={false}
                 beforeUpload={() => false}
                 onChange={handleFileSelect}
@@ -633,10 +636,10 @@ const HistoricalDataImport: React.FC = () => {
                 <Panel header="详细进度信息" key="details">
                   <Descriptions column={2} size="small">
                     <Descriptions.Item label="成功日期">
-                      <Tag color="green">{importProgress.completed_dates.length}</Tag>
+                      <Tag color="green">{importProgress.completed_count ?? importProgress.completed_dates.length}</Tag>
                     </Descriptions.Item>
                     <Descriptions.Item label="失败日期">
-                      <Tag color="red">{importProgress.failed_dates.length}</Tag>
+                      <Tag color="red">{importProgress.failed_count ?? importProgress.failed_dates.length}</Tag>
                     </Descriptions.Item>
                   </Descriptions>
 
@@ -96,7 +96,9 @@ CREATE TABLE daily_concept_sums (
     INDEX idx_trade_date (trade_date),
     INDEX idx_new_high (trade_date, is_new_high),
     INDEX idx_concept_date (concept_id, trade_date),
-    INDEX idx_total_heat (total_heat_value)
+    INDEX idx_total_heat (total_heat_value),
+    INDEX idx_dcs_date_new_high_days (trade_date, is_new_high, days_for_high_check),
+    INDEX idx_dcs_date_heat (trade_date, total_heat_value DESC)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='每日概念总和表';
 
 -- 7. 用户表
@@ -150,6 +152,7 @@ CREATE TABLE data_import_records (
     import_date DATE NOT NULL COMMENT '导入日期',
     import_type ENUM('csv', 'txt', 'both') NOT NULL COMMENT '导入类型',
     file_name VARCHAR(255) NOT NULL COMMENT '文件名',
+    file_sha256 CHAR(64) NULL COMMENT '文件内容SHA-256',
     imported_records INT DEFAULT 0 COMMENT '导入记录数',
     skipped_records INT DEFAULT 0 COMMENT '跳过记录数',
     import_status ENUM('success', 'failed', 'partial') DEFAULT 'success' COMMENT '导入状态',
@@ -159,6 +162,8 @@ CREATE TABLE data_import_records (
     INDEX idx_import_date (import_date),
     INDEX idx_import_type (import_type),
     INDEX idx_import_status (import_status),
+    INDEX idx_date_type_status (import_date, import_type, import_status),
+    INDEX idx_sha256_type_status (file_sha256, import_type, import_status),
     UNIQUE KEY uk_date_type_file (import_date, import_type, file_name)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='数据导入记录表';
 
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+导入记录文件哈希迁移脚本
+为已有数据库的 data_import_records 表添加 file_sha256 字段及索引 idx_sha256_type_status
+
+使用方法:
+python scripts/database/migrate_import_file_hash.py
+
+迁移内容:
+1. 添加 file_sha256 字段（文件内容SHA-256，用于重复上传检测）
+2. 创建索引 idx_sha256_type_status (file_sha256, import_type, import_status)
+
+脚本可重复执行；执行后需重启后端服务，按哈希去重才会生效
+"""
+
+import sys
+from pathlib import Path
+
+# 添加 backend 目录到 Python 路径
+backend_dir = Path(__file__).resolve().parents[2] / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import text
+from app.core.database import engine
+from datetime import datetime
+import logging
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def add_file_sha256_column(connection):
+    """添加 file_sha256 字段"""
+    result = connection.execute(text("""
+        SELECT COUNT(*)
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'data_import_records' AND COLUMN_NAME = 'file_sha256'
+    """))
+
+    if result.scalar() == 0:
+        logger.info("📝 添加 file_sha256 字段...")
+        connection.execute(text("""
+            ALTER TABLE data_import_records
+            ADD COLUMN file_sha256 VARCHAR(64) NULL COMMENT '文件内容SHA-256' AFTER file_name
+        """))
+    else:
+        logger.info("✅ file_sha256 字段已存在")
+
+def create_sha256_index(connection):
+    """创建重复上传检测索引"""
+    result = connection.execute(text("""
+        SELECT COUNT(*)
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'data_import_records' AND INDEX_NAME = 'idx_sha256_type_status'
+    """))
+
+    if result.scalar() == 0:
+        logger.info("📝 创建索引 idx_sha256_type_status...")
+        connection.execute(text("""
+            CREATE INDEX idx_sha256_type_status ON data_import_records (file_sha256, import_type, import_status)
+        """))
+    else:
+        logger.info("✅ 索引 idx_sha256_type_status 已存在")
+
+def main():
+    """执行迁移"""
+    logger.info("🚀 开始导入记录文件哈希迁移")
+    logger.info(f"⏰ 开始时间: {datetime.now()}")
+
+    try:
+        with engine.connect() as connection:
+            # ALTER TABLE / CREATE INDEX 为 DDL，MySQL 会隐式提交
+            add_file_sha256_column(connection)
+            create_sha256_index(connection)
+
+        logger.info("🎉 导入记录文件哈希迁移完成!")
+    except Exception as e:
+        logger.error(f"💥 迁移失败: {e}")
+        sys.exit(1)
+
+    logger.info(f"⏰ 完成时间: {datetime.now()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+待支付订单去重迁移脚本
+为已有数据库添加 pending_user_id 生成列及唯一索引 uk_payment_orders_pending
+
+使用方法:
+python scripts/database/migrate_payment_pending_dedupe.py
+
+迁移内容:
+1. 同一用户、同一套餐类型的多个待支付订单只保留最新一条，其余标记为 expired
+2. 添加 pending_user_id 生成列
+3. 创建唯一索引 uk_payment_orders_pending (pending_user_id, package_type)
+
+脚本可重复执行；创建索引时如有新产生的重复待支付订单导致失败，重新执行即可
+"""
+
+import sys
+from pathlib import Path
+
+# 添加 backend 目录到 Python 路径
+backend_dir = Path(__file__).resolve().parents[2] / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import text
+from app.core.database import engine
+from datetime import datetime
+import logging
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def expire_duplicate_pending_orders(connection):
+    """重复的待支付订单保留 ID 最大的一条，其余标记为过期"""
+    logger.info("🔧 处理重复的待支付订单...")
+    result = connection.execute(text("""
+        UPDATE payment_orders p
+        JOIN (
+            SELECT user_id, package_type, MAX(id) AS keep_id
+            FROM payment_orders
+            WHERE status = 'pending'
+            GROUP BY user_id, package_type
+            HAVING COUNT(*) > 1
+        ) d ON p.user_id = d.user_id AND p.package_type = d.package_type
+        SET p.status = 'expired'
+        WHERE p.status = 'pending' AND p.id <> d.keep_id
+    """))
+    logger.info(f"✅ 已将 {result.rowcount} 个重复的待支付订单标记为过期")
+
+def add_pending_user_id_column(connection):
+    """添加 pending_user_id 生成列"""
+    result = connection.execute(text("""
+        SELECT COUNT(*)
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'payment_orders' AND COLUMN_NAME = 'pending_user_id'
+    """))
+
+    if result.scalar() == 0:
+        logger.info("📝 添加 pending_user_id 字段...")
+        connection.execute(text("""
+            ALTER TABLE payment_orders
+            ADD COLUMN pending_user_id INT GENERATED ALWAYS AS (CASE WHEN status = 'pending' THEN user_id END) VIRTUAL
+            COMMENT '待支付订单的用户ID（由状态生成，用于去重）' AFTER notify_data
+        """))
+    else:
+        logger.info("✅ pending_user_id 字段已存在")
+
+def create_pending_unique_index(connection):
+    """创建待支付订单去重唯一索引"""
+    result = connection.execute(text("""
+        SELECT COUNT(*)
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'payment_orders' AND INDEX_NAME = 'uk_payment_orders_pending'
+    """))
+
+    if result.scalar() == 0:
+        logger.info("📝 创建唯一索引 uk_payment_orders_pending...")
+        connection.execute(text("""
+            CREATE UNIQUE INDEX uk_payment_orders_pending ON payment_orders (pending_user_id, package_type)
+        """))
+    else:
+        logger.info("✅ 唯一索引 uk_payment_orders_pending 已存在")
+
+def main():
+    """执行迁移"""
+    logger.info("🚀 开始待支付订单去重迁移")
+    logger.info(f"⏰ 开始时间: {datetime.now()}")
+
+    try:
+        with engine.connect() as connection:
+            expire_duplicate_pending_orders(connection)
+            connection.commit()
+
+            # ALTER TABLE / CREATE INDEX 为 DDL，MySQL 会隐式提交
+            add_pending_user_id_column(connection)
+            create_pending_unique_index(connection)
+
+        logger.info("🎉 待支付订单去重迁移完成!")
+    except Exception as e:
+        logger.error(f"💥 迁移失败: {e}")
+        logger.error("如因迁移期间新产生了重复的待支付订单导致索引创建失败，重新执行本脚本即可")
+        sys.exit(1)
+
+    logger.info(f"⏰ 完成时间: {datetime.now()}")
+
+if __name__ == "__main__":
+    main()
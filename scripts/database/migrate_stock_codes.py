@@ -4,26 +4,27 @@
 为开发阶段设计 - 添加 original_stock_code 和 normalized_stock_code 字段
 
 使用方法:
-python backend/database/migrate_stock_codes.py
+python scripts/database/migrate_stock_codes.py
 
 迁移内容:
 1. 添加 original_stock_code 和 normalized_stock_code 字段
 2. 迁移现有数据
-3. 验证迁移结果
+3. 添加 market_prefix 生成列及索引
+4. 添加 code_format 生成列及索引
+5. 验证迁移结果
 """
 
 import sys
 import os
 from pathlib import Path
 
-# 当前已经在backend目录下，不需要额外设置路径
-# 只需要添加当前目录到Python路径
-current_dir = Path(__file__).parent
-sys.path.insert(0, str(current_dir))
+# 添加 backend 目录到 Python 路径
+backend_dir = Path(__file__).resolve().parents[2] / "backend"
+sys.path.insert(0, str(backend_dir))
 
 from sqlalchemy import text
 from app.core.database import engine, get_db
-from app.models.daily_trading import DailyTrading
+from app.models.daily_trading import DailyTrading, CODE_FORMAT_EXPRESSION
 from datetime import datetime
 import logging
 
@@ -171,6 +172,92 @@ def create_indexes():
             connection.rollback()
             raise
 
+def add_market_prefix_column():
+    """添加市场前缀生成列及覆盖索引（用于按市场统计）"""
+    logger.info("🔧 添加 market_prefix 生成列...")
+    
+    with engine.connect() as connection:
+        try:
+            result = connection.execute(text("""
+                SELECT COUNT(*) 
+                FROM information_schema.COLUMNS 
+                WHERE TABLE_NAME = 'daily_trading' AND COLUMN_NAME = 'market_prefix'
+            """))
+            
+            if result.fetchone()[0] == 0:
+                logger.info("📝 添加 market_prefix 字段...")
+                connection.execute(text("""
+                    ALTER TABLE daily_trading 
+                    ADD COLUMN market_prefix CHAR(2) GENERATED ALWAYS AS (LEFT(original_stock_code, 2)) STORED COMMENT '市场前缀（由原始代码生成）'
+                """))
+            else:
+                logger.info("✅ market_prefix 字段已存在")
+            
+            result = connection.execute(text("""
+                SELECT COUNT(*) 
+                FROM information_schema.statistics 
+                WHERE table_name = 'daily_trading' AND index_name = 'idx_date_prefix_volume'
+            """))
+            
+            if result.fetchone()[0] == 0:
+                logger.info("📝 创建索引 idx_date_prefix_volume...")
+                connection.execute(text("""
+                    CREATE INDEX idx_date_prefix_volume ON daily_trading (trading_date, market_prefix, trading_volume)
+                """))
+            else:
+                logger.info("✅ 索引 idx_date_prefix_volume 已存在")
+            
+            connection.commit()
+            logger.info("✅ market_prefix 生成列添加完成!")
+            
+        except Exception as e:
+            logger.error(f"❌ 添加 market_prefix 失败: {e}")
+            connection.rollback()
+            raise
+
+def add_code_format_column():
+    """添加代码格式生成列及索引（用于代码格式分析）"""
+    logger.info("🔧 添加 code_format 生成列...")
+    
+    with engine.connect() as connection:
+        try:
+            result = connection.execute(text("""
+                SELECT COUNT(*) 
+                FROM information_schema.COLUMNS 
+                WHERE TABLE_NAME = 'daily_trading' AND COLUMN_NAME = 'code_format'
+            """))
+            
+            if result.fetchone()[0] == 0:
+                logger.info("📝 添加 code_format 字段...")
+                connection.execute(text(f"""
+                    ALTER TABLE daily_trading 
+                    ADD COLUMN code_format SMALLINT GENERATED ALWAYS AS ({CODE_FORMAT_EXPRESSION}) STORED COMMENT '代码格式（由原始代码生成）'
+                """))
+            else:
+                logger.info("✅ code_format 字段已存在")
+            
+            result = connection.execute(text("""
+                SELECT COUNT(*) 
+                FROM information_schema.statistics 
+                WHERE table_name = 'daily_trading' AND index_name = 'idx_date_format_volume'
+            """))
+            
+            if result.fetchone()[0] == 0:
+                logger.info("📝 创建索引 idx_date_format_volume...")
+                connection.execute(text("""
+                    CREATE INDEX idx_date_format_volume ON daily_trading (trading_date, code_format, trading_volume)
+                """))
+            else:
+                logger.info("✅ 索引 idx_date_format_volume 已存在")
+            
+            connection.commit()
+            logger.info("✅ code_format 生成列添加完成!")
+            
+        except Exception as e:
+            logger.error(f"❌ 添加 code_format 失败: {e}")
+            connection.rollback()
+            raise
+
 def set_not_null_constraints():
     """设置非空约束"""
     logger.info("🔒 设置字段约束...")
@@ -266,7 +353,13 @@ def main():
         # 步骤4: 设置约束
         set_not_null_constraints()
         
-        # 步骤5: 验证结果
+        # 步骤5: 添加市场前缀生成列
+        add_market_prefix_column()
+        
+        # 步骤6: 添加代码格式生成列
+        add_code_format_column()
+        
+        # 步骤7: 验证结果
         if verify_migration():
             logger.info("🎉 股票代码字段升级迁移完成!")
             logger.info("📝 迁移内容:")
@@ -275,6 +368,8 @@ def main():
             logger.info("   ✅ 迁移所有现有数据")
             logger.info("   ✅ 创建优化索引")
             logger.info("   ✅ 设置字段约束")
+            logger.info("   ✅ 添加 market_prefix 生成列及索引")
+            logger.info("   ✅ 添加 code_format 生成列及索引")
             logger.info("")
             logger.info("🔧 下一步:")
             logger.info("   1. 重启应用服务")
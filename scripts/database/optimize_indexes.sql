@@ -41,6 +41,17 @@ CREATE INDEX IF NOT EXISTS idx_payment_orders_expire_time ON payment_orders(expi
 -- 复合索引：用户+状态+时间 (用户支付历史页面)
 CREATE INDEX IF NOT EXISTS idx_payment_orders_user_status_time ON payment_orders(user_id, status, created_at DESC);
 
+-- 复合索引：用户+时间+ID (订单列表游标分页)
+CREATE INDEX IF NOT EXISTS idx_payment_orders_user_created ON payment_orders(user_id, created_at DESC, id DESC);
+
+-- 覆盖索引：用户+状态+金额 (用户支付统计，不回表)
+CREATE INDEX IF NOT EXISTS idx_payment_orders_user_status_amount ON payment_orders(user_id, status, amount);
+
+-- 唯一索引：待支付用户+套餐类型 (并发下单去重，每个用户同一套餐类型最多一个待支付订单)
+-- 已有数据库请执行 scripts/database/migrate_payment_pending_dedupe.py，
+-- 脚本会先将重复的待支付订单标记为过期，再添加 pending_user_id 生成列和该索引
+CREATE UNIQUE INDEX IF NOT EXISTS uk_payment_orders_pending ON payment_orders(pending_user_id, package_type);
+
 -- ============ 支付套餐表索引 ============
 
 -- 套餐类型查询优化
@@ -94,6 +105,32 @@ CREATE INDEX IF NOT EXISTS idx_payment_notifications_processed ON payment_notifi
 -- 创建时间查询优化
 CREATE INDEX IF NOT EXISTS idx_payment_notifications_created_at ON payment_notifications(created_at);
 
+-- ============ 每日概念总和表索引 ============
+
+-- 复合索引：日期+新高+检查天数 (创新高概念查询)
+CREATE INDEX IF NOT EXISTS idx_dcs_date_new_high_days ON daily_concept_sums(trade_date, is_new_high, days_for_high_check);
+
+-- 复合索引：日期+热度倒序 (热度排行 TOP N 查询)
+CREATE INDEX IF NOT EXISTS idx_dcs_date_heat ON daily_concept_sums(trade_date, total_heat_value DESC);
+
+-- ============ 数据导入记录表索引 ============
+
+-- 复合索引：日期+类型+状态 (导入完整性检查)
+-- 注：(import_date, import_type) 前缀已由唯一键 uk_date_type_file 覆盖
+CREATE INDEX IF NOT EXISTS idx_date_type_status ON data_import_records(import_date, import_type, import_status);
+
+-- 复合索引：内容哈希+类型+状态 (重复上传检测)
+-- 已有数据库需先执行 scripts/database/migrate_import_file_hash.py 添加 file_sha256 字段（该脚本同时创建本索引）
+CREATE INDEX IF NOT EXISTS idx_sha256_type_status ON data_import_records(file_sha256, import_type, import_status);
+
+-- ============ 每日交易表索引 ============
+
+-- 复合索引：日期+原始代码 (按市场前缀搜索、双代码查询)
+CREATE INDEX IF NOT EXISTS idx_date_original_code ON daily_trading(trading_date, original_stock_code);
+
+-- 复合索引：日期+标准化代码 (双代码查询)
+CREATE INDEX IF NOT EXISTS idx_date_normalized_code ON daily_trading(trading_date, normalized_stock_code);
+
 -- ============ 性能分析查询 ============
 
 -- 显示当前索引使用情况
@@ -107,6 +144,6 @@ FROM
     information_schema.STATISTICS 
 WHERE 
     TABLE_SCHEMA = DATABASE()
-    AND TABLE_NAME IN ('users', 'payment_orders', 'payment_packages', 'stocks', 'membership_logs', 'payment_notifications')
+    AND TABLE_NAME IN ('users', 'payment_orders', 'payment_packages', 'stocks', 'membership_logs', 'payment_notifications', 'daily_concept_sums', 'data_import_records', 'daily_trading')
 ORDER BY 
     TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX;
\ No newline at end of file
@@ -49,10 +49,12 @@ CREATE TABLE payment_orders (
     client_ip VARCHAR(45) COMMENT '客户端IP',
     user_agent TEXT COMMENT '用户代理',
     notify_data JSON COMMENT '支付通知原始数据',
+    pending_user_id INT GENERATED ALWAYS AS (CASE WHEN status = 'pending' THEN user_id END) VIRTUAL COMMENT '待支付订单的用户ID（由状态生成，用于去重）',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
     
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE KEY uk_payment_orders_pending (pending_user_id, package_type),
     INDEX idx_user_id (user_id),
     INDEX idx_out_trade_no (out_trade_no),
     INDEX idx_transaction_id (transaction_id),
@@ -60,7 +62,10 @@ CREATE TABLE payment_orders (
     INDEX idx_package_type (package_type),
     INDEX idx_expire_time (expire_time),
     INDEX idx_paid_at (paid_at),
-    INDEX idx_created_at (created_at)
+    INDEX idx_created_at (created_at),
+    INDEX idx_payment_orders_user_status_time (user_id, status, created_at DESC),
+    INDEX idx_payment_orders_user_created (user_id, created_at DESC, id DESC),
+    INDEX idx_payment_orders_user_status_amount (user_id, status, amount)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='支付订单表';
 
 -- 3. 支付通知记录表